@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Alert Cache - アクティブアラートのメモリキャッシュ
+初回だけ全件を読み込み、以降はalert_changes（トリガーで記録される変更ログ）の
+差分だけを反映する（新規作成・停止・発火・配信停止ユーザー）
+
+サイクルごとの読み込みコストはアラート総数ではなく変更件数に比例する
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from database_schema import AlertDatabase, ALERT_CHANGE_RETENTION_HOURS
+
+CHANGE_LOG_PRUNE_INTERVAL = 3600  # 変更ログを掃除する間隔（秒）
+
+class ActiveAlertCache:
+    """alert_id -> アクティブアラートのキャッシュ"""
+    
+    def __init__(self, db: AlertDatabase, retention_hours: int = ALERT_CHANGE_RETENTION_HOURS):
+        self.db = db
+        self.retention_hours = retention_hours
+        self.alerts: Dict[int, Dict] = {}
+        self.seq: Optional[int] = None  # 反映済みの変更ログ位置（Noneは未読込）
+        
+        self._last_refresh = 0.0
+        self._last_prune = time.monotonic()
+        self.stats = {'full_reloads': 0, 'delta_refreshes': 0, 'rows_loaded': 0}
+    
+    def __len__(self) -> int:
+        return len(self.alerts)
+    
+    def active_alerts(self) -> List[Dict]:
+        """キャッシュ中のアクティブアラート一覧"""
+        return list(self.alerts.values())
+    
+    def invalidate(self):
+        """次回refreshで全件を読み直す"""
+        self.seq = None
+    
+    def refresh(self) -> Tuple[List[Dict], List[int]]:
+        """変更ログを反映
+        
+        戻り値: (追加・更新されたアラート, 削除されたアラートID)
+        """
+        now = time.monotonic()
+        
+        # 変更ログの保持時間を超えて更新していない場合は差分が欠けている可能性がある
+        if self.seq is None or now - self._last_refresh > self.retention_hours * 3600 / 2:
+            changes = self._full_reload()
+        else:
+            changes = self._apply_changes()
+        self._last_refresh = now
+        
+        if now - self._last_prune > CHANGE_LOG_PRUNE_INTERVAL:
+            self._last_prune = now
+            self.db.prune_alert_changes(self.retention_hours)
+        
+        return changes
+    
+    def _full_reload(self) -> Tuple[List[Dict], List[int]]:
+        """全件読み込み"""
+        # 読み込み中の変更を取りこぼさないよう、先に変更ログ位置を取得
+        seq = self.db.get_alert_change_seq()
+        alerts = self.db.get_active_alerts()
+        
+        new_alerts = {alert['id']: alert for alert in alerts}
+        removed = [alert_id for alert_id in self.alerts if alert_id not in new_alerts]
+        self.alerts = new_alerts
+        self.seq = seq
+        
+        self.stats['full_reloads'] += 1
+        self.stats['rows_loaded'] += len(alerts)
+        return alerts, removed
+    
+    def _apply_changes(self) -> Tuple[List[Dict], List[int]]:
+        """前回以降の変更だけを反映"""
+        seq, alert_ids, user_ids = self.db.get_alert_changes(self.seq)
+        if seq == self.seq:
+            return [], []
+        
+        # 変更のあったアラート・ユーザーのアラートを一旦外し、アクティブなものだけ戻す
+        stale = set(alert_ids)
+        if user_ids:
+            stale.update(alert_id for alert_id, alert in self.alerts.items() if alert['user_id'] in user_ids)
+        
+        upserted = self.db.get_active_alerts_for(alert_ids, user_ids)
+        active_ids = {alert['id'] for alert in upserted}
+        
+        removed = [alert_id for alert_id in stale if alert_id in self.alerts and alert_id not in active_ids]
+        for alert_id in removed:
+            del self.alerts[alert_id]
+        for alert in upserted:
+            self.alerts[alert['id']] = alert
+        self.seq = seq
+        
+        self.stats['delta_refreshes'] += 1
+        self.stats['rows_loaded'] += len(upserted)
+        return upserted, removed
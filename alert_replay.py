@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Alert Replay - 記録済み価格系列によるアラートのオフライン再生（バックテスト）
+price_historyテーブルまたはBinanceのklineファイルの価格を時刻順に再生し、
+監視プロセスと同じ発火判定（発火価格インデックス／NumPy一括評価 + evaluate_alert）で
+どのアラートがいつ発火したかと評価スループットを計測する
+
+アラートはデータベースのコピー上で評価し、発火結果もコピーにだけ書き込む（本番DBは変更しない）
+
+使用方法:
+    # price_history を再生
+    python alert_replay.py
+    python alert_replay.py --symbols BTCUSDT,ETHUSDT --since "2024-05-01" --until "2024-05-08"
+    
+    # 保持期間を過ぎた期間はOHLCロールアップ（1m / 1h / 1d）を再生
+    python alert_replay.py --ohlc 1h --since "2024-01-01"
+    
+    # klineファイル（data.binance.vision のCSV、または /api/v3/klines のJSON）を再生
+    python alert_replay.py --klines BTCUSDT-1m-2024-05.csv ETHUSDT-1m-2024-05.csv
+    python alert_replay.py --klines btc.json --symbol BTCUSDT --engine vectorized
+    
+    # 発火済み・停止中も含めた全アラートで閾値の挙動を確認し、結果DBを保存
+    python alert_replay.py --all-alerts --output-db replay.db --json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from database_schema import AlertDatabase, DATABASE_FILE, PRICE_ROLLUP_INTERVALS
+from trigger_index import TriggerIndex
+from vectorized_engine import AlertBatch
+
+Tick = Tuple[float, str, float]  # (UNIX時刻, 銘柄, 価格)
+
+def _format_time(epoch: float) -> str:
+    """UNIX時刻をDBと同じ形式（UTC）に変換"""
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def _parse_time(text: str) -> float:
+    """DBのタイムスタンプ（UTC）をUNIX時刻に変換"""
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp()
+
+def load_price_history(db_file: str, symbols: Optional[List[str]] = None,
+                       since: Optional[str] = None, until: Optional[str] = None) -> List[Tick]:
+    """price_historyテーブルから価格系列を読み込み"""
+    query = "SELECT recorded_at, symbol, price FROM price_history WHERE 1 = 1"
+    params: List = []
+    if symbols:
+        query += f" AND symbol IN ({','.join('?' * len(symbols))})"
+        params.extend(symbols)
+    if since:
+        query += " AND recorded_at >= ?"
+        params.append(since)
+    if until:
+        query += " AND recorded_at < ?"
+        params.append(until)
+    query += " ORDER BY recorded_at, id"
+    
+    with sqlite3.connect(db_file) as conn:
+        return [(_parse_time(recorded_at), symbol, float(price))
+                for recorded_at, symbol, price in conn.execute(query, params)]
+
+def load_price_ohlc(db_file: str, interval: str, symbols: Optional[List[str]] = None,
+                    since: Optional[str] = None, until: Optional[str] = None) -> List[Tick]:
+    """OHLCロールアップ（price_ohlc_1m / 1h / 1d）から価格系列を読み込み
+    
+    1本の足を 始値 → 安値 → 高値 → 終値（陰線は 始値 → 高値 → 安値 → 終値）の4ティックに展開する
+    """
+    seconds = PRICE_ROLLUP_INTERVALS[interval][0]
+    query = f"SELECT bucket_start, symbol, open, high, low, close FROM price_ohlc_{interval} WHERE 1 = 1"
+    params: List = []
+    if symbols:
+        query += f" AND symbol IN ({','.join('?' * len(symbols))})"
+        params.extend(symbols)
+    if since:
+        query += " AND bucket_start >= ?"
+        params.append(since)
+    if until:
+        query += " AND bucket_start < ?"
+        params.append(until)
+    query += " ORDER BY bucket_start, symbol"
+    
+    ticks: List[Tick] = []
+    with sqlite3.connect(db_file) as conn:
+        for bucket_start, symbol, open_price, high, low, close in conn.execute(query, params):
+            start = _parse_time(bucket_start)
+            path = (open_price, low, high, close) if close >= open_price else (open_price, high, low, close)
+            for step, price in enumerate(path):
+                ticks.append((start + seconds * step / 4, symbol, float(price)))
+    ticks.sort(key=lambda tick: tick[0])
+    return ticks
+
+def _kline_close_time(value) -> float:
+    """klineのクローズ時刻をUNIX時刻に変換（ミリ秒・マイクロ秒の両方に対応）"""
+    value = int(value)
+    return value / 1_000_000 if value > 10 ** 14 else value / 1000
+
+def load_kline_file(path: str, symbol: Optional[str] = None) -> List[Tick]:
+    """klineファイルから終値の系列を読み込み
+    
+    銘柄を指定しない場合はファイル名の先頭（BTCUSDT-1m-2024-05.csv → BTCUSDT）を使う
+    """
+    symbol = (symbol or os.path.basename(path).split('-')[0].split('.')[0]).upper()
+    
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            rows = json.load(f)
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            # ヘッダー行付きのファイルにも対応
+            rows = [row for row in csv.reader(f) if row and row[0].strip().isdigit()]
+    
+    # [open_time, open, high, low, close, volume, close_time, ...]
+    return [(_kline_close_time(row[6]), symbol, float(row[4])) for row in rows]
+
+def iter_snapshots(ticks: List[Tick]) -> Iterator[Tuple[float, Dict[str, float]]]:
+    """同じ時刻の価格を1つの価格スナップショット（監視サイクル相当）にまとめる"""
+    current_time = None
+    prices: Dict[str, float] = {}
+    for epoch, symbol, price in ticks:
+        if epoch != current_time and prices:
+            yield current_time, prices
+            prices = {}
+        current_time = epoch
+        prices[symbol] = price
+    if prices:
+        yield current_time, prices
+
+def copy_database(src_file: str, dst_file: str, all_alerts: bool = False):
+    """データベースをコピー（all_alerts=Trueなら全アラートをアクティブとして扱う）"""
+    with sqlite3.connect(src_file) as src, sqlite3.connect(dst_file) as dst:
+        src.backup(dst)
+        if all_alerts:
+            dst.execute("UPDATE alerts SET status = 'active', triggered_at = NULL")
+            dst.execute("UPDATE users SET is_active = 1")
+            dst.commit()
+
+class AlertReplay:
+    """価格スナップショット列に対してアラートを評価する再生エンジン"""
+    
+    def __init__(self, alerts: List[Dict], engine: str = 'index'):
+        self.alerts = {alert['id']: alert for alert in alerts}
+        self.engine = engine
+        self.fires: List[Dict] = []
+        self.stats = {'ticks': 0, 'snapshots': 0, 'evaluations': 0, 'candidates': 0}
+        
+        # 銘柄ごとの未発火アラート数（評価件数の計算用）
+        self._active_counts: Dict[str, int] = {}
+        for alert in alerts:
+            self._active_counts[alert['symbol']] = self._active_counts.get(alert['symbol'], 0) + 1
+        
+        if engine == 'vectorized':
+            self.batch = AlertBatch(alerts)
+            self.fired_mask = np.zeros(len(alerts), dtype=bool)
+            self._positions = {alert['id']: i for i, alert in enumerate(alerts)}
+        else:
+            self.index = TriggerIndex()
+            for alert in alerts:
+                self.index.add(alert)
+    
+    def _candidates(self, prices: Dict[str, float]) -> List[Tuple[Dict, float]]:
+        """監視プロセスと同じ評価エンジンで発火候補を抽出"""
+        if self.engine == 'vectorized':
+            current_prices, _, triggered = self.batch.evaluate(prices)
+            return [(self.batch.alerts[i], float(current_prices[i]))
+                    for i in np.flatnonzero(triggered & ~self.fired_mask)]
+        
+        candidates = []
+        for symbol, price in prices.items():
+            for alert_id in self.index.crossed(symbol, price):
+                candidates.append((self.alerts[alert_id], price))
+        return candidates
+    
+    def _fire(self, alert: Dict, result: Dict, epoch: float):
+        """発火を記録し、以降の評価対象から外す"""
+        self.fires.append({
+            'alert_id': alert['id'],
+            'user_id': alert.get('user_id'),
+            'symbol': alert['symbol'],
+            'alert_type': result['alert_type'],
+            'threshold_percent': result['threshold_percent'],
+            'base_price': result['base_price'],
+            'trigger_price': result['current_price'],
+            'price_change': round(result['price_change'], 4),
+            'fired_at': _format_time(epoch)
+        })
+        self._active_counts[alert['symbol']] -= 1
+        if self.engine == 'vectorized':
+            self.fired_mask[self._positions[alert['id']]] = True
+        else:
+            self.index.remove(alert['id'])
+    
+    def run(self, ticks: List[Tick]) -> Dict:
+        """価格系列を最大速度で再生し、結果の要約を返す"""
+        start = time.perf_counter()
+        for epoch, prices in iter_snapshots(ticks):
+            self.stats['snapshots'] += 1
+            self.stats['ticks'] += len(prices)
+            self.stats['evaluations'] += sum(self._active_counts.get(symbol, 0) for symbol in prices)
+            
+            for alert, price in self._candidates(prices):
+                self.stats['candidates'] += 1
+                # 監視プロセスと同じく evaluate_alert で最終判定
+                result = AlertDatabase.evaluate_alert(alert, price)
+                if result['triggered']:
+                    self._fire(alert, result, epoch)
+        elapsed = time.perf_counter() - start
+        
+        return {
+            'engine': self.engine,
+            'alerts': len(self.alerts),
+            'fired': len(self.fires),
+            'ticks': self.stats['ticks'],
+            'snapshots': self.stats['snapshots'],
+            'evaluations': self.stats['evaluations'],
+            'elapsed_sec': round(elapsed, 6),
+            'evals_per_sec': round(self.stats['evaluations'] / elapsed) if elapsed > 0 else None,
+            'ticks_per_sec': round(self.stats['ticks'] / elapsed) if elapsed > 0 else None,
+            'first_tick': _format_time(ticks[0][0]) if ticks else None,
+            'last_tick': _format_time(ticks[-1][0]) if ticks else None
+        }
+    
+    def write_results(self, db_file: str):
+        """発火結果をデータベースのコピーに反映"""
+        with sqlite3.connect(db_file) as conn:
+            conn.executemany("""
+                UPDATE alerts SET status = 'triggered', triggered_at = ?, current_price = ?
+                WHERE id = ?
+            """, [(fire['fired_at'], fire['trigger_price'], fire['alert_id']) for fire in self.fires])
+            conn.commit()
+
+def display_results(summary: Dict, fires: List[Dict], show: int):
+    """結果を表示"""
+    print("\n" + "=" * 80)
+    print("⏪ アラート再生結果")
+    print("=" * 80)
+    print(f"📅 期間: {summary['first_tick']} 〜 {summary['last_tick']} (UTC)")
+    print(f"⚙️ エンジン: {summary['engine']}")
+    print(f"📊 価格: {summary['ticks']:,}件 ({summary['snapshots']:,}スナップショット)")
+    print(f"⚡ アラート: {summary['alerts']:,}件中 {summary['fired']:,}件が発火")
+    print(f"⏱️ 評価: {summary['evaluations']:,}回 / {summary['elapsed_sec']:.3f}秒 "
+          f"({summary['evals_per_sec'] or 0:,}評価/秒, {summary['ticks_per_sec'] or 0:,}価格/秒)")
+    
+    if fires and show:
+        print("-" * 80)
+        print(f"{'発火時刻':<20} {'ID':>8} {'銘柄':<12} {'種別':<5} {'閾値':>8} {'発火価格':>16} {'変動率':>9}")
+        for fire in fires[:show]:
+            print(f"{fire['fired_at']:<20} {fire['alert_id']:>8} {fire['symbol']:<12} {fire['alert_type']:<5} "
+                  f"{fire['threshold_percent']:>+7.2f}% {fire['trigger_price']:>16,.6f} {fire['price_change']:>+8.2f}%")
+        if len(fires) > show:
+            print(f"   ... 他 {len(fires) - show:,}件")
+    print("=" * 80)
+
+def parse_arguments():
+    """コマンドライン引数解析"""
+    parser = argparse.ArgumentParser(description='CryptoAlert Alert Replay')
+    
+    parser.add_argument('--db', type=str, default=DATABASE_FILE,
+                       help=f'アラートを読み込むデータベース デフォルト: {DATABASE_FILE}')
+    parser.add_argument('--klines', type=str, nargs='+',
+                       help='klineファイル（CSVまたはJSON、未指定時はprice_historyを再生）')
+    parser.add_argument('--ohlc', choices=list(PRICE_ROLLUP_INTERVALS),
+                       help='price_historyの代わりにOHLCロールアップを再生')
+    parser.add_argument('--symbol', type=str,
+                       help='klineファイルの銘柄（未指定時はファイル名から判定）')
+    parser.add_argument('--symbols', type=str,
+                       help='再生する銘柄（カンマ区切り）')
+    parser.add_argument('--since', type=str,
+                       help='price_historyの開始時刻（UTC）例: 2024-05-01')
+    parser.add_argument('--until', type=str,
+                       help='price_historyの終了時刻（UTC、この時刻を含まない）')
+    parser.add_argument('--engine', choices=['index', 'vectorized'], default='index',
+                       help='アラート評価エンジン デフォルト: index')
+    parser.add_argument('--all-alerts', action='store_true',
+                       help='発火済み・停止中のアラートもアクティブとして再生')
+    parser.add_argument('--output-db', type=str,
+                       help='発火結果を書き込んだデータベースのコピーを保存するパス')
+    parser.add_argument('--show', type=int, default=20,
+                       help='表示する発火件数 デフォルト: 20')
+    parser.add_argument('--json', action='store_true',
+                       help='結果をJSONで出力')
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    symbols = [symbol.strip().upper() for symbol in args.symbols.split(',')] if args.symbols else None
+    
+    # 価格系列の読み込み
+    if args.klines:
+        ticks = []
+        for path in args.klines:
+            ticks.extend(load_kline_file(path, args.symbol))
+        if symbols:
+            ticks = [tick for tick in ticks if tick[1] in symbols]
+        ticks.sort(key=lambda tick: tick[0])
+    elif args.ohlc:
+        ticks = load_price_ohlc(args.db, args.ohlc, symbols, args.since, args.until)
+    else:
+        ticks = load_price_history(args.db, symbols, args.since, args.until)
+    
+    # アラートテーブルのコピー上で再生
+    copy_file = args.output_db
+    if copy_file is None:
+        fd, copy_file = tempfile.mkstemp(suffix='.db', prefix='replay-')
+        os.close(fd)
+    try:
+        copy_database(args.db, copy_file, args.all_alerts)
+        # JSON出力を汚さないよう初期化メッセージは標準エラーへ
+        with redirect_stdout(sys.stderr):
+            copy_db = AlertDatabase(copy_file)
+            alerts = copy_db.get_active_alerts()
+            copy_db.close()
+        if symbols:
+            alerts = [alert for alert in alerts if alert['symbol'] in symbols]
+        
+        replay = AlertReplay(alerts, args.engine)
+        summary = replay.run(ticks)
+        replay.write_results(copy_file)
+    finally:
+        if args.output_db is None:
+            os.remove(copy_file)
+    
+    if args.json:
+        print(json.dumps({'summary': summary, 'fires': replay.fires}, indent=2, ensure_ascii=False))
+    else:
+        display_results(summary, replay.fires, args.show)
+        if args.output_db:
+            print(f"💾 結果DB: {args.output_db}")
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ FlaskベースのWeb UI + REST API
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
 from flask_cors import CORS
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+import atexit
 import os
 import json
 from datetime import datetime, timedelta
@@ -32,6 +33,7 @@ login_manager.login_message_category = 'info'
 
 # データベース初期化
 db = AlertDatabase()
+atexit.register(db.close)  # 未書き込みのログイン監査ログを終了時に書き込む
 
 @login_manager.user_loader
 def load_user(user_id):
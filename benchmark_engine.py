@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Engine Benchmark - アラート評価エンジンの性能比較
+従来の1件ずつの評価（AlertDatabase.evaluate_alert）と
+NumPy一括評価（AlertBatch）、発火価格インデックス（TriggerIndex）を比較
+
+監視プロセスと同じく、構築は起動時の1回だけ行い、サイクルごとに
+アラートの差分（追加・削除）の反映と評価、発火したアラートの削除を行う
+（表示するサイクル時間は監視プロセスが毎サイクル負担する時間）
+
+使用方法:
+    python benchmark_engine.py
+    python benchmark_engine.py --sizes 10000,100000 --symbols 400 --cycles 20 --churn 500
+    python benchmark_engine.py --json
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from database_schema import AlertDatabase
+from trigger_index import TriggerIndex
+from vectorized_engine import AlertBatch
+
+# サイクルごとの入力: (価格スナップショット, 追加アラート, 削除アラートID)
+Cycle = Tuple[Dict[str, float], List[Dict], List[int]]
+
+def generate_alerts(count: int, prices: Dict[str, float], rng: random.Random, start_id: int = 1) -> List[Dict]:
+    """ベンチマーク用の合成アラートを生成（get_active_alertsと同じキー構成、基準価格は現在価格の±10%）"""
+    symbols = sorted(prices)
+    alerts = []
+    for alert_id in range(start_id, start_id + count):
+        alert_type = 'rise' if rng.random() < 0.5 else 'fall'
+        threshold = rng.uniform(0.1, 50.0)
+        symbol = rng.choice(symbols)
+        alerts.append({
+            'id': alert_id,
+            'symbol': symbol,
+            'base_price': prices[symbol] * rng.uniform(0.9, 1.1),
+            'threshold_percent': threshold if alert_type == 'rise' else -threshold,
+            'alert_type': alert_type,
+            'email': f"user{alert_id % 10000}@example.com"
+        })
+    return alerts
+
+def generate_prices(symbols: List[str], rng: random.Random) -> Dict[str, float]:
+    """ベンチマーク用の価格スナップショットを生成"""
+    return {symbol: rng.uniform(0.5, 2.0) * 100 for symbol in symbols}
+
+def generate_cycles(cycles: int, churn: int, alert_count: int, prices: Dict[str, float],
+                    volatility: float, rng: random.Random) -> List[Cycle]:
+    """サイクルごとの価格（ランダムウォーク）とアラートの差分（churn件の追加・削除）を生成"""
+    result = []
+    next_id = alert_count + 1
+    for _ in range(cycles):
+        prices = {symbol: price * (1 + rng.gauss(0, volatility) / 100) for symbol, price in prices.items()}
+        upserted = generate_alerts(churn, prices, rng, next_id)
+        removed = [rng.randint(1, next_id - 1) for _ in range(churn)]
+        next_id += churn
+        result.append((prices, upserted, removed))
+    return result
+
+def _result(load_sec: float, update_sec: float, eval_sec: float, cycles: int, triggered: int) -> Dict:
+    """計測結果（差分反映・評価はサイクルあたりの平均）"""
+    cycles = max(cycles, 1)
+    return {'load_sec': load_sec, 'update_sec': update_sec / cycles, 'eval_sec': eval_sec / cycles,
+            'cycle_sec': (update_sec + eval_sec) / cycles, 'triggered': triggered}
+
+def bench_per_alert(alerts: List[Dict], cycles: List[Cycle]) -> Dict:
+    """従来方式: alert_id -> アラートの辞書を1件ずつ評価"""
+    start = time.perf_counter()
+    active = {alert['id']: alert for alert in alerts}
+    load_sec = time.perf_counter() - start
+    
+    update_sec = eval_sec = 0.0
+    triggered = 0
+    for prices, upserted, removed in cycles:
+        start = time.perf_counter()
+        for alert_id in removed:
+            active.pop(alert_id, None)
+        for alert in upserted:
+            active[alert['id']] = alert
+        updated = time.perf_counter()
+        
+        fired = [alert['id'] for alert in active.values()
+                 if AlertDatabase.evaluate_alert(alert, prices[alert['symbol']])['triggered']]
+        for alert_id in fired:
+            del active[alert_id]
+        eval_sec += time.perf_counter() - updated
+        update_sec += updated - start
+        triggered += len(fired)
+    return _result(load_sec, update_sec, eval_sec, len(cycles), triggered)
+
+def bench_vectorized(alerts: List[Dict], cycles: List[Cycle]) -> Dict:
+    """NumPy一括評価: 列配列を1回構築し、サイクルごとに差分を反映して1回のベクトル演算"""
+    start = time.perf_counter()
+    batch = AlertBatch(alerts)
+    load_sec = time.perf_counter() - start
+    
+    update_sec = eval_sec = 0.0
+    triggered = 0
+    for prices, upserted, removed in cycles:
+        start = time.perf_counter()
+        batch.update(upserted, removed)
+        updated = time.perf_counter()
+        
+        current_prices, _, mask = batch.evaluate(prices)
+        candidates = [(batch.alerts[i], float(current_prices[i])) for i in np.flatnonzero(mask)]
+        for alert, _ in candidates:
+            batch.remove(alert['id'])
+        eval_sec += time.perf_counter() - updated
+        update_sec += updated - start
+        triggered += len(candidates)
+    return _result(load_sec, update_sec, eval_sec, len(cycles), triggered)
+
+def bench_index(alerts: List[Dict], cycles: List[Cycle]) -> Dict:
+    """発火価格インデックス: 1回構築し、サイクルごとに差分を反映して銘柄ごとに二分探索"""
+    start = time.perf_counter()
+    index = TriggerIndex()
+    for alert in alerts:
+        index.add(alert)
+    load_sec = time.perf_counter() - start
+    
+    update_sec = eval_sec = 0.0
+    triggered = 0
+    for prices, upserted, removed in cycles:
+        start = time.perf_counter()
+        for alert_id in removed:
+            index.remove(alert_id)
+        for alert in upserted:
+            index.add(alert)
+        updated = time.perf_counter()
+        
+        fired = []
+        for symbol in index.symbols():
+            fired.extend(index.crossed(symbol, prices[symbol]))
+        for alert_id in fired:
+            index.remove(alert_id)
+        eval_sec += time.perf_counter() - updated
+        update_sec += updated - start
+        triggered += len(fired)
+    return _result(load_sec, update_sec, eval_sec, len(cycles), triggered)
+
+ENGINES = {
+    'per_alert': bench_per_alert,
+    'vectorized': bench_vectorized,
+    'index': bench_index,
+}
+
+def run_benchmark(sizes: List[int], symbol_count: int, seed: int, cycle_count: int = 10,
+                  churn: int = 100, volatility: float = 0.5) -> List[Dict]:
+    """各サイズで全エンジンを計測（全エンジンに同じアラート・価格・差分を与える）"""
+    rng = random.Random(seed)
+    symbols = [f"SYM{i:04d}USDT" for i in range(symbol_count)]
+    prices = generate_prices(symbols, rng)
+    
+    results = []
+    for size in sizes:
+        alerts = generate_alerts(size, prices, rng)
+        cycles = generate_cycles(cycle_count, churn, size, prices, volatility, rng)
+        row = {'alerts': size, 'symbols': symbol_count, 'cycles': cycle_count, 'churn': churn}
+        for name, bench in ENGINES.items():
+            row[name] = bench(alerts, cycles)
+        results.append(row)
+        del alerts, cycles
+    return results
+
+def display_results(results: List[Dict]):
+    """結果を表形式で表示"""
+    print("\n" + "=" * 80)
+    print("📊 アラート評価エンジン ベンチマーク")
+    print("=" * 80)
+    print(f"{'アラート数':>12} {'エンジン':>12} {'構築(秒)':>10} {'差分(ms)':>10} {'評価(ms)':>10} "
+          f"{'サイクル(ms)':>12} {'発火':>8}")
+    print("-" * 80)
+    for row in results:
+        for name in ENGINES:
+            result = row[name]
+            print(f"{row['alerts']:>12,} {name:>12} {result['load_sec']:>10.4f} "
+                  f"{result['update_sec'] * 1000:>10.2f} {result['eval_sec'] * 1000:>10.2f} "
+                  f"{result['cycle_sec'] * 1000:>12.2f} {result['triggered']:>8,}")
+        speedup = row['per_alert']['cycle_sec'] / max(row['vectorized']['cycle_sec'], 1e-9)
+        print(f"{'':>12} ⚡ vectorized のサイクル時間は per_alert の 1/{speedup:,.1f} "
+              f"({row['cycles']}サイクル平均, 差分 {row['churn']}件/サイクル)")
+        print("-" * 80)
+
+def parse_arguments():
+    """コマンドライン引数解析"""
+    parser = argparse.ArgumentParser(description='CryptoAlert Engine Benchmark')
+    
+    parser.add_argument('--sizes', type=str, default='10000,100000,1000000',
+                       help='アラート数（カンマ区切り）デフォルト: 10000,100000,1000000')
+    parser.add_argument('--symbols', type=int, default=400,
+                       help='銘柄数 デフォルト: 400')
+    parser.add_argument('--cycles', type=int, default=10,
+                       help='計測するサイクル数 デフォルト: 10')
+    parser.add_argument('--churn', type=int, default=100,
+                       help='サイクルごとに追加・削除するアラート数 デフォルト: 100')
+    parser.add_argument('--volatility', type=float, default=0.5,
+                       help='1サイクルあたりの価格変動率の標準偏差（%%）デフォルト: 0.5')
+    parser.add_argument('--seed', type=int, default=42,
+                       help='乱数シード デフォルト: 42')
+    parser.add_argument('--json', action='store_true',
+                       help='結果をJSONで出力')
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    
+    results = run_benchmark(sizes, args.symbols, args.seed, args.cycles, args.churn, args.volatility)
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        display_results(results)
+
+if __name__ == "__main__":
+    main()
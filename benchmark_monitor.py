@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Monitor Benchmark - 監視パイプライン全体の負荷試験
+一時データベースに合成ユーザー・アラートを作成し、スクリプト化した価格系列と
+送信しないメーラーで CryptoAlertService.run_monitor_cycle を繰り返し実行して
+サイクル時間・DB時間・評価時間・メール作成時間・ピークメモリを計測する
+
+使用方法:
+    python benchmark_monitor.py
+    python benchmark_monitor.py --users 10000 --alerts 200000 --symbols 400 --cycles 20
+    python benchmark_monitor.py --engine vectorized --volatility 0.5 --json > result.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional
+
+from database_schema import AlertDatabase
+from monitor import CryptoAlertService
+from monitor_metrics import SQLITE_SECONDS, ENGINE_EVAL_SECONDS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class ScriptedPriceSource:
+    """銘柄ごとのランダムウォーク価格（乱数シードで再現可能）"""
+    
+    def __init__(self, symbols: List[str], volatility: float, seed: int):
+        self.rng = random.Random(seed)
+        self.volatility = volatility  # 1サイクルあたりの変動率の標準偏差（%）
+        self.prices: Dict[str, float] = {symbol: self.rng.uniform(0.5, 2.0) * 100 for symbol in symbols}
+    
+    def advance(self):
+        """1サイクル分価格を動かす"""
+        for symbol, price in self.prices.items():
+            self.prices[symbol] = price * (1 + self.rng.gauss(0, self.volatility) / 100)
+
+class ScriptedPriceDatabase(AlertDatabase):
+    """Binance APIの代わりにスクリプト化した価格を返すデータベース"""
+    
+    def __init__(self, db_file: str, source: ScriptedPriceSource):
+        self.source = source
+        super().__init__(db_file)
+    
+    def get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        prices = self.source.prices
+        return {symbol: prices[symbol] for symbol in symbols if symbol in prices}
+    
+    def _get_current_price(self, symbol: str) -> Optional[float]:
+        return self.source.prices.get(symbol)
+    
+    def get_24hr_stats(self, symbol: str) -> Optional[Dict]:
+        return self.get_24hr_stats_bulk([symbol]).get(symbol)
+    
+    def get_24hr_stats_bulk(self, symbols: List[str]) -> Dict[str, Dict]:
+        stats = {}
+        for symbol in symbols:
+            price = self.source.prices.get(symbol)
+            if price is None:
+                continue
+            stats[symbol] = {
+                'symbol': symbol, 'priceChange': 0.0, 'priceChangePercent': 0.0,
+                'weightedAvgPrice': price, 'prevClosePrice': price, 'lastPrice': price,
+                'bidPrice': price, 'askPrice': price, 'openPrice': price,
+                'highPrice': price, 'lowPrice': price, 'volume': 0.0, 'quoteVolume': 0.0, 'count': 0
+            }
+        return stats
+
+class NullMailer:
+    """送信せずに件数だけを数えるメーラー（SMTPConnectionPoolの代替）"""
+    
+    def __init__(self):
+        self.stats = {'connections': 0, 'reconnects': 0, 'messages': 0, 'failures': 0}
+    
+    def send_message(self, msg) -> float:
+        msg.as_bytes()  # MIMEのシリアライズまでは実行
+        self.stats['messages'] += 1
+        return 0.0
+    
+    def latency_summary(self) -> Optional[Dict]:
+        return None
+    
+    def close(self):
+        pass
+
+def seed_database(db: AlertDatabase, source: ScriptedPriceSource, users: int, alerts: int,
+                  rng: random.Random) -> Dict:
+    """合成ユーザー・アラートを作成（基準価格は開始時の価格）"""
+    start = time.perf_counter()
+    user_ids = list(db.create_users_bulk([f"user{i}@example.com" for i in range(users)]).values())
+    
+    symbols = list(source.prices)
+    rows = []
+    for i in range(alerts):
+        symbol = rng.choice(symbols)
+        alert_type = 'rise' if rng.random() < 0.5 else 'fall'
+        threshold = round(rng.uniform(0.5, 20.0), 2)
+        rows.append({
+            'user_id': user_ids[i % len(user_ids)],
+            'symbol': symbol,
+            'threshold_percent': threshold if alert_type == 'rise' else -threshold,
+            'alert_type': alert_type,
+            'base_price': source.prices[symbol]
+        })
+    db.create_alerts_bulk(rows)
+    return {'seed_sec': round(time.perf_counter() - start, 4)}
+
+def _peak_rss_mb() -> Optional[float]:
+    """プロセスの最大常駐メモリ（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # LinuxはKB、macOSはバイト
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_benchmark(users: int, alerts: int, symbol_count: int, cycles: int, engine: str,
+                  volatility: float, seed: int, trace_memory: bool = False) -> Dict:
+    """一時データベースで監視サイクルを計測"""
+    rng = random.Random(seed)
+    symbols = [f"SYM{i:04d}USDT" for i in range(symbol_count)]
+    source = ScriptedPriceSource(symbols, volatility, seed)
+    if trace_memory:
+        tracemalloc.start()
+    
+    devnull = open(os.devnull, 'w')
+    with tempfile.TemporaryDirectory(prefix='cryptoalert-bench-') as tmp:
+        with redirect_stdout(devnull):
+            db = ScriptedPriceDatabase(os.path.join(tmp, 'bench.db'), source)
+            setup = seed_database(db, source, users, alerts, rng)
+            service = CryptoAlertService(check_interval=60, engine=engine, db=db)
+        service.smtp_pool = NullMailer()
+        
+        results = []
+        for cycle in range(1, cycles + 1):
+            if cycle > 1:
+                source.advance()
+            sqlite_before = SQLITE_SECONDS.total()[0]
+            eval_before = ENGINE_EVAL_SECONDS.total()[0]
+            
+            with redirect_stdout(devnull):
+                start = time.perf_counter()
+                cycle_stats = service.run_monitor_cycle()
+                cycle_sec = time.perf_counter() - start
+                db_sec = SQLITE_SECONDS.total()[0] - sqlite_before
+                
+                # 発火分のメール作成（送信はNullMailer、送信キューのDB操作を含む）
+                start = time.perf_counter()
+                emails = service.outbox.drain()
+                email_sec = time.perf_counter() - start
+            
+            results.append({
+                'cycle': cycle,
+                'cycle_sec': round(cycle_sec, 6),
+                'db_sec': round(db_sec, 6),
+                'eval_sec': round(ENGINE_EVAL_SECONDS.total()[0] - eval_before, 6),
+                'email_sec': round(email_sec, 6),
+                'processed': cycle_stats['processed'],
+                'triggered': cycle_stats['triggered'],
+                'emails': emails
+            })
+        db.close()
+    devnull.close()
+    
+    traced_peak = None
+    if trace_memory:
+        traced_peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+    
+    # 初回は全件読み込み・インデックス構築を含むため、定常状態は2サイクル目以降で集計
+    steady = results[1:] or results
+    def summarize(key: str) -> Dict:
+        values = sorted(row[key] for row in steady)
+        return {'mean': round(sum(values) / len(values), 6), 'p50': values[len(values) // 2], 'max': values[-1]}
+    
+    return {
+        'config': {'users': users, 'alerts': alerts, 'symbols': symbol_count, 'cycles': cycles,
+                   'engine': engine, 'volatility': volatility, 'seed': seed},
+        'environment': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                        'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'setup': setup,
+        'first_cycle': results[0] if results else None,
+        'steady_state': {key: summarize(key) for key in ('cycle_sec', 'db_sec', 'eval_sec', 'email_sec')} if results else None,
+        'triggered_total': sum(row['triggered'] for row in results),
+        'peak_rss_mb': _peak_rss_mb(),
+        'peak_traced_mb': traced_peak,
+        'cycles': results
+    }
+
+def display_results(result: Dict):
+    """結果を表形式で表示"""
+    config = result['config']
+    print("\n" + "=" * 80)
+    print("📊 監視パイプライン ベンチマーク")
+    print("=" * 80)
+    print(f"👥 ユーザー: {config['users']:,}  ⚡ アラート: {config['alerts']:,}  🪙 銘柄: {config['symbols']:,}  "
+          f"⚙️ エンジン: {config['engine']}")
+    print(f"🗄️ データ作成: {result['setup']['seed_sec']:.2f}秒")
+    print("-" * 80)
+    print(f"{'サイクル':>8} {'全体(秒)':>10} {'DB(秒)':>10} {'評価(秒)':>10} {'メール(秒)':>10} {'処理':>10} {'発火':>8}")
+    for row in result['cycles']:
+        print(f"{row['cycle']:>8} {row['cycle_sec']:>10.4f} {row['db_sec']:>10.4f} {row['eval_sec']:>10.4f} "
+              f"{row['email_sec']:>10.4f} {row['processed']:>10,} {row['triggered']:>8,}")
+    print("-" * 80)
+    steady = result['steady_state']
+    if steady:
+        print(f"⏱️ 定常状態 p50: 全体 {steady['cycle_sec']['p50']:.4f}秒, DB {steady['db_sec']['p50']:.4f}秒, "
+              f"評価 {steady['eval_sec']['p50']:.4f}秒")
+    memory = f"{result['peak_rss_mb']} MB" if result['peak_rss_mb'] is not None else "不明"
+    if result['peak_traced_mb'] is not None:
+        memory += f" (Python割り当て {result['peak_traced_mb']} MB)"
+    print(f"💾 ピークメモリ: {memory}")
+    print("=" * 80)
+
+def parse_arguments():
+    """コマンドライン引数解析"""
+    parser = argparse.ArgumentParser(description='CryptoAlert Monitor Benchmark')
+    
+    parser.add_argument('--users', type=int, default=10000,
+                       help='ユーザー数 デフォルト: 10000')
+    parser.add_argument('--alerts', type=int, default=200000,
+                       help='アラート数 デフォルト: 200000')
+    parser.add_argument('--symbols', type=int, default=400,
+                       help='銘柄数 デフォルト: 400')
+    parser.add_argument('--cycles', type=int, default=10,
+                       help='監視サイクル数 デフォルト: 10')
+    parser.add_argument('--engine', choices=['index', 'vectorized'], default='index',
+                       help='アラート評価エンジン デフォルト: index')
+    parser.add_argument('--volatility', type=float, default=0.3,
+                       help='1サイクルあたりの価格変動率の標準偏差（%%）デフォルト: 0.3')
+    parser.add_argument('--seed', type=int, default=42,
+                       help='乱数シード デフォルト: 42')
+    parser.add_argument('--trace-memory', action='store_true',
+                       help='tracemallocでPythonの割り当てメモリも計測（計測中は遅くなる）')
+    parser.add_argument('--json', action='store_true',
+                       help='結果をJSONで出力')
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    
+    result = run_benchmark(args.users, args.alerts, args.symbols, args.cycles, args.engine,
+                           args.volatility, args.seed, args.trace_memory)
+    
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        display_results(result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Check Scheduler - 発火価格までの距離に応じた優先度付きチェック
+銘柄ごとに「最も近い発火価格までの距離」と「直近のボラティリティ」から
+次回チェック時刻を決め、ヒープで期限の来た銘柄だけを取り出す
+
+距離が近い銘柄は毎サイクル、遠い銘柄はまれにチェックする
+（価格がその距離を動くのに必要な時間を、ボラティリティから安全係数付きで見積もる）
+"""
+
+import heapq
+import math
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_VOLATILITY = 0.05  # 推定前のボラティリティ（%/√秒、保守的な値）
+MIN_VOLATILITY = 0.005  # ボラティリティ推定値の下限（%/√秒）
+VOLATILITY_EWMA_ALPHA = 0.1  # ボラティリティ推定の平滑化係数
+SAFETY_Z = 4.0  # 次回チェックまでに閾値へ届く確率を抑える安全係数（標準偏差の倍数）
+
+class CheckScheduler:
+    """銘柄単位の次回チェック時刻を管理する優先度付きキュー"""
+    
+    def __init__(self, min_interval: float, max_interval: float, safety_z: float = SAFETY_Z):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.safety_z = safety_z
+        
+        self._heap: List = []  # (次回チェック時刻, 銘柄)
+        self._next_check: Dict[str, float] = {}
+        self._floors: Dict[str, float] = {}  # 銘柄ごとの最短チェック間隔（alerts.check_interval）
+        self._alert_intervals: Dict[int, Tuple[str, float]] = {}  # alert_id -> (銘柄, チェック間隔)
+        self._interval_counts: Dict[str, Counter] = {}  # 銘柄 -> チェック間隔ごとのアラート数
+        
+        # ボラティリティ推定（1秒あたりの変動率%の分散をEWMAで推定）
+        self._last_price: Dict[str, float] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._variance: Dict[str, float] = {}
+        
+        self.stats = {'checked': 0, 'deferred': 0}
+    
+    def __len__(self) -> int:
+        return len(self._next_check)
+    
+    def add_alert(self, alert_id: int, symbol: str, interval: Optional[float]):
+        """アラートのcheck_intervalを銘柄の最短チェック間隔に反映（更新時は置き換え）"""
+        self.remove_alert(alert_id)
+        interval = max(self.min_interval, float(interval or self.min_interval))
+        self._alert_intervals[alert_id] = (symbol, interval)
+        self._interval_counts.setdefault(symbol, Counter())[interval] += 1
+        self._update_floor(symbol)
+    
+    def remove_alert(self, alert_id: int):
+        """停止・発火したアラートを外し、残りのアラートから最短チェック間隔を計算し直す"""
+        entry = self._alert_intervals.pop(alert_id, None)
+        if entry is None:
+            return
+        symbol, interval = entry
+        counts = self._interval_counts.get(symbol)
+        if counts is None:
+            return
+        counts[interval] -= 1
+        if counts[interval] <= 0:
+            del counts[interval]
+        self._update_floor(symbol)
+    
+    def _update_floor(self, symbol: str):
+        """銘柄の最短チェック間隔（チェック間隔の種類数だけの計算）"""
+        counts = self._interval_counts.get(symbol)
+        if counts:
+            self._floors[symbol] = min(counts)
+        else:
+            self._interval_counts.pop(symbol, None)
+            self._floors.pop(symbol, None)
+    
+    def wake(self, symbol: str):
+        """次のサイクルでチェックさせる（アラート追加・更新時）"""
+        self._push(symbol, 0.0)
+    
+    def forget(self, symbol: str):
+        """アラートがなくなった銘柄を削除"""
+        for table in (self._next_check, self._floors, self._interval_counts, self._last_price, self._last_seen,
+                      self._variance):
+            table.pop(symbol, None)
+    
+    def due(self, symbols: Iterable[str], now: Optional[float] = None) -> Set[str]:
+        """チェック時刻が来た銘柄（未スケジュールの銘柄を含む）"""
+        now = time.monotonic() if now is None else now
+        symbols = set(symbols)
+        
+        # サイクル間隔の揺らぎで1サイクル遅れないよう、半サイクル先までを期限とみなす
+        horizon = now + self.min_interval / 2
+        due = {symbol for symbol in symbols if symbol not in self._next_check}
+        while self._heap and self._heap[0][0] <= horizon:
+            check_at, symbol = heapq.heappop(self._heap)
+            # 再スケジュール済み・削除済みの古いエントリは無視
+            if self._next_check.get(symbol) != check_at:
+                continue
+            if symbol in symbols:
+                due.add(symbol)
+            else:
+                self.forget(symbol)
+        
+        self.stats['checked'] += len(due)
+        self.stats['deferred'] += len(symbols) - len(due)
+        return due
+    
+    def volatility(self, symbol: str) -> float:
+        """銘柄のボラティリティ推定値（%/√秒）"""
+        variance = self._variance.get(symbol)
+        if variance is None:
+            return DEFAULT_VOLATILITY
+        return max(MIN_VOLATILITY, math.sqrt(variance))
+    
+    def observe(self, symbol: str, price: float, now: Optional[float] = None):
+        """価格を観測してボラティリティ推定を更新"""
+        now = time.monotonic() if now is None else now
+        last_price = self._last_price.get(symbol)
+        last_seen = self._last_seen.get(symbol)
+        
+        if last_price and last_seen is not None and now > last_seen:
+            change = (price - last_price) / last_price * 100
+            sample = change * change / (now - last_seen)
+            previous = self._variance.get(symbol)
+            self._variance[symbol] = sample if previous is None else (
+                VOLATILITY_EWMA_ALPHA * sample + (1 - VOLATILITY_EWMA_ALPHA) * previous)
+        
+        self._last_price[symbol] = price
+        self._last_seen[symbol] = now
+    
+    def interval_for(self, symbol: str, distance_percent: float) -> float:
+        """発火価格までの距離（%）から次回チェックまでの秒数を計算"""
+        floor = self._floors.get(symbol, self.min_interval)
+        if distance_percent <= 0:
+            return floor
+        
+        # 距離 = z × σ × √t となる時間t（σは%/√秒）
+        seconds = (distance_percent / (self.safety_z * self.volatility(symbol))) ** 2
+        return min(self.max_interval, max(floor, seconds))
+    
+    def schedule(self, symbol: str, price: Optional[float], distance_percent: Optional[float],
+                 now: Optional[float] = None) -> float:
+        """チェック結果から次回チェック時刻を設定し、間隔（秒）を返す
+        
+        価格が取得できなかった銘柄は最短間隔で再チェック
+        """
+        now = time.monotonic() if now is None else now
+        if price is None or distance_percent is None:
+            interval = self._floors.get(symbol, self.min_interval)
+        else:
+            self.observe(symbol, price, now)
+            interval = self.interval_for(symbol, distance_percent)
+        
+        self._push(symbol, now + interval)
+        return interval
+    
+    def _push(self, symbol: str, check_at: float):
+        """ヒープに登録（古いエントリは取り出し時に無視）"""
+        self._next_check[symbol] = check_at
+        heapq.heappush(self._heap, (check_at, symbol))
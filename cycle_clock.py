@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Cycle Clock - 固定レートの監視サイクルスケジューラ
+サイクル開始時刻を monotonic 時計上の格子（開始時刻 + k × check_interval）に固定し、
+サイクル終了後に「次の格子点まで」だけ待機する（処理時間の分だけ周期が延びない）
+
+サイクルが間隔を超えた場合（オーバーラン）の扱い:
+    compact: 取りこぼした格子点を1回にまとめて直ちに次のサイクルを実行
+    skip:    取りこぼした格子点は実行せず、次の格子点まで待機
+"""
+
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from monitor_metrics import CYCLE_LAG_SECONDS, CYCLE_OVERRUNS
+
+OVERRUN_POLICIES = ('compact', 'skip')
+JITTER_SAMPLE_SIZE = 1000  # ジッター統計に使う直近サイクル数
+
+class FixedRateClock:
+    """check_interval 間隔の格子点でサイクルを開始させる時計"""
+    
+    def __init__(self, interval: float, overrun_policy: str = 'compact'):
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"不明なオーバーランポリシー: {overrun_policy}")
+        self.interval = interval
+        self.overrun_policy = overrun_policy
+        
+        self._origin: Optional[float] = None  # 格子の基準時刻
+        self._tick = 0  # 現在サイクルの格子番号
+        self._jitters = deque(maxlen=JITTER_SAMPLE_SIZE)
+        self.stats = {'ticks': 0, 'overruns': 0, 'skipped_ticks': 0, 'compacted_ticks': 0}
+    
+    def scheduled_at(self, tick: int) -> float:
+        """格子番号の予定時刻（monotonic）"""
+        return self._origin + tick * self.interval
+    
+    def begin(self, now: Optional[float] = None) -> float:
+        """サイクル開始を記録し、予定時刻からの遅れ（ジッター、秒）を返す"""
+        now = time.monotonic() if now is None else now
+        if self._origin is None:
+            self._origin = now
+            self._tick = 0
+        
+        jitter = max(0.0, now - self.scheduled_at(self._tick))
+        self._jitters.append(jitter)
+        self.stats['ticks'] += 1
+        CYCLE_LAG_SECONDS.observe(jitter)
+        return jitter
+    
+    def end(self, now: Optional[float] = None) -> float:
+        """サイクル終了を記録し、次のサイクル開始までの待機秒数を返す"""
+        now = time.monotonic() if now is None else now
+        next_tick = self._tick + 1
+        
+        if self.scheduled_at(next_tick) <= now:
+            # オーバーラン: 現在時刻までに過ぎた最後の格子点
+            passed = int(math.floor((now - self._origin) / self.interval))
+            missed = passed - self._tick
+            self.stats['overruns'] += 1
+            CYCLE_OVERRUNS.inc()
+            if self.overrun_policy == 'compact':
+                # 過ぎた格子点をまとめて1回だけ直ちに実行
+                next_tick = passed
+                self.stats['compacted_ticks'] += missed - 1
+            else:
+                next_tick = passed + 1
+                self.stats['skipped_ticks'] += missed
+        
+        self._tick = next_tick
+        return max(0.0, self.scheduled_at(next_tick) - now)
+    
+    def jitter_summary(self) -> str:
+        """ジッターの要約（p50/p95/max）"""
+        if not self._jitters:
+            return "なし"
+        jitters = sorted(self._jitters)
+        p50 = jitters[len(jitters) // 2]
+        p95 = jitters[min(len(jitters) - 1, int(len(jitters) * 0.95))]
+        return f"p50={p50 * 1000:.0f}ms p95={p95 * 1000:.0f}ms max={jitters[-1] * 1000:.0f}ms"
@@ -9,14 +9,44 @@ import hashlib
 import secrets
 import requests
 import time
+import threading
 import bcrypt
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Set, Tuple
 from flask_login import UserMixin
 import json
 
+from monitor_metrics import SQLITE_SECONDS
+from sqlite_pool import SQLiteConnectionPool
+from schema_migrations import SCHEMA_VERSION, get_schema_version, migrate
+from market_data import MarketDataProvider, get_market_data_provider, BINANCE_API_URL
+from login_limiter import LoginRateLimiter, LoginAuditWriter, LoginAttempt, LOGIN_AUDIT_RETENTION_DAYS, LOGIN_WINDOW_SECONDS
+
 DATABASE_FILE = "crypto_alerts.db"
-BINANCE_API_URL = "https://api.binance.com/api/v3"
+BULK_PRICE_SYMBOL_LIMIT = 100  # これを超える銘柄数は全銘柄ティッカーで取得
+OUTBOX_MAX_ATTEMPTS = 5  # メール送信の最大試行回数
+OUTBOX_MAX_AGE_HOURS = 24  # これより古い未送信アラートは送信しない
+ALERT_CHANGE_RETENTION_HOURS = 24  # アラート変更ログの保持時間
+CHANGE_QUERY_CHUNK_SIZE = 500  # IN句1回あたりのID数
+PRICE_WRITE_MIN_CHANGE = 0.0005  # これ未満の価格変化率（0.05%）は現在価格を書き込まない
+PRICE_WRITE_MAX_AGE = 300  # 変化がなくてもこの秒数ごとには書き込む（last_checkedの鮮度）
+PRICE_HISTORY_RETENTION_HOURS = 48  # price_history（生の価格）の保持時間
+# OHLCロールアップ: 間隔 -> (秒数, バケット開始時刻の書式, 集計元テーブル)
+PRICE_ROLLUP_INTERVALS = {
+    '1m': (60, '%Y-%m-%d %H:%M:00', 'price_history'),
+    '1h': (3600, '%Y-%m-%d %H:00:00', 'price_ohlc_1m'),
+    '1d': (86400, '%Y-%m-%d 00:00:00', 'price_ohlc_1h'),
+}
+PRICE_OHLC_RETENTION_DAYS = {'1m': 30, '1h': 730, '1d': 0}  # 0は無期限
+# get_statisticsのキー -> stat_countersのカウンター名（schema_migrations.pyのトリガーが更新）
+STAT_COUNTER_NAMES = {
+    'active_users': 'active_users',
+    'registered_users': 'registered_users',
+    'active_alerts': 'active_alerts',
+    'triggered_alerts': 'triggered_alerts',
+    'rise_alerts': 'active_rise_alerts',
+    'fall_alerts': 'active_fall_alerts',
+}
 
 class User(UserMixin):
     def __init__(self, user_data):
@@ -44,176 +74,44 @@ class User(UserMixin):
         return False
     
 class AlertDatabase:
-    def __init__(self, db_file: str = DATABASE_FILE):
+    def __init__(self, db_file: str = DATABASE_FILE, market_data: Optional[MarketDataProvider] = None):
         self.db_file = db_file
+        # 長寿命の接続（WAL・書き込み1接続 + スレッドごとの読み込み接続）
+        self.pool = SQLiteConnectionPool(db_file)
+        
+        # 市場データの取得元（既定は環境変数で選ぶプロセス共通のプロバイダー）
+        self.market_data = market_data or get_market_data_provider()
+        
+        # 現在価格の書き込みバッファ（サイクル終了時にflush_price_updatesで一括書き込み）
+        self._price_lock = threading.Lock()
+        self._alert_price_buffer: Dict[int, float] = {}
+        self._symbol_price_buffer: Dict[str, float] = {}
+        self._written_prices: Dict = {}  # alert_id / 銘柄 -> (書き込んだ価格, 時刻)
+        
+        # 価格履歴の書き込みバッファ（サイクルごとの価格スナップショット）
+        self.record_price_history = True
+        self._history_buffer: List[Tuple[str, float, str]] = []
+        
+        # ログイン失敗のスライディングウィンドウ（メモリ上で判定）と監査ログの非同期書き込み
+        self.login_limiter = LoginRateLimiter()
+        self.login_audit = LoginAuditWriter(self.write_login_attempts, self.prune_login_attempts)
+        self._login_load_lock = threading.Lock()
+        
         self.init_database()
     
+    def close(self):
+        """未書き込みのログイン監査ログを書き込み、プールしている接続を閉じる"""
+        self.login_audit.close()
+        self.pool.close()
+    
     def init_database(self):
-        """データベースとテーブルを初期化"""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("PRAGMA foreign_keys = ON")
-            
-            # ユーザーテーブル（認証機能追加）
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email VARCHAR(255) UNIQUE NOT NULL,
-                    email_hash VARCHAR(64) NOT NULL,
-                    password_hash VARCHAR(255),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP,
-                    is_active BOOLEAN DEFAULT 1,
-                    is_registered BOOLEAN DEFAULT 0,
-                    daily_alert_count INTEGER DEFAULT 0,
-                    plan VARCHAR(20) DEFAULT 'free',
-                    unsubscribe_token VARCHAR(64) UNIQUE
-                )
-            """)
-            
-            # 既存usersテーブルに新しいカラムを追加
-            try:
-                conn.execute("ALTER TABLE users ADD COLUMN password_hash VARCHAR(255)")
-                print("✅ password_hashカラムを追加しました")
-            except sqlite3.OperationalError:
-                pass
-            
-            try:
-                conn.execute("ALTER TABLE users ADD COLUMN is_registered BOOLEAN DEFAULT 0")
-                print("✅ is_registeredカラムを追加しました")
-            except sqlite3.OperationalError:
-                pass
-            
-            try:
-                conn.execute("ALTER TABLE users ADD COLUMN last_login TIMESTAMP")
-                print("✅ last_loginカラムを追加しました")
-            except sqlite3.OperationalError:
-                pass
-            
-            # アラートテーブル（下落率対応）
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS alerts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    symbol VARCHAR(20) NOT NULL,
-                    base_symbol VARCHAR(10) NOT NULL,
-                    threshold_percent DECIMAL(5,2) NOT NULL,
-                    alert_type VARCHAR(10) NOT NULL DEFAULT 'rise',
-                    base_price DECIMAL(15,8) NOT NULL,
-                    current_price DECIMAL(15,8),
-                    status VARCHAR(20) DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    triggered_at TIMESTAMP,
-                    last_checked TIMESTAMP,
-                    check_interval INTEGER DEFAULT 60,
-                    alert_token VARCHAR(64) UNIQUE,
-                    metadata TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-                )
-            """)
-            
-            # 既存テーブルにalert_typeカラムを追加（存在しない場合）
-            try:
-                conn.execute("ALTER TABLE alerts ADD COLUMN alert_type VARCHAR(10) DEFAULT 'rise'")
-                print("✅ alert_typeカラムを追加しました")
-            except sqlite3.OperationalError:
-                pass
-            
-            # アラート履歴テーブル（下落率対応）
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS alert_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    alert_id INTEGER NOT NULL,
-                    user_email VARCHAR(255) NOT NULL,
-                    symbol VARCHAR(20) NOT NULL,
-                    threshold_percent DECIMAL(5,2) NOT NULL,
-                    alert_type VARCHAR(10) NOT NULL DEFAULT 'rise',
-                    base_price DECIMAL(15,8) NOT NULL,
-                    trigger_price DECIMAL(15,8) NOT NULL,
-                    price_change DECIMAL(5,2) NOT NULL,
-                    triggered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    email_sent BOOLEAN DEFAULT 0,
-                    email_sent_at TIMESTAMP,
-                    FOREIGN KEY (alert_id) REFERENCES alerts (id) ON DELETE CASCADE
-                )
-            """)
-            
-            # 既存履歴テーブルにalert_typeカラムを追加
-            try:
-                conn.execute("ALTER TABLE alert_history ADD COLUMN alert_type VARCHAR(10) DEFAULT 'rise'")
-                print("✅ alert_history.alert_typeカラムを追加しました")
-            except sqlite3.OperationalError:
-                pass
-            
-            # システム設定テーブル
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS system_config (
-                    key VARCHAR(100) PRIMARY KEY,
-                    value TEXT NOT NULL,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # 価格履歴テーブル（オプション：分析用）
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS price_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    symbol VARCHAR(20) NOT NULL,
-                    price DECIMAL(15,8) NOT NULL,
-                    volume DECIMAL(20,2),
-                    market_cap DECIMAL(20,2),
-                    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # ログイン試行履歴テーブル（新規追加）
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS login_attempts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email VARCHAR(255) NOT NULL,
-                    ip_address VARCHAR(45),
-                    success BOOLEAN DEFAULT 0,
-                    attempted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # インデックス作成
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_status ON alerts(status)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_user_id ON alerts(user_id)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_symbol ON alerts(symbol)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts(alert_type)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_price_history_symbol ON price_history(symbol, recorded_at)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_login_attempts_email ON login_attempts(email, attempted_at)")
-            
-            # 初期システム設定
-            self._insert_default_config(conn)
-            
-            conn.commit()
+        """スキーマを最新バージョンにする（最新ならバージョンの確認だけ）"""
+        with self.pool.writer() as conn:
+            if get_schema_version(conn) >= SCHEMA_VERSION:
+                return
+            migrate(conn)
             print("✅ データベース初期化完了（認証機能対応）")
     
-    def _insert_default_config(self, conn):
-        """デフォルト設定を挿入"""
-        default_configs = [
-            ('free_daily_limit', '5'),
-            ('paid_daily_limit', '100'),
-            ('max_alerts_per_user', '20'),
-            ('min_threshold_percent', '0.1'),
-            ('max_threshold_percent', '50.0'),
-            ('check_interval_seconds', '60'),
-            ('email_cooldown_minutes', '5'),
-            ('min_fall_threshold', '-50.0'),
-            ('max_rise_threshold', '50.0'),
-            ('max_login_attempts', '5'),
-            ('login_lockout_minutes', '30')
-        ]
-        
-        for key, value in default_configs:
-            conn.execute("""
-                INSERT OR IGNORE INTO system_config (key, value) 
-                VALUES (?, ?)
-            """, (key, value))
-    
     # ==================== 認証関連メソッド ====================
     
     def hash_password(self, password: str) -> str:
@@ -240,7 +138,7 @@ class AlertDatabase:
         password_hash = self.hash_password(password)
         unsubscribe_token = secrets.token_urlsafe(32)
         
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.writer() as conn:
             cursor = conn.execute("""
                 INSERT INTO users (email, email_hash, password_hash, is_registered, unsubscribe_token)
                 VALUES (?, ?, ?, 1, ?)
@@ -262,7 +160,7 @@ class AlertDatabase:
         email = email.lower().strip()
         
         # ログイン試行回数チェック
-        if self._is_login_locked(email):
+        if self._is_login_locked(email, ip_address):
             raise ValueError("ログイン試行回数が上限に達しました。30分後に再試行してください。")
         
         # ユーザー取得
@@ -284,7 +182,7 @@ class AlertDatabase:
     
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """メールアドレスでユーザーを取得"""
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.reader() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.execute("""
                 SELECT * FROM users WHERE email = ? AND is_active = 1
@@ -295,7 +193,7 @@ class AlertDatabase:
     
     def get_user_by_id(self, user_id: int) -> Optional[User]:
         """IDでユーザーを取得（Flask-Login用）"""
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.reader() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.execute("""
                 SELECT * FROM users WHERE id = ? AND is_active = 1
@@ -305,29 +203,51 @@ class AlertDatabase:
             return User(dict(result)) if result else None
     
     def _log_login_attempt(self, email: str, success: bool, ip_address: str = None):
-        """ログイン試行を記録"""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.execute("""
-                INSERT INTO login_attempts (email, ip_address, success)
-                VALUES (?, ?, ?)
-            """, (email, ip_address, success))
-            conn.commit()
+        """ログイン試行を記録（監査ログはバックグラウンドでまとめて書き込む）"""
+        if not success:
+            self.login_limiter.record_failure(email, ip_address)
+        self.login_audit.record(email, ip_address, success)
     
-    def _is_login_locked(self, email: str) -> bool:
-        """ログインがロックされているかチェック"""
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.execute("""
-                SELECT COUNT(*) FROM login_attempts 
-                WHERE email = ? AND success = 0 
-                AND attempted_at > datetime('now', '-30 minutes')
-            """, (email,))
-            
-            failed_attempts = cursor.fetchone()[0]
-            return failed_attempts >= 5
+    def _is_login_locked(self, email: str, ip_address: str = None) -> bool:
+        """ログインがロックされているかチェック（メールアドレス別・IPアドレス別）"""
+        if not self.login_limiter.loaded:
+            self._load_login_failures()
+        return self.login_limiter.is_locked(email, ip_address)
+    
+    def _load_login_failures(self):
+        """直近の失敗をlogin_attemptsから読み込む（プロセス起動後の初回のみ）"""
+        with self._login_load_lock:
+            if self.login_limiter.loaded:
+                return
+            with self.pool.reader() as conn:
+                cursor = conn.execute("""
+                    SELECT email, ip_address, (julianday('now') - julianday(attempted_at)) * 86400
+                    FROM login_attempts
+                    WHERE attempted_at > datetime('now', ?) AND success = 0
+                    ORDER BY attempted_at
+                """, (f"-{LOGIN_WINDOW_SECONDS} seconds",))
+                failures = cursor.fetchall()
+            self.login_limiter.load(failures)
+    
+    @SQLITE_SECONDS.time(operation='write_login_attempts')
+    def write_login_attempts(self, attempts: List[LoginAttempt]):
+        """ログイン試行をまとめて書き込む"""
+        with self.pool.writer() as conn:
+            conn.executemany("""
+                INSERT INTO login_attempts (email, ip_address, success, attempted_at)
+                VALUES (?, ?, ?, ?)
+            """, attempts)
+    
+    def prune_login_attempts(self, retention_days: int = LOGIN_AUDIT_RETENTION_DAYS) -> int:
+        """保持期間を過ぎたログイン試行を削除"""
+        with self.pool.writer() as conn:
+            return conn.execute("""
+                DELETE FROM login_attempts WHERE attempted_at < datetime('now', ?)
+            """, (f"-{retention_days} days",)).rowcount
     
     def _update_last_login(self, user_id: int):
         """最終ログイン時刻を更新"""
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.writer() as conn:
             conn.execute("""
                 UPDATE users SET last_login = CURRENT_TIMESTAMP 
                 WHERE id = ?
@@ -342,7 +262,7 @@ class AlertDatabase:
         email_hash = hashlib.sha256(email.encode()).hexdigest()
         unsubscribe_token = secrets.token_urlsafe(32)
         
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.writer() as conn:
             cursor = conn.execute("""
                 INSERT INTO users (email, email_hash, unsubscribe_token, is_registered)
                 VALUES (?, ?, ?, 0)
@@ -357,7 +277,7 @@ class AlertDatabase:
         """ユーザーを取得または作成"""
         email = email.lower().strip()
         
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.writer() as conn:
             cursor = conn.execute("SELECT id FROM users WHERE email = ?", (email,))
             result = cursor.fetchone()
             
@@ -408,7 +328,7 @@ class AlertDatabase:
         
         alert_token = secrets.token_urlsafe(32)
         
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.writer() as conn:
             # 制限チェック
             if not self._check_user_limits(conn, user_id):
                 raise ValueError("アラート作成制限に達しています")
@@ -443,9 +363,62 @@ class AlertDatabase:
                 'status': 'active'
             }
     
+    def create_users_bulk(self, emails: List[str]) -> Dict[str, int]:
+        """複数ユーザーを1トランザクションで作成（インポート・負荷試験用）
+        
+        戻り値: メールアドレス -> ユーザーID（既存ユーザーを含む）
+        """
+        emails = sorted({email.lower().strip() for email in emails})
+        
+        with self.pool.writer() as conn:
+            conn.executemany("""
+                INSERT OR IGNORE INTO users (email, email_hash, unsubscribe_token, is_registered)
+                VALUES (?, ?, ?, 0)
+            """, [(email, hashlib.sha256(email.encode()).hexdigest(), secrets.token_urlsafe(32))
+                  for email in emails])
+            conn.commit()
+            
+            user_ids = {}
+            for start in range(0, len(emails), CHANGE_QUERY_CHUNK_SIZE):
+                chunk = emails[start:start + CHANGE_QUERY_CHUNK_SIZE]
+                cursor = conn.execute(f"""
+                    SELECT email, id FROM users WHERE email IN ({','.join('?' * len(chunk))})
+                """, chunk)
+                user_ids.update(cursor.fetchall())
+            return user_ids
+    
+    def create_alerts_bulk(self, alerts: List[Dict]) -> int:
+        """基準価格指定済みのアラートを1トランザクションで作成（インポート・負荷試験用）
+        
+        alertsの各要素: user_id, symbol, threshold_percent, alert_type, base_price
+        シンボル検証・価格取得・作成数制限は行わない
+        """
+        rows = []
+        for alert in alerts:
+            alert_type = alert.get('alert_type') or 'rise'
+            if alert_type not in ('rise', 'fall'):
+                raise ValueError(f"無効なアラートタイプ: {alert_type} (rise または fall を指定してください)")
+            
+            symbol = alert['symbol'].upper()
+            if not symbol.endswith('USDT'):
+                symbol += 'USDT'
+            rows.append((alert['user_id'], symbol, symbol.replace('USDT', ''), alert['threshold_percent'],
+                         alert_type, alert['base_price'], alert['base_price'], secrets.token_urlsafe(32)))
+        
+        with self.pool.writer() as conn:
+            conn.executemany("""
+                INSERT INTO alerts 
+                (user_id, symbol, base_symbol, threshold_percent, alert_type, base_price, 
+                 current_price, alert_token, last_checked)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, rows)
+            conn.commit()
+        return len(rows)
+    
+    @SQLITE_SECONDS.time(operation='get_active_alerts')
     def get_active_alerts(self) -> List[Dict]:
         """アクティブなアラート一覧を取得"""
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.reader() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.execute("""
                 SELECT a.*, u.email, u.unsubscribe_token
@@ -465,9 +438,130 @@ class AlertDatabase:
             
             return alerts
     
+    @SQLITE_SECONDS.time(operation='get_alert_change_seq')
+    def get_alert_change_seq(self) -> int:
+        """アラート変更ログの最新シーケンス番号"""
+        with self.pool.reader() as conn:
+            cursor = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM alert_changes")
+            return cursor.fetchone()[0]
+    
+    @SQLITE_SECONDS.time(operation='get_alert_changes')
+    def get_alert_changes(self, since_seq: int) -> Tuple[int, Set[int], Set[int]]:
+        """指定シーケンス以降に変更されたアラートIDとユーザーIDを取得
+        
+        戻り値: (最新シーケンス番号, アラートID集合, ユーザーID集合)
+        """
+        with self.pool.reader() as conn:
+            cursor = conn.execute("""
+                SELECT seq, alert_id, user_id FROM alert_changes 
+                WHERE seq > ? ORDER BY seq
+            """, (since_seq,))
+            
+            latest_seq = since_seq
+            alert_ids, user_ids = set(), set()
+            for seq, alert_id, user_id in cursor:
+                latest_seq = seq
+                if alert_id is not None:
+                    alert_ids.add(alert_id)
+                if user_id is not None:
+                    user_ids.add(user_id)
+            
+            return latest_seq, alert_ids, user_ids
+    
+    @SQLITE_SECONDS.time(operation='get_active_alerts_for')
+    def get_active_alerts_for(self, alert_ids: Set[int], user_ids: Set[int]) -> List[Dict]:
+        """指定アラートID・ユーザーIDのアクティブアラートだけを取得（差分更新用）"""
+        alerts = []
+        with self.pool.reader() as conn:
+            conn.row_factory = sqlite3.Row
+            for column, ids in (('a.id', sorted(alert_ids)), ('a.user_id', sorted(user_ids))):
+                for i in range(0, len(ids), CHANGE_QUERY_CHUNK_SIZE):
+                    chunk = ids[i:i + CHANGE_QUERY_CHUNK_SIZE]
+                    cursor = conn.execute(f"""
+                        SELECT a.*, u.email, u.unsubscribe_token
+                        FROM alerts a
+                        JOIN users u ON a.user_id = u.id
+                        WHERE a.status = 'active' AND u.is_active = 1
+                          AND {column} IN ({','.join('?' * len(chunk))})
+                    """, chunk)
+                    
+                    for row in cursor.fetchall():
+                        alert = dict(row)
+                        if not alert.get('alert_type'):
+                            alert['alert_type'] = 'rise'
+                        alerts.append(alert)
+        
+        return alerts
+    
+    def prune_alert_changes(self, retention_hours: int = ALERT_CHANGE_RETENTION_HOURS) -> int:
+        """古いアラート変更ログを削除"""
+        with self.pool.writer() as conn:
+            cursor = conn.execute("""
+                DELETE FROM alert_changes WHERE changed_at < datetime('now', ?)
+            """, (f"-{retention_hours} hours",))
+            conn.commit()
+            return cursor.rowcount
+    
+    # ==================== 監視ワーカー・シャードリース ====================
+    
+    def heartbeat_monitor_worker(self, worker_id: str, hostname: str, pid: int):
+        """監視ワーカーの生存を記録"""
+        with self.pool.writer() as conn:
+            conn.execute("""
+                INSERT INTO monitor_workers (worker_id, hostname, pid)
+                VALUES (?, ?, ?)
+                ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = CURRENT_TIMESTAMP
+            """, (worker_id, hostname, pid))
+            conn.commit()
+    
+    def get_live_monitor_workers(self, ttl_seconds: int) -> List[str]:
+        """ハートビートが有効な監視ワーカーID一覧"""
+        with self.pool.reader() as conn:
+            cursor = conn.execute("""
+                SELECT worker_id FROM monitor_workers 
+                WHERE heartbeat_at > datetime('now', ?)
+                ORDER BY worker_id
+            """, (f"-{ttl_seconds} seconds",))
+            return [row[0] for row in cursor.fetchall()]
+    
+    @SQLITE_SECONDS.time(operation='acquire_shard_leases')
+    def acquire_shard_leases(self, worker_id: str, shards: List[int], lease_seconds: int) -> Set[int]:
+        """シャードのリースを取得・更新し、保持しているシャードを返す
+        
+        空き・期限切れ・自分が保持しているシャードだけを取得できる
+        """
+        with self.pool.writer() as conn:
+            conn.executemany("""
+                INSERT INTO monitor_leases (shard, worker_id, expires_at)
+                VALUES (?, ?, datetime('now', ?))
+                ON CONFLICT(shard) DO UPDATE SET 
+                    worker_id = excluded.worker_id, expires_at = excluded.expires_at
+                WHERE monitor_leases.worker_id = excluded.worker_id
+                   OR monitor_leases.expires_at < CURRENT_TIMESTAMP
+            """, [(shard, worker_id, f"+{lease_seconds} seconds") for shard in shards])
+            conn.commit()
+            
+            cursor = conn.execute("""
+                SELECT shard FROM monitor_leases 
+                WHERE worker_id = ? AND expires_at > CURRENT_TIMESTAMP
+            """, (worker_id,))
+            return {row[0] for row in cursor.fetchall()}
+    
+    def release_shard_leases(self, worker_id: str, shards: Optional[List[int]] = None):
+        """シャードのリースを解放（shards省略時は全シャード）"""
+        with self.pool.writer() as conn:
+            if shards is None:
+                conn.execute("DELETE FROM monitor_leases WHERE worker_id = ?", (worker_id,))
+                conn.execute("DELETE FROM monitor_workers WHERE worker_id = ?", (worker_id,))
+            else:
+                conn.executemany("""
+                    DELETE FROM monitor_leases WHERE shard = ? AND worker_id = ?
+                """, [(shard, worker_id) for shard in shards])
+            conn.commit()
+    
     def get_user_alerts(self, email: str) -> List[Dict]:
         """特定ユーザーのアラート一覧を取得"""
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.reader() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.execute("""
                 SELECT a.*, u.email
@@ -488,7 +582,7 @@ class AlertDatabase:
     
     def update_alert_price(self, alert_id: int, current_price: float):
         """アラートの現在価格を更新"""
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.writer() as conn:
             conn.execute("""
                 UPDATE alerts 
                 SET current_price = ?, last_checked = CURRENT_TIMESTAMP
@@ -496,41 +590,278 @@ class AlertDatabase:
             """, (current_price, alert_id))
             conn.commit()
     
-    def trigger_alert(self, alert_id: int, trigger_price: float, price_change: float, alert_type: str = 'rise'):
-        """アラートをトリガー状態にする"""
-        with sqlite3.connect(self.db_file) as conn:
-            # アラートステータス更新
+    def buffer_alert_price(self, alert_id: int, current_price: float):
+        """アラートの現在価格を書き込みバッファに追加"""
+        with self._price_lock:
+            self._alert_price_buffer[alert_id] = current_price
+    
+    def buffer_symbol_prices(self, prices: Dict[str, float]):
+        """銘柄単位の現在価格を書き込みバッファに追加（価格履歴にもスナップショットとして記録）"""
+        recorded_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        with self._price_lock:
+            self._symbol_price_buffer.update(prices)
+            if self.record_price_history:
+                self._history_buffer.extend((symbol, price, recorded_at) for symbol, price in prices.items())
+    
+    def pending_price_writes(self) -> int:
+        """書き込みバッファ内の件数"""
+        with self._price_lock:
+            return len(self._alert_price_buffer) + len(self._symbol_price_buffer) + len(self._history_buffer)
+    
+    def _needs_price_write(self, key, price: float, now: float) -> bool:
+        """前回書き込んだ価格から意味のある変化があるか（または書き込みが古いか）"""
+        written = self._written_prices.get(key)
+        if written is None:
+            return True
+        written_price, written_at = written
+        if now - written_at >= PRICE_WRITE_MAX_AGE or not written_price:
+            return True
+        return abs(price - written_price) / written_price >= PRICE_WRITE_MIN_CHANGE
+    
+    @SQLITE_SECONDS.time(operation='flush_price_updates')
+    def flush_price_updates(self) -> int:
+        """バッファした現在価格・価格履歴を1トランザクションで書き込み、更新したアラート価格の件数を返す
+        
+        前回書き込みから価格がほとんど変わっていない行は省略する（価格履歴は全件記録）
+        """
+        with self._price_lock:
+            alert_prices, self._alert_price_buffer = self._alert_price_buffer, {}
+            symbol_prices, self._symbol_price_buffer = self._symbol_price_buffer, {}
+            history_rows, self._history_buffer = self._history_buffer, []
+        
+        now = time.monotonic()
+        alert_rows = [(price, alert_id) for alert_id, price in alert_prices.items()
+                      if self._needs_price_write(alert_id, price, now)]
+        symbol_rows = [(price, symbol) for symbol, price in symbol_prices.items()
+                       if self._needs_price_write(symbol, price, now)]
+        if not alert_rows and not symbol_rows and not history_rows:
+            return 0
+        
+        with self.pool.writer() as conn:
+            conn.executemany("""
+                INSERT INTO price_history (symbol, price, recorded_at) VALUES (?, ?, ?)
+            """, history_rows)
+            conn.executemany("""
+                UPDATE alerts 
+                SET current_price = ?, last_checked = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, alert_rows)
+            conn.executemany("""
+                UPDATE alerts
+                SET current_price = ?, last_checked = CURRENT_TIMESTAMP
+                WHERE symbol = ? AND status = 'active'
+            """, symbol_rows)
+            conn.commit()
+        
+        with self._price_lock:
+            for price, alert_id in alert_rows:
+                self._written_prices[alert_id] = (price, now)
+            for price, symbol in symbol_rows:
+                self._written_prices[symbol] = (price, now)
+        
+        return len(alert_rows) + len(symbol_rows)
+    
+    # ==================== 価格履歴・OHLCロールアップ ====================
+    
+    @SQLITE_SECONDS.time(operation='rollup_price_history')
+    def rollup_price_history(self) -> Dict[str, int]:
+        """価格履歴を1分足→1時間足→日足の順に集計し、間隔ごとの更新バケット数を返す
+        
+        各足の最新バケット（集計途中の可能性がある）以降だけを集計し直す
+        """
+        updated = {}
+        with self.pool.writer() as conn:
+            for interval, (_, bucket_format, source) in PRICE_ROLLUP_INTERVALS.items():
+                target = f"price_ohlc_{interval}"
+                watermark = conn.execute(f"SELECT MAX(bucket_start) FROM {target}").fetchone()[0] or ''
+                
+                if source == 'price_history':
+                    # 生の価格: 始値はバケット内の最初、終値は最後の価格
+                    ticks = f"""
+                        SELECT symbol, bucket, price AS open, price AS high, price AS low, price AS close,
+                               1 AS samples, recorded_at AS at, id AS seq
+                        FROM (SELECT *, strftime('{bucket_format}', recorded_at) AS bucket
+                              FROM price_history WHERE recorded_at >= ?)
+                    """
+                else:
+                    ticks = f"""
+                        SELECT symbol, bucket, open, high, low, close, samples, bucket_start AS at, 0 AS seq
+                        FROM (SELECT *, strftime('{bucket_format}', bucket_start) AS bucket
+                              FROM {source} WHERE bucket_start >= ?)
+                    """
+                
+                cursor = conn.execute(f"""
+                    INSERT OR REPLACE INTO {target} (symbol, bucket_start, open, high, low, close, samples)
+                    SELECT symbol, bucket,
+                           MAX(CASE WHEN first_rank = 1 THEN open END), MAX(high), MIN(low),
+                           MAX(CASE WHEN last_rank = 1 THEN close END), SUM(samples)
+                    FROM (
+                        SELECT *,
+                               ROW_NUMBER() OVER (PARTITION BY symbol, bucket ORDER BY at, seq) AS first_rank,
+                               ROW_NUMBER() OVER (PARTITION BY symbol, bucket ORDER BY at DESC, seq DESC) AS last_rank
+                        FROM ({ticks})
+                    )
+                    GROUP BY symbol, bucket
+                """, (watermark,))
+                updated[interval] = cursor.rowcount
+            conn.commit()
+        return updated
+    
+    @SQLITE_SECONDS.time(operation='prune_price_history')
+    def prune_price_history(self, retention_hours: int = PRICE_HISTORY_RETENTION_HOURS,
+                            ohlc_retention_days: Optional[Dict[str, int]] = None) -> int:
+        """保持期間を過ぎた価格履歴・OHLCを削除（ロールアップ後に実行する）"""
+        ohlc_retention_days = ohlc_retention_days or PRICE_OHLC_RETENTION_DAYS
+        with self.pool.writer() as conn:
+            deleted = conn.execute("""
+                DELETE FROM price_history WHERE recorded_at < datetime('now', ?)
+            """, (f"-{retention_hours} hours",)).rowcount
+            for interval, days in ohlc_retention_days.items():
+                if days:
+                    deleted += conn.execute(f"""
+                        DELETE FROM price_ohlc_{interval} WHERE bucket_start < datetime('now', ?)
+                    """, (f"-{days} days",)).rowcount
+            conn.commit()
+            return deleted
+    
+    def get_price_ohlc(self, symbol: str, interval: str = '1h', limit: int = 100,
+                       since: Optional[str] = None) -> List[Dict]:
+        """ロールアップ済みのOHLC（古い順、sinceを指定しない場合は最新のlimit本）"""
+        if interval not in PRICE_ROLLUP_INTERVALS:
+            raise ValueError(f"無効な間隔: {interval}")
+        
+        with self.pool.reader() as conn:
+            conn.row_factory = sqlite3.Row
+            if since:
+                cursor = conn.execute(f"""
+                    SELECT bucket_start, open, high, low, close, samples FROM price_ohlc_{interval}
+                    WHERE symbol = ? AND bucket_start >= ?
+                    ORDER BY bucket_start LIMIT ?
+                """, (symbol, since, limit))
+                return [dict(row) for row in cursor.fetchall()]
+            
+            cursor = conn.execute(f"""
+                SELECT bucket_start, open, high, low, close, samples FROM price_ohlc_{interval}
+                WHERE symbol = ?
+                ORDER BY bucket_start DESC LIMIT ?
+            """, (symbol, limit))
+            return [dict(row) for row in reversed(cursor.fetchall())]
+    
+    def update_symbol_prices(self, prices: Dict[str, float]):
+        """銘柄単位でアクティブアラートの現在価格を一括更新（1トランザクション）"""
+        if not prices:
+            return
+        
+        with self.pool.writer() as conn:
+            conn.executemany("""
+                UPDATE alerts
+                SET current_price = ?, last_checked = CURRENT_TIMESTAMP
+                WHERE symbol = ? AND status = 'active'
+            """, [(price, symbol) for symbol, price in prices.items()])
+            conn.commit()
+    
+    def trigger_alert(self, alert_id: int, trigger_price: float, price_change: float, alert_type: str = 'rise') -> Optional[int]:
+        """アラートをトリガー状態にする
+        
+        alert_historyに未送信（email_sent = 0）の行を追加し、そのIDを返す（メール送信キュー）
+        アクティブでない（他の監視プロセスが発火済み・停止済み）場合は何もせずNoneを返す
+        """
+        rows = self.trigger_alerts_bulk([{
+            'alert_id': alert_id,
+            'trigger_price': trigger_price,
+            'price_change': price_change,
+            'alert_type': alert_type
+        }])
+        
+        if not rows:
+            print(f"⏭️ アラートは発火済みまたは停止済み: ID {alert_id}")
+            return None
+        
+        direction = "上昇" if alert_type == 'rise' else "下落"
+        print(f"🚨 {direction}アラートトリガー: ID {alert_id}, 価格変動: {price_change:+.2f}%")
+        return rows[0]['history_id']
+    
+    @SQLITE_SECONDS.time(operation='trigger_alerts_bulk')
+    def trigger_alerts_bulk(self, triggers: List[Dict]) -> List[Dict]:
+        """複数アラートを1トランザクションでトリガー状態にする
+        
+        triggers: alert_id, trigger_price, price_change, alert_typeを持つ辞書のリスト
+        戻り値: 発火を確定したアラートの通知用データ（claim_pending_emailsと同じキー構成）
+        アクティブでないアラート（他の監視プロセスが発火済み・停止済み）は含まない
+        """
+        if not triggers:
+            return []
+        
+        with self.pool.writer() as conn:
+            conn.row_factory = sqlite3.Row
+            # 書き込みロックを先に取り、確認から更新までを他プロセスと競合させない
+            conn.execute("BEGIN IMMEDIATE")
+            
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS pending_triggers (
+                    alert_id INTEGER PRIMARY KEY,
+                    trigger_price REAL,
+                    price_change REAL,
+                    alert_type VARCHAR(10)
+                )
+            """)
+            conn.execute("DELETE FROM temp.pending_triggers")
+            conn.executemany("""
+                INSERT OR REPLACE INTO temp.pending_triggers (alert_id, trigger_price, price_change, alert_type)
+                VALUES (?, ?, ?, ?)
+            """, [(trigger['alert_id'], trigger['trigger_price'], trigger['price_change'],
+                   trigger.get('alert_type') or 'rise') for trigger in triggers])
+            
+            # アクティブなアラートだけを発火対象として残す
+            conn.execute("""
+                DELETE FROM temp.pending_triggers 
+                WHERE alert_id NOT IN (
+                    SELECT a.id FROM alerts a 
+                    JOIN temp.pending_triggers t ON a.id = t.alert_id
+                    WHERE a.status = 'active'
+                )
+            """)
+            
             conn.execute("""
                 UPDATE alerts 
                 SET status = 'triggered', triggered_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (alert_id,))
+                WHERE id IN (SELECT alert_id FROM temp.pending_triggers)
+            """)
             
-            # アラート履歴に記録
-            cursor = conn.execute("""
-                SELECT a.*, u.email
-                FROM alerts a
+            last_history_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM alert_history").fetchone()[0]
+            conn.execute("""
+                INSERT INTO alert_history 
+                (alert_id, user_email, symbol, threshold_percent, alert_type,
+                 base_price, trigger_price, price_change)
+                SELECT t.alert_id, u.email, a.symbol, a.threshold_percent, t.alert_type,
+                       a.base_price, t.trigger_price, t.price_change
+                FROM temp.pending_triggers t
+                JOIN alerts a ON a.id = t.alert_id
                 JOIN users u ON a.user_id = u.id
-                WHERE a.id = ?
-            """, (alert_id,))
+                ORDER BY t.alert_id
+            """)
             
-            alert_data = cursor.fetchone()
-            if alert_data:
-                conn.execute("""
-                    INSERT INTO alert_history 
-                    (alert_id, user_email, symbol, threshold_percent, alert_type,
-                     base_price, trigger_price, price_change)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (alert_id, alert_data[13], alert_data[2], alert_data[4], alert_type,
-                      alert_data[6], trigger_price, price_change))
+            # 通知に必要なデータを同じトランザクション内で取得
+            cursor = conn.execute("""
+                SELECT h.id AS history_id, h.alert_id, h.symbol, h.threshold_percent, h.alert_type,
+                       h.base_price, h.trigger_price, h.price_change, h.triggered_at,
+                       h.email_attempts, a.base_symbol, a.alert_token,
+                       u.email AS user_email, u.unsubscribe_token
+                FROM alert_history h
+                JOIN alerts a ON h.alert_id = a.id
+                JOIN users u ON a.user_id = u.id
+                WHERE h.id > ?
+                ORDER BY h.id
+            """, (last_history_id,))
+            rows = [dict(row) for row in cursor.fetchall()]
             
+            conn.execute("DELETE FROM temp.pending_triggers")
             conn.commit()
-            direction = "上昇" if alert_type == 'rise' else "下落"
-            print(f"🚨 {direction}アラートトリガー: ID {alert_id}, 価格変動: {price_change:+.2f}%")
+            return rows
     
     def mark_email_sent(self, alert_id: int):
         """メール送信完了をマーク"""
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.writer() as conn:
             conn.execute("""
                 UPDATE alert_history 
                 SET email_sent = 1, email_sent_at = CURRENT_TIMESTAMP
@@ -538,18 +869,180 @@ class AlertDatabase:
             """, (alert_id,))
             conn.commit()
     
-    def check_alert_condition(self, alert: Dict) -> Optional[Dict]:
-        """アラート条件をチェック（上昇・下落対応）"""
-        symbol = alert['symbol']
-        base_price = float(alert['base_price'])
-        threshold_percent = float(alert['threshold_percent'])
-        alert_type = alert.get('alert_type', 'rise')
+    # ==================== メール送信キュー（アウトボックス） ====================
+    
+    @SQLITE_SECONDS.time(operation='claim_pending_emails')
+    def claim_pending_emails(self, limit: int = 50, lease_seconds: int = 300,
+                             max_attempts: int = OUTBOX_MAX_ATTEMPTS) -> List[Dict]:
+        """未送信メールを取得し、送信中としてリース（next_attempt_at）を設定
+        
+        送信中にプロセスが停止してもリース期限後に再送対象に戻る
+        """
+        with self.pool.writer() as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN IMMEDIATE")
+            
+            cursor = conn.execute("""
+                SELECT h.id AS history_id, h.alert_id, h.symbol, h.threshold_percent, h.alert_type,
+                       h.base_price, h.trigger_price, h.price_change, h.triggered_at,
+                       h.email_attempts, a.base_symbol, a.alert_token,
+                       u.email AS user_email, u.unsubscribe_token
+                FROM alert_history h
+                JOIN alerts a ON h.alert_id = a.id
+                JOIN users u ON a.user_id = u.id
+                WHERE h.email_sent = 0
+                  AND h.email_attempts < ?
+                  AND (h.next_attempt_at IS NULL OR h.next_attempt_at <= CURRENT_TIMESTAMP)
+                  AND h.triggered_at > datetime('now', ?)
+                  AND u.is_active = 1
+                ORDER BY h.id
+                LIMIT ?
+            """, (max_attempts, f"-{OUTBOX_MAX_AGE_HOURS} hours", limit))
+            rows = [dict(row) for row in cursor.fetchall()]
+            
+            conn.executemany("""
+                UPDATE alert_history 
+                SET next_attempt_at = datetime('now', ?)
+                WHERE id = ?
+            """, [(f"+{lease_seconds} seconds", row['history_id']) for row in rows])
+            
+            conn.commit()
+            return rows
+    
+    @SQLITE_SECONDS.time(operation='claim_pending_digests')
+    def claim_pending_digests(self, user_limit: int = 50, window_seconds: int = 0, lease_seconds: int = 300,
+                              max_attempts: int = OUTBOX_MAX_ATTEMPTS) -> List[Dict]:
+        """ダイジェスト送信用に未送信メールをユーザー単位で取得し、リースを設定
+        
+        最も古い未送信行がwindow_seconds以上前に発火したユーザーについて、
+        そのユーザーの未送信行をすべて返す（window内の後続の発火をまとめて送るため）
+        """
+        pending_filter = """
+                WHERE h.email_sent = 0
+                  AND h.email_attempts < ?
+                  AND (h.next_attempt_at IS NULL OR h.next_attempt_at <= CURRENT_TIMESTAMP)
+                  AND h.triggered_at > datetime('now', ?)
+                  AND u.is_active = 1
+        """
+        pending_params = (max_attempts, f"-{OUTBOX_MAX_AGE_HOURS} hours")
+        
+        with self.pool.writer() as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN IMMEDIATE")
+            
+            cursor = conn.execute(f"""
+                SELECT u.id
+                FROM alert_history h
+                JOIN alerts a ON h.alert_id = a.id
+                JOIN users u ON a.user_id = u.id
+                {pending_filter}
+                GROUP BY u.id
+                HAVING MIN(h.triggered_at) <= datetime('now', ?)
+                ORDER BY MIN(h.id)
+                LIMIT ?
+            """, pending_params + (f"-{int(window_seconds)} seconds", user_limit))
+            user_ids = [row[0] for row in cursor.fetchall()]
+            if not user_ids:
+                conn.commit()
+                return []
+            
+            placeholders = ','.join('?' * len(user_ids))
+            cursor = conn.execute(f"""
+                SELECT h.id AS history_id, h.alert_id, h.symbol, h.threshold_percent, h.alert_type,
+                       h.base_price, h.trigger_price, h.price_change, h.triggered_at,
+                       h.email_attempts, a.base_symbol, a.alert_token,
+                       u.id AS user_id, u.email AS user_email, u.unsubscribe_token
+                FROM alert_history h
+                JOIN alerts a ON h.alert_id = a.id
+                JOIN users u ON a.user_id = u.id
+                {pending_filter}
+                  AND u.id IN ({placeholders})
+                ORDER BY u.id, h.id
+            """, pending_params + tuple(user_ids))
+            rows = [dict(row) for row in cursor.fetchall()]
+            
+            conn.executemany("""
+                UPDATE alert_history 
+                SET next_attempt_at = datetime('now', ?)
+                WHERE id = ?
+            """, [(f"+{lease_seconds} seconds", row['history_id']) for row in rows])
+            
+            conn.commit()
+            return rows
+    
+    def mark_history_email_sent(self, history_id: int):
+        """アウトボックスの行を送信完了にする"""
+        self.mark_history_emails_sent([history_id])
+    
+    @SQLITE_SECONDS.time(operation='mark_history_emails_sent')
+    def mark_history_emails_sent(self, history_ids: List[int]):
+        """アウトボックスの複数行を送信完了にする（ダイジェスト送信時）"""
+        with self.pool.writer() as conn:
+            conn.executemany("""
+                UPDATE alert_history 
+                SET email_sent = 1, email_sent_at = CURRENT_TIMESTAMP,
+                    email_attempts = email_attempts + 1, last_error = NULL
+                WHERE id = ?
+            """, [(history_id,) for history_id in history_ids])
+            conn.commit()
+    
+    def mark_history_email_failed(self, history_id: int, error: str, retry_in_seconds: int):
+        """送信失敗を記録し、次回送信時刻を設定"""
+        self.mark_history_emails_failed([history_id], error, retry_in_seconds)
+    
+    @SQLITE_SECONDS.time(operation='mark_history_emails_failed')
+    def mark_history_emails_failed(self, history_ids: List[int], error: str, retry_in_seconds: int):
+        """複数行の送信失敗を記録し、次回送信時刻を設定（ダイジェスト送信時）"""
+        with self.pool.writer() as conn:
+            conn.executemany("""
+                UPDATE alert_history 
+                SET email_attempts = email_attempts + 1, last_error = ?,
+                    next_attempt_at = datetime('now', ?)
+                WHERE id = ?
+            """, [(error[:500], f"+{int(retry_in_seconds)} seconds", history_id) for history_id in history_ids])
+            conn.commit()
+    
+    @SQLITE_SECONDS.time(operation='count_pending_emails')
+    def count_pending_emails(self, max_attempts: int = OUTBOX_MAX_ATTEMPTS) -> int:
+        """未送信メール数（キュー長、claim_pending_emailsが取得する行と同じ条件）"""
+        with self.pool.reader() as conn:
+            cursor = conn.execute("""
+                SELECT COUNT(*) FROM alert_history h
+                JOIN alerts a ON h.alert_id = a.id
+                JOIN users u ON a.user_id = u.id
+                WHERE h.email_sent = 0 AND h.email_attempts < ?
+                  AND h.triggered_at > datetime('now', ?)
+                  AND u.is_active = 1
+            """, (max_attempts, f"-{OUTBOX_MAX_AGE_HOURS} hours"))
+            return cursor.fetchone()[0]
+    
+    def check_alert_condition(self, alert: Dict, current_price: Optional[float] = None) -> Optional[Dict]:
+        """アラート条件をチェック（上昇・下落対応）
         
+        current_priceが渡された場合は価格スナップショットの値を使い、APIを呼ばない
+        """
         # 現在価格取得
-        current_price = self._get_current_price(symbol)
+        if current_price is None:
+            current_price = self._get_current_price(alert['symbol'])
         if current_price is None:
             return None
         
+        result = self.evaluate_alert(alert, current_price)
+        
+        if not result['triggered']:
+            # 価格のみ更新（書き込みバッファ経由、サイクル終了時に一括書き込み）
+            self.buffer_alert_price(alert['id'], current_price)
+        
+        return result
+    
+    @staticmethod
+    def evaluate_alert(alert: Dict, current_price: float) -> Dict:
+        """指定価格でアラート条件を判定（DB・API アクセスなし）"""
+        symbol = alert['symbol']
+        base_price = float(alert['base_price'])
+        threshold_percent = float(alert['threshold_percent'])
+        alert_type = alert.get('alert_type', 'rise')
+        
         # 価格変動率計算
         price_change = ((current_price - base_price) / base_price) * 100
         
@@ -575,9 +1068,6 @@ class AlertDatabase:
                 'triggered': True
             }
         
-        # 価格のみ更新
-        self.update_alert_price(alert['id'], current_price)
-        
         return {
             'alert_id': alert['id'],
             'symbol': symbol,
@@ -589,7 +1079,7 @@ class AlertDatabase:
     
     def deactivate_alert(self, alert_token: str) -> bool:
         """アラートを無効化"""
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.writer() as conn:
             cursor = conn.execute("""
                 UPDATE alerts SET status = 'stopped'
                 WHERE alert_token = ? AND status = 'active'
@@ -600,7 +1090,7 @@ class AlertDatabase:
     
     def unsubscribe_user(self, unsubscribe_token: str) -> bool:
         """ユーザーを配信停止"""
-        with sqlite3.connect(self.db_file) as conn:
+        with self.pool.writer() as conn:
             cursor = conn.execute("""
                 UPDATE users SET is_active = 0
                 WHERE unsubscribe_token = ?
@@ -609,54 +1099,37 @@ class AlertDatabase:
             conn.commit()
             return cursor.rowcount > 0
     
+    @SQLITE_SECONDS.time(operation='get_statistics')
     def get_statistics(self) -> Dict:
-        """システム統計を取得"""
-        with sqlite3.connect(self.db_file) as conn:
-            stats = {}
-            
-            # ユーザー統計
-            cursor = conn.execute("SELECT COUNT(*) FROM users WHERE is_active = 1")
-            stats['active_users'] = cursor.fetchone()[0]
-            
-            cursor = conn.execute("SELECT COUNT(*) FROM users WHERE is_registered = 1 AND is_active = 1")
-            stats['registered_users'] = cursor.fetchone()[0]
-            
-            # アラート統計
-            cursor = conn.execute("SELECT COUNT(*) FROM alerts WHERE status = 'active'")
-            stats['active_alerts'] = cursor.fetchone()[0]
+        """システム統計を取得（トリガーで更新されるstat_countersを参照、データ量によらず一定時間）"""
+        with self.pool.reader() as conn:
+            placeholders = ','.join('?' for _ in STAT_COUNTER_NAMES)
+            counters = dict(conn.execute(f"""
+                SELECT name, value FROM stat_counters
+                WHERE name IN ({placeholders}) AND bucket = ''
+            """, tuple(STAT_COUNTER_NAMES.values())).fetchall())
             
-            cursor = conn.execute("SELECT COUNT(*) FROM alerts WHERE status = 'triggered'")
-            stats['triggered_alerts'] = cursor.fetchone()[0]
-            
-            # アラートタイプ別統計
+            # 今日のアラート数（日別バケット）
             cursor = conn.execute("""
-                SELECT alert_type, COUNT(*) 
-                FROM alerts 
-                WHERE status = 'active' 
-                GROUP BY alert_type
+                SELECT value FROM stat_counters
+                WHERE name = 'triggered_alerts_daily' AND bucket = DATE('now')
             """)
-            alert_types = dict(cursor.fetchall())
-            stats['rise_alerts'] = alert_types.get('rise', 0)
-            stats['fall_alerts'] = alert_types.get('fall', 0)
-            
-            # 今日のアラート数
-            cursor = conn.execute("""
-                SELECT COUNT(*) FROM alert_history 
-                WHERE DATE(triggered_at) = DATE('now')
-            """)
-            stats['today_alerts'] = cursor.fetchone()[0]
+            row = cursor.fetchone()
             
+            stats = {name: counters.get(counter, 0) for name, counter in STAT_COUNTER_NAMES.items()}
+            stats['today_alerts'] = row[0] if row else 0
             return stats
     
     def _check_user_limits(self, conn, user_id: int) -> bool:
         """ユーザーの制限をチェック"""
-        # アクティブアラート数チェック
+        # アクティブアラート数チェック（ユーザー別カウンター）
         cursor = conn.execute("""
-            SELECT COUNT(*) FROM alerts 
-            WHERE user_id = ? AND status = 'active'
-        """, (user_id,))
+            SELECT value FROM stat_counters
+            WHERE name = 'user_active_alerts' AND bucket = ?
+        """, (str(user_id),))
         
-        active_count = cursor.fetchone()[0]
+        row = cursor.fetchone()
+        active_count = row[0] if row else 0
         max_alerts = 20  # 設定から取得すべき
         
         return active_count < max_alerts
@@ -664,13 +1137,7 @@ class AlertDatabase:
     def _get_current_price(self, symbol: str) -> Optional[float]:
         """Binance APIから現在価格を取得"""
         try:
-            url = f"{BINANCE_API_URL}/ticker/price"
-            params = {'symbol': symbol}
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self.market_data.ticker_price(symbol)
             price = float(data['price'])
             
             print(f"📊 {symbol}: ${price:,.6f}")
@@ -686,14 +1153,46 @@ class AlertDatabase:
             print(f"❌ 予期しないエラー ({symbol}): {e}")
             return None
     
+    def get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Binance APIから複数シンボルの現在価格を一括取得（価格スナップショット）"""
+        wanted = sorted(set(symbols))
+        if not wanted:
+            return {}
+        
+        # 銘柄数が多い場合は全銘柄を1回で取得する
+        bulk = len(wanted) <= BULK_PRICE_SYMBOL_LIMIT
+        
+        try:
+            try:
+                data = self.market_data.ticker_price(symbols=wanted if bulk else None)
+            except requests.exceptions.HTTPError:
+                if not bulk:
+                    raise
+                # 無効なシンボルが1つでも含まれると400になるため全銘柄取得にフォールバック
+                data = self.market_data.ticker_price()
+            
+            prices = self._parse_price_snapshot(data, wanted)
+            
+            print(f"📊 価格スナップショット取得: {len(prices)}/{len(wanted)}銘柄")
+            return prices
+        
+        except requests.exceptions.RequestException as e:
+            print(f"❌ API接続エラー (価格スナップショット): {e}")
+            return {}
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"❌ データ解析エラー (価格スナップショット): {e}")
+            return {}
+    
+    @staticmethod
+    def _parse_price_snapshot(data: List[Dict], symbols: List[str]) -> Dict[str, float]:
+        """ティッカー価格一覧から対象シンボルの価格を抽出"""
+        wanted = set(symbols)
+        return {item['symbol']: float(item['price']) for item in data if item['symbol'] in wanted}
+    
     def get_binance_symbol_info(self, symbol: str) -> Optional[Dict]:
         """Binance APIからシンボル情報を取得"""
         try:
-            url = f"{BINANCE_API_URL}/exchangeInfo"
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self.market_data.exchange_info()
             
             for symbol_info in data['symbols']:
                 if symbol_info['symbol'] == symbol:
@@ -725,34 +1224,60 @@ class AlertDatabase:
     def get_24hr_stats(self, symbol: str) -> Optional[Dict]:
         """24時間統計を取得"""
         try:
-            url = f"{BINANCE_API_URL}/ticker/24hr"
-            params = {'symbol': symbol}
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            return {
-                'symbol': data['symbol'],
-                'priceChange': float(data['priceChange']),
-                'priceChangePercent': float(data['priceChangePercent']),
-                'weightedAvgPrice': float(data['weightedAvgPrice']),
-                'prevClosePrice': float(data['prevClosePrice']),
-                'lastPrice': float(data['lastPrice']),
-                'bidPrice': float(data['bidPrice']),
-                'askPrice': float(data['askPrice']),
-                'openPrice': float(data['openPrice']),
-                'highPrice': float(data['highPrice']),
-                'lowPrice': float(data['lowPrice']),
-                'volume': float(data['volume']),
-                'quoteVolume': float(data['quoteVolume']),
-                'count': int(data['count'])
-            }
+            return self._parse_24hr_stats(self.market_data.ticker_24hr(symbol))
             
         except Exception as e:
             print(f"⚠️ 24時間統計取得エラー ({symbol}): {e}")
             return None
+    
+    def get_24hr_stats_bulk(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Binance APIから複数シンボルの24時間統計を一括取得"""
+        wanted = sorted(set(symbols))
+        if not wanted:
+            return {}
+        
+        # 銘柄数が多い場合は全銘柄を1回で取得する
+        bulk = len(wanted) <= BULK_PRICE_SYMBOL_LIMIT
+        
+        try:
+            try:
+                data = self.market_data.ticker_24hr(symbols=wanted if bulk else None)
+            except requests.exceptions.HTTPError:
+                if not bulk:
+                    raise
+                # 無効なシンボルが1つでも含まれると400になるため全銘柄取得にフォールバック
+                data = self.market_data.ticker_24hr()
+            
+            wanted_set = set(wanted)
+            return {item['symbol']: self._parse_24hr_stats(item)
+                    for item in data if item['symbol'] in wanted_set}
+        
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ 24時間統計一括取得エラー: {e}")
+            return {}
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"⚠️ 24時間統計解析エラー: {e}")
+            return {}
+    
+    @staticmethod
+    def _parse_24hr_stats(data: Dict) -> Dict:
+        """24時間ティッカーのレスポンスを数値に変換"""
+        return {
+            'symbol': data['symbol'],
+            'priceChange': float(data['priceChange']),
+            'priceChangePercent': float(data['priceChangePercent']),
+            'weightedAvgPrice': float(data['weightedAvgPrice']),
+            'prevClosePrice': float(data['prevClosePrice']),
+            'lastPrice': float(data['lastPrice']),
+            'bidPrice': float(data['bidPrice']),
+            'askPrice': float(data['askPrice']),
+            'openPrice': float(data['openPrice']),
+            'highPrice': float(data['highPrice']),
+            'lowPrice': float(data['lowPrice']),
+            'volume': float(data['volume']),
+            'quoteVolume': float(data['quoteVolume']),
+            'count': int(data['count'])
+        }
 
 def main():
     """データベース初期化とテスト"""
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Email Outbox - アラートメールの送信キュー
+発火時はalert_historyに未送信（email_sent = 0）の行を書くだけにし、
+送信ワーカープールがその行を並行して送信する（失敗時は指数バックオフで再送）
+
+監視ループはSMTPの遅延を待たず、プロセス再起動後も未送信メールは送信される
+
+digest_windowを指定した場合は、ユーザーごとに最初の発火からwindow秒待ち、
+その間の発火をまとめて1通のダイジェストメールで送信する
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from database_schema import AlertDatabase, OUTBOX_MAX_ATTEMPTS
+
+OUTBOX_LEASE_SECONDS = 300  # 送信中の行を他のワーカーが取得しない時間
+OUTBOX_BASE_BACKOFF = 30  # 初回再送までの秒数（以降2倍ずつ）
+OUTBOX_MAX_BACKOFF = 3600  # 再送間隔の上限（秒）
+
+class EmailOutboxDispatcher:
+    """未送信アラートメールをワーカープールで送信"""
+    
+    def __init__(self, db: AlertDatabase, send_func: Callable[[Dict], None], workers: int = 4,
+                 poll_interval: float = 5.0, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 base_backoff: int = OUTBOX_BASE_BACKOFF, debug: bool = False,
+                 digest_func: Optional[Callable[[List[Dict]], None]] = None, digest_window: int = 0):
+        self.db = db
+        self.send_func = send_func  # 失敗時は例外を送出する送信関数
+        self.digest_func = digest_func  # 同一ユーザーの複数行をまとめて送信する関数
+        self.digest_window = digest_window if digest_func else 0  # まとめる時間（秒、0は無効）
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.debug = debug
+        
+        self.stats = {'sent': 0, 'failed': 0, 'gave_up': 0, 'messages': 0}
+        self._stats_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._executor = None
+        self._thread = None
+    
+    def start(self):
+        """送信スレッドとワーカープールを開始"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='email-outbox')
+        self._thread = threading.Thread(target=self._dispatch_loop, name='email-outbox-dispatcher', daemon=True)
+        self._wake_event.set()  # 前回の未送信分をすぐに送信
+        self._thread.start()
+        digest = f", ダイジェスト: {self.digest_window}秒" if self.digest_window else ""
+        print(f"📮 メール送信キュー開始 (ワーカー: {self.workers}{digest})")
+    
+    def stop(self, drain: bool = True):
+        """送信スレッドを停止（drain=Trueなら送信可能な行を待機時間によらず送り切る）"""
+        if self._thread is None:
+            return
+        if drain:
+            self.drain(flush=True)
+        self._stop_event.set()
+        self._wake_event.set()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self._thread = None
+        self._executor = None
+        
+        pending = self.pending_count()
+        if pending:
+            print(f"📮 未送信メール {pending}件は次回起動時に送信します")
+    
+    def wake(self):
+        """新しい発火を通知（次のポーリングを待たずに送信）"""
+        self._wake_event.set()
+    
+    def pending_count(self) -> int:
+        """未送信メール数"""
+        return self.db.count_pending_emails(self.max_attempts)
+    
+    def drain(self, flush: bool = False) -> int:
+        """送信可能な行がなくなるまで送信し、処理件数を返す"""
+        processed = 0
+        while True:
+            batch = self.dispatch_once(flush)
+            if batch == 0:
+                return processed
+            processed += batch
+    
+    def dispatch_once(self, flush: bool = False) -> int:
+        """未送信行を1バッチ取得してワーカーで送信
+        
+        flush=Trueの場合はダイジェストの待機時間を待たずに送信（停止時）
+        """
+        if self.digest_window:
+            window = 0 if flush else self.digest_window
+            rows = self.db.claim_pending_digests(self.workers * 2, window, OUTBOX_LEASE_SECONDS, self.max_attempts)
+            groups: Dict[int, List[Dict]] = {}
+            for row in rows:
+                groups.setdefault(row['user_id'], []).append(row)
+            batches = list(groups.values())
+        else:
+            rows = self.db.claim_pending_emails(self.workers * 2, OUTBOX_LEASE_SECONDS, self.max_attempts)
+            batches = [[row] for row in rows]
+        if not rows:
+            return 0
+        
+        if self._executor is None:
+            for batch in batches:
+                self._deliver(batch)
+        else:
+            list(self._executor.map(self._deliver, batches))
+        return len(rows)
+    
+    def _deliver(self, rows: List[Dict]):
+        """1通（単独メールまたはダイジェスト）を送信して結果を記録"""
+        history_ids = [row['history_id'] for row in rows]
+        recipient = rows[0]['user_email']
+        subject = rows[0]['symbol'] if len(rows) == 1 else f"ダイジェスト{len(rows)}件"
+        try:
+            if len(rows) == 1:
+                self.send_func(rows[0])
+            else:
+                self.digest_func(rows)
+        except Exception as e:
+            attempts = max(row['email_attempts'] for row in rows) + 1
+            retry_in = min(self.base_backoff * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF)
+            self.db.mark_history_emails_failed(history_ids, str(e), retry_in)
+            
+            with self._stats_lock:
+                self.stats['failed'] += len(rows)
+                if attempts >= self.max_attempts:
+                    self.stats['gave_up'] += len(rows)
+            
+            if attempts >= self.max_attempts:
+                print(f"❌ メール送信を断念: {recipient} ({subject}) - {attempts}回失敗: {e}")
+            else:
+                print(f"⚠️ メール送信失敗: {recipient} ({subject}) - {retry_in}秒後に再送 ({attempts}/{self.max_attempts}): {e}")
+            return
+        
+        self.db.mark_history_emails_sent(history_ids)
+        with self._stats_lock:
+            self.stats['sent'] += len(rows)
+            self.stats['messages'] += 1
+    
+    def _dispatch_loop(self):
+        """送信スレッド本体"""
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.poll_interval)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            
+            try:
+                while self.dispatch_once() and not self._stop_event.is_set():
+                    pass
+            except Exception as e:
+                print(f"❌ メール送信キューエラー: {e}")
+                if self.debug:
+                    import traceback
+                    traceback.print_exc()
+                time.sleep(self.poll_interval)
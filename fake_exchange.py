@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Fake Exchange - オフライン検証用のローカル模擬取引所
+Binance互換のミニティッカーストリーム（combined stream）と価格REST APIを提供
+記録済みレスポンスの再生と、遅延・エラー・レート制限（429）の注入ができる
+
+使用方法:
+    python fake_exchange.py --port 8765 --symbols BTCUSDT,ETHUSDT --tick-interval 0.2
+    
+    # 監視プロセスを模擬取引所に接続
+    export BINANCE_API_URL="http://localhost:8765/api/v3"
+    export BINANCE_STREAM_URL="ws://localhost:8765/stream"
+    python monitor.py --stream
+    
+    # 本番APIのレスポンスを記録し（数サイクル後にCtrl+Cで停止）、模擬取引所で再生
+    MARKET_DATA_RECORD=responses.jsonl python monitor.py --interval 10
+    python fake_exchange.py --replay responses.jsonl
+    
+    # 遅延 50±20ms、エラー率 5%、1分あたり600リクエストを超えたら429
+    python fake_exchange.py --latency 50 --latency-jitter 20 --error-rate 0.05 --rate-limit 600
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from aiohttp import web, WSMsgType
+
+from market_data import load_recording, request_key
+
+DEFAULT_PRICES = {
+    'BTCUSDT': 60000.0,
+    'ETHUSDT': 3000.0,
+    'ADAUSDT': 0.5,
+    'SOLUSDT': 150.0,
+}
+API_PREFIX = '/api/v3'
+RATE_LIMIT_WINDOW = 60  # レート制限の集計期間（秒）
+KLINE_INTERVALS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+class FakeExchange:
+    """ランダムウォークで価格を動かす模擬取引所"""
+    
+    def __init__(self, prices: Optional[Dict[str, float]] = None, tick_interval: float = 0.5,
+                 volatility: float = 0.002, seed: Optional[int] = None,
+                 replay_file: Optional[str] = None, latency: float = 0.0, latency_jitter: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: int = 0):
+        self.prices: Dict[str, float] = dict(prices or DEFAULT_PRICES)
+        self.tick_interval = tick_interval
+        self.volatility = volatility
+        self.rng = random.Random(seed)
+        
+        # 記録済みレスポンス（リクエストキー -> [(ステータス, レスポンス), ...]）と再生位置
+        self.recording: Dict[str, List[Tuple[int, object]]] = load_recording(replay_file) if replay_file else {}
+        self.replay_positions: Dict[str, int] = {}
+        
+        # 障害注入（遅延はミリ秒、rate_limitは1分あたりのリクエスト数、0で無効）
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.request_times = deque()
+        self.stats = {'requests': 0, 'replayed': 0, 'errors': 0, 'rate_limited': 0}
+        
+        # 24時間統計用（起動時からの始値・高値・安値・出来高）
+        self.open_prices = dict(self.prices)
+        self.high_prices = dict(self.prices)
+        self.low_prices = dict(self.prices)
+        self.volumes = {symbol: 0.0 for symbol in self.prices}
+        
+        # WebSocket接続 -> 購読中シンボル
+        self.subscribers: Dict[web.WebSocketResponse, Set[str]] = {}
+    
+    def _ensure_symbol(self, symbol: str):
+        """未知のシンボルを初期価格100で追加"""
+        if symbol not in self.prices:
+            self.set_price(symbol, 100.0)
+    
+    def set_price(self, symbol: str, price: float):
+        """価格を直接設定（シナリオ検証用）"""
+        self.prices[symbol] = price
+        self.open_prices.setdefault(symbol, price)
+        self.high_prices[symbol] = max(self.high_prices.get(symbol, price), price)
+        self.low_prices[symbol] = min(self.low_prices.get(symbol, price), price)
+        self.volumes.setdefault(symbol, 0.0)
+    
+    def step(self):
+        """全銘柄の価格を1ステップ動かす"""
+        for symbol, price in list(self.prices.items()):
+            self.set_price(symbol, price * (1 + self.rng.gauss(0, self.volatility)))
+            self.volumes[symbol] += self.rng.uniform(0, 10)
+    
+    def mini_ticker(self, symbol: str) -> Dict:
+        """Binance互換のミニティッカーイベント"""
+        price = self.prices[symbol]
+        return {
+            'e': '24hrMiniTicker',
+            'E': int(time.time() * 1000),
+            's': symbol,
+            'c': f"{price:.8f}",
+            'o': f"{self.open_prices[symbol]:.8f}",
+            'h': f"{self.high_prices[symbol]:.8f}",
+            'l': f"{self.low_prices[symbol]:.8f}",
+            'v': f"{self.volumes[symbol]:.4f}",
+            'q': f"{self.volumes[symbol] * price:.4f}",
+        }
+    
+    def ticker_24hr(self, symbol: str) -> Dict:
+        """Binance互換の24時間ティッカー"""
+        price = self.prices[symbol]
+        open_price = self.open_prices[symbol]
+        return {
+            'symbol': symbol,
+            'priceChange': f"{price - open_price:.8f}",
+            'priceChangePercent': f"{(price - open_price) / open_price * 100:.3f}",
+            'weightedAvgPrice': f"{(price + open_price) / 2:.8f}",
+            'prevClosePrice': f"{open_price:.8f}",
+            'lastPrice': f"{price:.8f}",
+            'bidPrice': f"{price:.8f}",
+            'askPrice': f"{price:.8f}",
+            'openPrice': f"{open_price:.8f}",
+            'highPrice': f"{self.high_prices[symbol]:.8f}",
+            'lowPrice': f"{self.low_prices[symbol]:.8f}",
+            'volume': f"{self.volumes[symbol]:.4f}",
+            'quoteVolume': f"{self.volumes[symbol] * price:.4f}",
+            'count': int(self.volumes[symbol]),
+        }
+    
+    # ==================== WebSocketストリーム ====================
+    
+    async def stream_handler(self, request: web.Request) -> web.WebSocketResponse:
+        """combined stream（SUBSCRIBE/UNSUBSCRIBE対応）"""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        
+        # URLで指定されたストリーム（?streams=btcusdt@miniTicker/...）
+        streams = request.query.get('streams', '')
+        self.subscribers[ws] = {name.split('@')[0].upper() for name in streams.split('/') if name}
+        
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                request_data = json.loads(msg.data)
+                method = request_data.get('method')
+                symbols = {name.split('@')[0].upper() for name in request_data.get('params', [])}
+                
+                if method == 'SUBSCRIBE':
+                    for symbol in symbols:
+                        self._ensure_symbol(symbol)
+                    self.subscribers[ws] |= symbols
+                    await ws.send_json({'result': None, 'id': request_data.get('id')})
+                elif method == 'UNSUBSCRIBE':
+                    self.subscribers[ws] -= symbols
+                    await ws.send_json({'result': None, 'id': request_data.get('id')})
+                elif method == 'LIST_SUBSCRIPTIONS':
+                    result = [f"{symbol.lower()}@miniTicker" for symbol in sorted(self.subscribers[ws])]
+                    await ws.send_json({'result': result, 'id': request_data.get('id')})
+        finally:
+            self.subscribers.pop(ws, None)
+        
+        return ws
+    
+    async def broadcast(self):
+        """購読者に現在価格を配信"""
+        for ws, symbols in list(self.subscribers.items()):
+            for symbol in symbols:
+                if symbol not in self.prices:
+                    continue
+                try:
+                    await ws.send_json({
+                        'stream': f"{symbol.lower()}@miniTicker",
+                        'data': self.mini_ticker(symbol)
+                    })
+                except ConnectionResetError:
+                    self.subscribers.pop(ws, None)
+                    break
+    
+    async def tick_loop(self, app: web.Application):
+        """一定間隔で価格を動かして配信"""
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            self.step()
+            await self.broadcast()
+    
+    async def _start_background(self, app: web.Application):
+        app['tick_task'] = asyncio.create_task(self.tick_loop(app))
+    
+    async def _stop_background(self, app: web.Application):
+        app['tick_task'].cancel()
+    
+    # ==================== REST API ====================
+    
+    def _rate_limited(self, now: float) -> Optional[int]:
+        """レート制限を超えていればRetry-After（秒）を返す"""
+        if not self.rate_limit:
+            return None
+        while self.request_times and now - self.request_times[0] >= RATE_LIMIT_WINDOW:
+            self.request_times.popleft()
+        if len(self.request_times) >= self.rate_limit:
+            return max(1, math.ceil(RATE_LIMIT_WINDOW - (now - self.request_times[0])))
+        self.request_times.append(now)
+        return None
+    
+    def _replay(self, path: str, query: Dict[str, str]) -> Optional[web.Response]:
+        """記録済みレスポンスがあれば記録順に返す"""
+        key = request_key(path, query)
+        entries = self.recording.get(key)
+        if not entries:
+            return None
+        position = self.replay_positions.get(key, 0)
+        self.replay_positions[key] = (position + 1) % len(entries)
+        status, body = entries[position]
+        self.stats['replayed'] += 1
+        return web.json_response(body, status=status)
+    
+    @web.middleware
+    async def api_middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        """REST APIへの遅延・レート制限・エラー注入と記録済みレスポンスの再生"""
+        if not request.path.startswith(API_PREFIX):
+            return await handler(request)
+        self.stats['requests'] += 1
+        
+        if self.latency or self.latency_jitter:
+            delay = max(0.0, self.latency + self.rng.uniform(-self.latency_jitter, self.latency_jitter))
+            await asyncio.sleep(delay / 1000)
+        
+        retry_after = self._rate_limited(time.monotonic())
+        if retry_after is not None:
+            self.stats['rate_limited'] += 1
+            return web.json_response({'code': -1003, 'msg': 'Too many requests.'}, status=429,
+                                     headers={'Retry-After': str(retry_after)})
+        
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return web.json_response({'code': -1000, 'msg': 'An unknown error occurred while processing the request.'},
+                                     status=500)
+        
+        replayed = self._replay(request.path[len(API_PREFIX):], dict(request.query))
+        if replayed is not None:
+            return replayed
+        return await handler(request)
+    
+    async def ticker_price_handler(self, request: web.Request) -> web.Response:
+        """/api/v3/ticker/price"""
+        if 'symbol' in request.query:
+            symbol = request.query['symbol']
+            if symbol not in self.prices:
+                return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+            return web.json_response({'symbol': symbol, 'price': f"{self.prices[symbol]:.8f}"})
+        
+        symbols = json.loads(request.query['symbols']) if 'symbols' in request.query else sorted(self.prices)
+        if any(symbol not in self.prices for symbol in symbols):
+            return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+        return web.json_response([{'symbol': symbol, 'price': f"{self.prices[symbol]:.8f}"} for symbol in symbols])
+    
+    async def ticker_24hr_handler(self, request: web.Request) -> web.Response:
+        """/api/v3/ticker/24hr"""
+        if 'symbol' in request.query:
+            symbol = request.query['symbol']
+            if symbol not in self.prices:
+                return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+            return web.json_response(self.ticker_24hr(symbol))
+        
+        symbols = json.loads(request.query['symbols']) if 'symbols' in request.query else sorted(self.prices)
+        return web.json_response([self.ticker_24hr(symbol) for symbol in symbols if symbol in self.prices])
+    
+    async def exchange_info_handler(self, request: web.Request) -> web.Response:
+        """/api/v3/exchangeInfo"""
+        return web.json_response({
+            'symbols': [
+                {
+                    'symbol': symbol,
+                    'status': 'TRADING',
+                    'baseAsset': symbol[:-4] if symbol.endswith('USDT') else symbol,
+                    'quoteAsset': 'USDT' if symbol.endswith('USDT') else '',
+                    'isSpotTradingAllowed': True
+                }
+                for symbol in sorted(self.prices)
+            ]
+        })
+    
+    async def klines_handler(self, request: web.Request) -> web.Response:
+        """/api/v3/klines（現在価格で終わるランダムウォークのローソク足）"""
+        symbol = request.query.get('symbol', '')
+        if symbol not in self.prices:
+            return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+        interval = request.query.get('interval', '1d')
+        unit = KLINE_INTERVALS.get(interval[-1:])
+        if unit is None or not interval[:-1].isdigit():
+            return web.json_response({'code': -1120, 'msg': 'Invalid interval.'}, status=400)
+        seconds = int(interval[:-1]) * unit
+        limit = min(int(request.query.get('limit', 500)), 1000)
+        
+        # 最新の足から過去に向かって価格を戻す（銘柄ごとに同じ系列になるよう乱数を固定）
+        rng = random.Random(f"{symbol}:{interval}")
+        now_ms = int(time.time() * 1000)
+        open_time = now_ms - now_ms % (seconds * 1000)
+        close = self.prices[symbol]
+        klines = []
+        for _ in range(limit):
+            open_price = close / (1 + rng.gauss(0, self.volatility * 10))
+            high = max(open_price, close) * (1 + abs(rng.gauss(0, self.volatility * 3)))
+            low = min(open_price, close) * (1 - abs(rng.gauss(0, self.volatility * 3)))
+            volume = rng.uniform(100, 10000)
+            klines.append([
+                open_time, f"{open_price:.8f}", f"{high:.8f}", f"{low:.8f}", f"{close:.8f}",
+                f"{volume:.4f}", open_time + seconds * 1000 - 1, f"{volume * close:.4f}",
+                int(volume), f"{volume / 2:.4f}", f"{volume * close / 2:.4f}", "0"
+            ])
+            close = open_price
+            open_time -= seconds * 1000
+        klines.reverse()
+        return web.json_response(klines)
+    
+    def make_app(self) -> web.Application:
+        """aiohttpアプリケーションを作成"""
+        app = web.Application(middlewares=[self.api_middleware])
+        app.router.add_get('/stream', self.stream_handler)
+        app.router.add_get('/ws', self.stream_handler)
+        app.router.add_get('/api/v3/ticker/price', self.ticker_price_handler)
+        app.router.add_get('/api/v3/ticker/24hr', self.ticker_24hr_handler)
+        app.router.add_get('/api/v3/exchangeInfo', self.exchange_info_handler)
+        app.router.add_get('/api/v3/klines', self.klines_handler)
+        app.on_startup.append(self._start_background)
+        app.on_cleanup.append(self._stop_background)
+        return app
+
+def parse_arguments():
+    """コマンドライン引数解析"""
+    parser = argparse.ArgumentParser(description='CryptoAlert Fake Exchange')
+    
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                       help='待ち受けホスト デフォルト: 127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765,
+                       help='待ち受けポート デフォルト: 8765')
+    parser.add_argument('--symbols', type=str, default='',
+                       help='銘柄と初期価格（例: BTCUSDT=60000,ETHUSDT=3000）')
+    parser.add_argument('--tick-interval', type=float, default=0.5,
+                       help='価格更新間隔（秒）デフォルト: 0.5秒')
+    parser.add_argument('--volatility', type=float, default=0.002,
+                       help='1ティックあたりの価格変動（標準偏差）デフォルト: 0.002')
+    parser.add_argument('--seed', type=int, default=None,
+                       help='乱数シード')
+    parser.add_argument('--replay', type=str, default=None,
+                       help='記録済みレスポンス（MARKET_DATA_RECORDで記録したJSONL）を再生')
+    parser.add_argument('--latency', type=float, default=0.0,
+                       help='REST APIの応答遅延（ミリ秒）デフォルト: 0')
+    parser.add_argument('--latency-jitter', type=float, default=0.0,
+                       help='応答遅延のゆらぎ（±ミリ秒）デフォルト: 0')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                       help='500エラーを返す割合（0〜1）デフォルト: 0')
+    parser.add_argument('--rate-limit', type=int, default=0,
+                       help='1分あたりのリクエスト上限（超えたら429）デフォルト: 0（無制限）')
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    
+    prices = None
+    if args.symbols:
+        prices = {}
+        for item in args.symbols.split(','):
+            symbol, _, price = item.partition('=')
+            prices[symbol.strip().upper()] = float(price) if price else 100.0
+    
+    exchange = FakeExchange(prices, args.tick_interval, args.volatility, args.seed,
+                            replay_file=args.replay, latency=args.latency, latency_jitter=args.latency_jitter,
+                            error_rate=args.error_rate, rate_limit=args.rate_limit)
+    
+    print("🧪 CryptoAlert Fake Exchange 起動")
+    print(f"📡 REST: http://{args.host}:{args.port}/api/v3")
+    print(f"🔌 Stream: ws://{args.host}:{args.port}/stream")
+    print(f"📊 銘柄: {', '.join(sorted(exchange.prices))}")
+    if exchange.recording:
+        print(f"📼 再生: {args.replay} ({sum(len(entries) for entries in exchange.recording.values())}件)")
+    if args.latency or args.error_rate or args.rate_limit:
+        print(f"💥 障害注入: 遅延 {args.latency:.0f}±{args.latency_jitter:.0f}ms, "
+              f"エラー率 {args.error_rate:.0%}, レート制限 {args.rate_limit or '無制限'}/分")
+    
+    web.run_app(exchange.make_app(), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
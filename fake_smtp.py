@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Fake SMTP - オフライン検証用のローカルSMTPサーバー
+受信したメールは保存せず件数と接続数だけを数える（AUTHは常に成功）
+
+使用方法:
+    python fake_smtp.py --port 2525 --delay 0.05
+    
+    # 1接続あたり50件受信したらサーバー側から切断（再接続の確認）
+    python fake_smtp.py --port 2525 --drop-after 50
+    
+    # 監視プロセスを模擬SMTPに接続
+    export SMTP_SERVER=127.0.0.1 SMTP_PORT=2525 SMTP_STARTTLS=0
+    python monitor.py
+"""
+
+import argparse
+import asyncio
+from typing import Dict
+
+class FakeSMTPServer:
+    """SMTPの最小サブセット（EHLO/AUTH/MAIL/RCPT/DATA/RSET/NOOP/QUIT）"""
+    
+    def __init__(self, delay: float = 0.0, verbose: bool = False, drop_after: int = 0):
+        self.delay = delay  # メッセージ受信ごとの応答遅延（秒）
+        self.verbose = verbose
+        self.drop_after = drop_after  # 1接続でこの件数を受信したら切断（0は切断しない）
+        self.stats: Dict[str, int] = {'connections': 0, 'messages': 0, 'logins': 0, 'drops': 0}
+    
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """1接続分のSMTPセッション"""
+        self.stats['connections'] += 1
+        
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+        
+        await reply("220 fake-smtp ESMTP ready")
+        received = 0
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                command = raw.decode(errors='replace').strip()
+                verb = command.split(' ', 1)[0].upper()
+                
+                if verb == 'EHLO':
+                    writer.write(b"250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+                    await writer.drain()
+                elif verb == 'HELO':
+                    await reply("250 fake-smtp")
+                elif verb == 'AUTH':
+                    self.stats['logins'] += 1
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                    await reply("250 OK")
+                elif verb == 'DATA':
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    while True:
+                        line = await reader.readline()
+                        if not line or line in (b".\r\n", b".\n"):
+                            break
+                    if self.delay:
+                        await asyncio.sleep(self.delay)
+                    self.stats['messages'] += 1
+                    received += 1
+                    if self.verbose:
+                        print(f"📨 受信 {self.stats['messages']}件目 (接続数: {self.stats['connections']})")
+                    await reply("250 OK queued")
+                    if self.drop_after and received >= self.drop_after:
+                        # QUITを待たずにサーバー側から切断
+                        self.stats['drops'] += 1
+                        break
+                elif verb == 'QUIT':
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+    
+    async def serve(self, host: str, port: int):
+        """サーバーを起動して待ち受け"""
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+def parse_arguments():
+    """コマンドライン引数解析"""
+    parser = argparse.ArgumentParser(description='CryptoAlert Fake SMTP')
+    
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                       help='待ち受けホスト デフォルト: 127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525,
+                       help='待ち受けポート デフォルト: 2525')
+    parser.add_argument('--delay', type=float, default=0.0,
+                       help='メッセージごとの応答遅延（秒）デフォルト: 0')
+    parser.add_argument('--drop-after', type=int, default=0,
+                       help='1接続でこの件数を受信したらサーバー側から切断（0は切断しない）')
+    parser.add_argument('--verbose', action='store_true',
+                       help='受信ごとにログを表示')
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    server = FakeSMTPServer(args.delay, args.verbose, args.drop_after)
+    
+    print("🧪 CryptoAlert Fake SMTP 起動")
+    print(f"📮 SMTP: {args.host}:{args.port} (STARTTLSなし)")
+    
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"\n📊 接続: {server.stats['connections']}, ログイン: {server.stats['logins']}, "
+              f"受信: {server.stats['messages']}, 切断: {server.stats['drops']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Login Limiter - ログイン試行のレート制限と監査ログの非同期書き込み
+ロック判定はメモリ上のスライディングウィンドウ（メールアドレス別・IPアドレス別）で行い、
+login_attempts（監査ログ）への記録はバックグラウンドスレッドがまとめて書き込む
+
+    メールアドレス: 直近30分の失敗が5回に達したらロック（従来のlogin_attemptsのCOUNTと同じ条件）
+    IPアドレス:     直近30分の失敗が20回に達したらロック（多数のメールアドレスを試す攻撃）
+
+クレデンシャルスタッフィングのような大量の試行でもデータベースへのCOUNT・コミットは発生しない
+ウィンドウはプロセスごと（起動直後に直近の失敗をlogin_attemptsから読み込む）
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Iterable, List, Optional, Tuple
+
+LOGIN_MAX_FAILURES = 5  # メールアドレスごとの失敗回数の上限
+LOGIN_MAX_IP_FAILURES = 20  # IPアドレスごとの失敗回数の上限
+LOGIN_WINDOW_SECONDS = 1800  # 失敗を数える時間（秒）
+MAX_TRACKED_KEYS = 100000  # ウィンドウを保持するキー数の上限（古いキーから破棄）
+
+LOGIN_AUDIT_FLUSH_INTERVAL = 1.0  # 監査ログを書き込む間隔（秒）
+LOGIN_AUDIT_BATCH_SIZE = 500  # この件数がたまったら間隔を待たずに書き込む
+LOGIN_AUDIT_MAX_PENDING = 50000  # 書き込み失敗が続いた場合に保持する件数の上限
+LOGIN_AUDIT_RETENTION_DAYS = 30  # login_attemptsの保持期間（日）
+LOGIN_AUDIT_PRUNE_INTERVAL = 3600  # 保持期間を過ぎた行を削除する間隔（秒）
+
+# 監査ログの1行: (メールアドレス, IPアドレス, 成功, 試行時刻 UTC 'YYYY-MM-DD HH:MM:SS')
+LoginAttempt = Tuple[str, Optional[str], bool, str]
+
+class SlidingWindowCounter:
+    """キーごとに直近の失敗時刻（最大limit件）を保持するスライディングウィンドウ
+    
+    キーは最後の失敗が古い順に並ぶため、期限切れのキーは先頭から取り除ける
+    """
+    
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = MAX_TRACKED_KEYS):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        
+        self._failures: 'OrderedDict[str, Deque[float]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._failures)
+    
+    def add(self, key: str, now: Optional[float] = None):
+        """失敗を記録（nowはtime.monotonic()の値）"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            timestamps = self._failures.get(key)
+            if timestamps is None:
+                timestamps = self._failures[key] = deque(maxlen=self.limit)
+            else:
+                self._failures.move_to_end(key)
+            timestamps.append(now)
+            self._prune(now)
+    
+    def is_limited(self, key: str, now: Optional[float] = None) -> bool:
+        """直近window_seconds秒の失敗がlimit回に達しているか"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            timestamps = self._failures.get(key)
+            return (timestamps is not None and len(timestamps) >= self.limit
+                    and now - timestamps[0] < self.window_seconds)
+    
+    def _prune(self, now: float):
+        """期限切れのキー・上限を超えたキーを古い順に削除"""
+        while self._failures:
+            key, timestamps = next(iter(self._failures.items()))
+            if now - timestamps[-1] < self.window_seconds and len(self._failures) <= self.max_keys:
+                break
+            self._failures.popitem(last=False)
+
+class LoginRateLimiter:
+    """メールアドレス別・IPアドレス別のログイン失敗ウィンドウ"""
+    
+    def __init__(self, max_failures: int = LOGIN_MAX_FAILURES, max_ip_failures: int = LOGIN_MAX_IP_FAILURES,
+                 window_seconds: float = LOGIN_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.emails = SlidingWindowCounter(max_failures, window_seconds)
+        self.ips = SlidingWindowCounter(max_ip_failures, window_seconds)
+        self.loaded = False
+    
+    def is_locked(self, email: str, ip_address: Optional[str] = None, now: Optional[float] = None) -> bool:
+        """メールアドレスまたはIPアドレスがロック中か"""
+        if self.emails.is_limited(email, now):
+            return True
+        return bool(ip_address) and self.ips.is_limited(ip_address, now)
+    
+    def record_failure(self, email: str, ip_address: Optional[str] = None, now: Optional[float] = None):
+        """失敗したログインを記録"""
+        self.emails.add(email, now)
+        if ip_address:
+            self.ips.add(ip_address, now)
+    
+    def load(self, failures: Iterable[Tuple[str, Optional[str], float]]):
+        """過去の失敗（メールアドレス, IPアドレス, 経過秒数）を古い順に読み込む"""
+        now = time.monotonic()
+        for email, ip_address, age_seconds in failures:
+            self.record_failure(email, ip_address, now - age_seconds)
+        self.loaded = True
+
+class LoginAuditWriter:
+    """ログイン試行をまとめてlogin_attemptsに書き込むバックグラウンドスレッド
+    
+    write_batch: 行のリストを1トランザクションで書き込む関数（失敗時はsqlite3.Errorを送出）
+    prune:       保持期間を過ぎた行を削除して件数を返す関数
+    """
+    
+    def __init__(self, write_batch: Callable[[List[LoginAttempt]], None], prune: Callable[[], int],
+                 flush_interval: float = LOGIN_AUDIT_FLUSH_INTERVAL, batch_size: int = LOGIN_AUDIT_BATCH_SIZE,
+                 prune_interval: float = LOGIN_AUDIT_PRUNE_INTERVAL):
+        self.write_batch = write_batch
+        self.prune = prune
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.prune_interval = prune_interval
+        
+        self.stats = {'written': 0, 'pruned': 0, 'dropped': 0, 'errors': 0}
+        self._pending: List[LoginAttempt] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_prune = time.monotonic()
+    
+    def record(self, email: str, ip_address: Optional[str], success: bool):
+        """試行をキューに追加（初回呼び出し時に書き込みスレッドを開始）"""
+        attempted_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():  # fork後は子プロセスで開始し直す
+                self._start()
+            self._pending.append((email, ip_address, success, attempted_at))
+            if len(self._pending) >= self.batch_size:
+                self._wake_event.set()
+    
+    def pending_count(self) -> int:
+        """未書き込みの件数"""
+        with self._lock:
+            return len(self._pending)
+    
+    def flush(self) -> int:
+        """キューの行を書き込み、書き込んだ件数を返す（失敗時は次回に再試行）"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                self.write_batch(rows)
+            except sqlite3.Error as e:
+                self.stats['errors'] += 1
+                with self._lock:
+                    self._pending = rows + self._pending
+                    overflow = len(self._pending) - LOGIN_AUDIT_MAX_PENDING
+                    if overflow > 0:
+                        del self._pending[:overflow]
+                        self.stats['dropped'] += overflow
+                print(f"⚠️ ログイン監査ログ書き込みエラー: {e}")
+                return 0
+            self.stats['written'] += len(rows)
+            return len(rows)
+    
+    def close(self):
+        """書き込みスレッドを停止して残りを書き込む"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._stop_event.set()
+            self._wake_event.set()
+            thread.join()
+        self._thread = None
+        self.flush()
+    
+    def _start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='login-audit-writer', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.flush_interval)
+            self._wake_event.clear()
+            self.flush()
+            
+            now = time.monotonic()
+            if now - self._last_prune >= self.prune_interval:
+                self._last_prune = now
+                try:
+                    self.stats['pruned'] += self.prune()
+                except sqlite3.Error as e:
+                    self.stats['errors'] += 1
+                    print(f"⚠️ ログイン監査ログ削除エラー: {e}")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Market Data - 市場データ取得プロバイダー
+Binance REST API互換のJSONを返すプロバイダーを差し替え可能にする
+（Webアプリ・監視プロセス・横ばい検出ツールの共通の取得経路）
+
+    BinanceRESTProvider: Binance REST API（BINANCE_API_URLで接続先を変更可、fake_exchange.pyにも接続可）
+    ReplayProvider:      記録済みレスポンス（JSONL）を再生（ネットワーク不要・決定的）
+
+環境変数:
+    BINANCE_API_URL       REST APIのベースURL
+    MARKET_DATA_RECORD    指定したファイルにレスポンスを記録（JSONL）
+    MARKET_DATA_REPLAY    指定したファイルの記録済みレスポンスを再生（ネットワークに接続しない）
+"""
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from monitor_metrics import BINANCE_REQUEST_SECONDS, BINANCE_ERRORS
+
+BINANCE_API_URL = os.getenv('BINANCE_API_URL', "https://api.binance.com/api/v3")
+RATE_LIMIT_STATUSES = (429, 418)  # 418はレート制限超過を続けた場合のIP禁止
+DEFAULT_RETRY_AFTER = 60  # Retry-Afterがない場合の待機秒数
+
+class RateLimitError(requests.exceptions.RequestException):
+    """レート制限（429/418）中のため取得しなかった"""
+    
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def request_key(path: str, params: Optional[Dict] = None) -> str:
+    """記録・再生用のリクエストキー（パス + 正規化したパラメータ）
+    
+    値は文字列に揃える（クエリ文字列から組み立てた場合と同じキーになる）
+    """
+    if not params:
+        return path
+    normalized = {name: str(value) for name, value in params.items()}
+    return f"{path}?{json.dumps(normalized, sort_keys=True, separators=(',', ':'))}"
+
+class MarketDataProvider(ABC):
+    """市場データプロバイダーの共通インターフェース
+    
+    get_jsonは失敗時にrequests.exceptions.RequestException（HTTPErrorを含む）を送出する
+    """
+    
+    @abstractmethod
+    def get_json(self, path: str, params: Optional[Dict] = None, timeout: float = 10):
+        """APIパス（例: /ticker/price）のレスポンスJSONを取得"""
+    
+    def ticker_price(self, symbol: Optional[str] = None, symbols: Optional[List[str]] = None):
+        """/ticker/price（単一銘柄・複数銘柄・全銘柄）"""
+        return self.get_json('/ticker/price', self._symbol_params(symbol, symbols))
+    
+    def ticker_24hr(self, symbol: Optional[str] = None, symbols: Optional[List[str]] = None):
+        """/ticker/24hr（単一銘柄・複数銘柄・全銘柄）"""
+        return self.get_json('/ticker/24hr', self._symbol_params(symbol, symbols))
+    
+    def exchange_info(self) -> Dict:
+        """/exchangeInfo"""
+        return self.get_json('/exchangeInfo', timeout=15)
+    
+    def klines(self, symbol: str, interval: str = '1d', limit: int = 30) -> List:
+        """/klines"""
+        return self.get_json('/klines', {'symbol': symbol, 'interval': interval, 'limit': limit})
+    
+    @staticmethod
+    def _symbol_params(symbol: Optional[str], symbols: Optional[List[str]]) -> Optional[Dict]:
+        if symbol:
+            return {'symbol': symbol}
+        if symbols:
+            return {'symbols': json.dumps(sorted(symbols), separators=(',', ':'))}
+        return None
+
+class BinanceRESTProvider(MarketDataProvider):
+    """Binance REST API（スレッドごとにKeep-Aliveセッションを再利用）
+    
+    429/418を受けた場合はRetry-Afterの間リクエストを送らずにRateLimitErrorを送出する
+    """
+    
+    def __init__(self, base_url: str = BINANCE_API_URL, record_file: Optional[str] = None):
+        self.base_url = base_url.rstrip('/')
+        self.record_file = record_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0  # monotonic
+    
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+    
+    def _check_rate_limit(self, path: str):
+        remaining = self._blocked_until - time.monotonic()
+        if remaining > 0:
+            BINANCE_ERRORS.inc(endpoint=path)
+            raise RateLimitError(f"レート制限中のため {remaining:.0f}秒間リクエストを停止しています", remaining)
+    
+    def _handle_response(self, path: str, params: Optional[Dict], status: int, body, headers) -> object:
+        """ステータスに応じて記録・レート制限・HTTPErrorを処理"""
+        self._record(path, params, status, body)
+        if status in RATE_LIMIT_STATUSES:
+            try:
+                retry_after = float(headers.get('Retry-After', DEFAULT_RETRY_AFTER))
+            except ValueError:
+                retry_after = DEFAULT_RETRY_AFTER
+            with self._lock:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            print(f"⚠️ Binance APIレート制限 ({status}): {retry_after:.0f}秒間停止します")
+            raise RateLimitError(f"{status} レート制限: {path}", retry_after)
+        if status >= 400:
+            raise requests.exceptions.HTTPError(f"{status} エラー: {path} {body}")
+        return body
+    
+    def get_json(self, path: str, params: Optional[Dict] = None, timeout: float = 10):
+        self._check_rate_limit(path)
+        try:
+            with BINANCE_REQUEST_SECONDS.time(endpoint=path):
+                response = self._session().get(f"{self.base_url}{path}", params=params, timeout=timeout)
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = response.text
+            return self._handle_response(path, params, response.status_code, body, response.headers)
+        except requests.exceptions.RequestException:
+            BINANCE_ERRORS.inc(endpoint=path)
+            raise
+    
+    def _record(self, path: str, params: Optional[Dict], status: int, body):
+        """レスポンスをJSONLに追記（ReplayProvider・fake_exchange.py --replay で再生）"""
+        if not self.record_file:
+            return
+        line = json.dumps({'path': path, 'params': params, 'status': status, 'body': body},
+                          ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            with open(self.record_file, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+def load_recording(record_file: str) -> Dict[str, List[Tuple[int, object]]]:
+    """記録ファイルを リクエストキー -> [(ステータス, レスポンス), ...] に変換"""
+    responses: Dict[str, List[Tuple[int, object]]] = {}
+    with open(record_file, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            key = request_key(entry['path'], entry.get('params'))
+            responses.setdefault(key, []).append((entry.get('status', 200), entry['body']))
+    return responses
+
+class ReplayProvider(MarketDataProvider):
+    """記録済みレスポンスを再生するプロバイダー
+    
+    同じリクエストが複数回記録されている場合は記録順に返し、最後まで行ったら先頭に戻る
+    """
+    
+    def __init__(self, record_file: str):
+        self.record_file = record_file
+        self.responses = load_recording(record_file)
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def get_json(self, path: str, params: Optional[Dict] = None, timeout: float = 10):
+        key = request_key(path, params)
+        with self._lock:
+            entries = self.responses.get(key)
+            if not entries:
+                raise requests.exceptions.ConnectionError(f"記録にないリクエスト: {key}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = (position + 1) % len(entries)
+        status, body = entries[position]
+        
+        if status in RATE_LIMIT_STATUSES:
+            raise RateLimitError(f"{status} レート制限: {path}", DEFAULT_RETRY_AFTER)
+        if status >= 400:
+            raise requests.exceptions.HTTPError(f"{status} エラー: {path} {body}")
+        return body
+
+_default_provider: Optional[MarketDataProvider] = None
+_default_lock = threading.Lock()
+
+def get_market_data_provider() -> MarketDataProvider:
+    """環境変数に応じたプロセス共通のプロバイダー（レート制限状態を共有する）"""
+    global _default_provider
+    with _default_lock:
+        if _default_provider is None:
+            replay_file = os.getenv('MARKET_DATA_REPLAY')
+            if replay_file:
+                _default_provider = ReplayProvider(replay_file)
+            else:
+                _default_provider = BinanceRESTProvider(BINANCE_API_URL, os.getenv('MARKET_DATA_RECORD'))
+        return _default_provider
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Market Stats - メール本文用の24時間統計スナップショット
+発火したサイクルで対象銘柄の24時間統計を一括取得して共有し、
+メール作成時はこのスナップショットを参照する（同じ銘柄の発火が何件あってもAPI呼び出しは1回）
+
+スナップショットにない銘柄（再起動後の未送信メールなど）は銘柄ごとに1回だけ取得する
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from database_schema import AlertDatabase
+
+MIN_STATS_TTL = 60  # 24時間統計を使い回す最短時間（秒）
+
+class MarketStatsSnapshot:
+    """銘柄 -> 24時間統計のスナップショット（スレッドセーフ）"""
+    
+    def __init__(self, db: AlertDatabase, ttl: float = MIN_STATS_TTL):
+        self.db = db
+        self.ttl = max(MIN_STATS_TTL, ttl)
+        self._stats: Dict[str, Tuple[float, Optional[Dict]]] = {}  # 銘柄 -> (取得時刻, 統計)
+        self._lock = threading.Lock()
+        # 取得処理を直列化（一括取得中に同じ銘柄を個別取得しない）
+        self._fetch_lock = threading.Lock()
+        self.stats = {'bulk_requests': 0, 'single_requests': 0, 'hits': 0}
+    
+    def _cached(self, symbol: str, now: float) -> Tuple[bool, Optional[Dict]]:
+        with self._lock:
+            entry = self._stats.get(symbol)
+        if entry is None or now - entry[0] > self.ttl:
+            return False, None
+        return True, entry[1]
+    
+    def _store(self, symbols: Iterable[str], fetched: Dict[str, Dict], now: float):
+        with self._lock:
+            # 取得できなかった銘柄も記録し、TTL内は再取得しない
+            for symbol in symbols:
+                self._stats[symbol] = (now, fetched.get(symbol))
+            # 期限切れのエントリを掃除
+            expired = [symbol for symbol, (fetched_at, _) in self._stats.items() if now - fetched_at > self.ttl]
+            for symbol in expired:
+                del self._stats[symbol]
+    
+    def prefetch(self, symbols: Iterable[str]):
+        """スナップショットにない銘柄の24時間統計を一括取得"""
+        with self._fetch_lock:
+            now = time.monotonic()
+            missing = sorted({symbol for symbol in symbols if not self._cached(symbol, now)[0]})
+            if not missing:
+                return
+            
+            fetched = self.db.get_24hr_stats_bulk(missing)
+            self.stats['bulk_requests'] += 1
+            self._store(missing, fetched, time.monotonic())
+    
+    def get(self, symbol: str) -> Optional[Dict]:
+        """銘柄の24時間統計（スナップショットになければ1回だけ取得）"""
+        found, stats = self._cached(symbol, time.monotonic())
+        if found:
+            self.stats['hits'] += 1
+            return stats
+        
+        with self._fetch_lock:
+            # 待機中に他のスレッドが取得済みの場合
+            found, stats = self._cached(symbol, time.monotonic())
+            if found:
+                self.stats['hits'] += 1
+                return stats
+            
+            stats = self.db.get_24hr_stats(symbol)
+            self.stats['single_requests'] += 1
+            self._store([symbol], {symbol: stats} if stats else {}, time.monotonic())
+            return stats
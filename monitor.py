@@ -12,19 +12,49 @@ CryptoAlert Monitor Process - 上昇・下落アラート対応版（完全修
     
     # デバッグモード
     python monitor.py --debug
+    
+    # NumPy一括評価エンジン
+    python monitor.py --engine vectorized
+    
+    # メール送信ワーカー数
+    python monitor.py --email-workers 8
+    
+    # 優先度スケジューラ（発火価格から遠い銘柄のチェックを間引く）
+    python monitor.py --priority-schedule --max-check-interval 900
+    
+    # 同一ユーザーの発火を60秒まとめてダイジェスト1通で送信
+    python monitor.py --digest-window 60
+    
+    # サイクル超過時に取りこぼした周期を実行しない（デフォルトはまとめて1回実行）
+    python monitor.py --overrun-policy skip
+    
+    # メトリクスエンドポイント（Prometheus形式）
+    python monitor.py --metrics-port 9108
+    
+    # 価格履歴（生の価格）の保持時間（1分足・1時間足・日足へのロールアップは常に実行、0は記録しない）
+    python monitor.py --price-history-hours 24
+    
+    # シャード分割実行（同じコマンドを複数プロセス・複数ホストで起動）
+    python monitor.py --shards 64
+    
+    # ストリーミングモード（WebSocketでティックごとに判定）
+    python monitor.py --stream
 
 サービス側環境変数設定:
     export SERVICE_GMAIL="alerts@your-domain.com"
     export SERVICE_GMAIL_PASS="your_service_app_password"
     export SERVICE_NAME="CryptoAlert Service"
+    
+    # SMTPサーバー（ローカル検証時は python fake_smtp.py と組み合わせる）
+    export SMTP_SERVER="127.0.0.1" SMTP_PORT="2525" SMTP_STARTTLS="0"
 """
 
 import os
 import time
-import smtplib
+import asyncio
 import argparse
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 import signal
 import sys
 
@@ -32,19 +62,84 @@ import sys
 import email.mime.text
 import email.mime.multipart
 
+import numpy as np
+
 # 自作データベースクラスをインポート
-from database_schema import AlertDatabase
+from database_schema import AlertDatabase, PRICE_HISTORY_RETENTION_HOURS
+from trigger_index import TriggerIndex
+from vectorized_engine import AlertBatch
+from price_stream import PriceStreamMonitor, BINANCE_STREAM_URL
+from email_outbox import EmailOutboxDispatcher
+from smtp_pool import SMTPConnectionPool
+from alert_cache import ActiveAlertCache
+from shard_lease import ShardCoordinator
+from check_scheduler import CheckScheduler
+from cycle_clock import FixedRateClock
+from market_stats import MarketStatsSnapshot
+from price_rollup import PriceHistoryRollup
+from monitor_metrics import (MetricsServer, CYCLE_SECONDS, LAST_CYCLE_TIMESTAMP, ALERTS_TRIGGERED, QUEUE_DEPTH,
+                             ENGINE_EVAL_SECONDS)
+
+STATUS_REPORT_INTERVAL = 3600  # 定期統計報告の間隔（秒）
 
 class CryptoAlertService:
     """サービス代行型アラートシステム（上昇・下落対応）"""
     
-    def __init__(self, check_interval: int = 60, debug: bool = False):
-        self.db = AlertDatabase()
+    def __init__(self, check_interval: int = 60, debug: bool = False, engine: str = 'index',
+                 email_workers: int = 4, shard_count: int = 0, priority_schedule: bool = False,
+                 max_check_interval: int = 900, overrun_policy: str = 'compact', digest_window: int = 0,
+                 price_history_hours: int = PRICE_HISTORY_RETENTION_HOURS, db: Optional[AlertDatabase] = None):
+        self.db = db or AlertDatabase()
         self.check_interval = check_interval
         self.debug = debug
+        self.engine = engine  # 'index'（発火価格インデックス）または 'vectorized'（NumPy一括評価）
         self.running = True
+        self.cycle_count = 0
+        self.cycle_started_at: Optional[float] = None  # 直近サイクルの開始時刻（monotonic）
+        self.next_status_at: Optional[float] = None  # 次回の定期統計報告時刻（monotonic）
+        
+        # 固定レートのサイクル時計（処理時間で周期が延びない）
+        self.clock = FixedRateClock(check_interval, overrun_policy)
         self.service_config = self._load_service_config()
         
+        # メール本文用の24時間統計（発火したサイクルで一括取得して共有）
+        self.market_stats = MarketStatsSnapshot(self.db, check_interval)
+        
+        # 価格履歴（サイクルごとのスナップショット）とOHLCロールアップ（0は記録しない）
+        self.db.record_price_history = price_history_hours > 0
+        self.price_rollup = PriceHistoryRollup(self.db, price_history_hours) if price_history_hours > 0 else None
+        
+        # アクティブアラートのキャッシュ（変更ログの差分だけを反映）
+        self.alert_cache = ActiveAlertCache(self.db)
+        
+        # シャード分割実行（複数の監視プロセスで銘柄を分担、0は単独実行）
+        self.shards = ShardCoordinator(self.db, shard_count, check_interval * 3) if shard_count > 0 else None
+        
+        # 優先度スケジューラ（発火価格までの距離とボラティリティで銘柄ごとのチェック間隔を決める）
+        self.scheduler = CheckScheduler(check_interval, max_check_interval) if priority_schedule else None
+        
+        # 発火価格インデックス（alert_id -> アラート情報も保持）
+        self.trigger_index = TriggerIndex()
+        self.indexed_alerts: Dict[int, Dict] = {}
+        
+        # NumPy一括評価の列配列（キャッシュの差分だけを反映し、サイクルごとに作り直さない）
+        self.alert_batch = AlertBatch()
+        
+        # 認証済みSMTPセッションのプール（送信ワーカーごとに1セッション）
+        self.smtp_pool = SMTPConnectionPool(
+            self.service_config['smtp_server'],
+            self.service_config['smtp_port'],
+            self.service_config['service_email'],
+            self.service_config['service_password'],
+            use_starttls=self.service_config['smtp_starttls'],
+            size=email_workers
+        )
+        
+        # メール送信キュー（発火時はalert_historyに記録し、ワーカーが送信）
+        # digest_window > 0 の場合は同一ユーザーの発火をまとめて1通で送信
+        self.outbox = EmailOutboxDispatcher(self.db, self.deliver_outbox_email, email_workers, debug=debug,
+                                            digest_func=self.deliver_outbox_digest, digest_window=digest_window)
+        
         # 送信統計（タイプ別）
         self.stats = {
             'emails_sent': 0,
@@ -55,6 +150,10 @@ class CryptoAlertService:
             'start_time': datetime.now()
         }
         
+        # キュー長メトリクス（メトリクス出力時に取得）
+        QUEUE_DEPTH.set_function(self.outbox.pending_count, queue='email_outbox')
+        QUEUE_DEPTH.set_function(self.db.pending_price_writes, queue='price_writes')
+        
         # シグナルハンドラー設定（Ctrl+Cで停止）
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -62,8 +161,9 @@ class CryptoAlertService:
     def _load_service_config(self) -> Dict:
         """サービス側メール設定を読み込み"""
         config = {
-            'smtp_server': 'smtp.gmail.com',
-            'smtp_port': 587,
+            'smtp_server': os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
+            'smtp_port': int(os.getenv('SMTP_PORT', '587')),
+            'smtp_starttls': os.getenv('SMTP_STARTTLS', '1') != '0',
             'service_email': os.getenv('SERVICE_GMAIL', 'alerts@cryptoalert.com'),
             'service_password': os.getenv('SERVICE_GMAIL_PASS', ''),
             'service_name': os.getenv('SERVICE_NAME', 'CryptoAlert Service'),
@@ -82,8 +182,11 @@ class CryptoAlertService:
         print(f"\n🛑 監視停止シグナル受信 (signal: {signum})")
         self.running = False
     
-    def create_alert_email(self, alert_data: Dict) -> Dict:
-        """アラートメールの内容を作成（上昇・下落対応）"""
+    def create_alert_email(self, alert_data: Dict, market_stats: Optional[Dict] = None) -> Dict:
+        """アラートメールの内容を作成（上昇・下落対応）
+        
+        market_statsが渡されない場合は24時間統計スナップショットを参照する
+        """
         
         alert_type = alert_data.get('alert_type', 'rise')
         is_rise = alert_type == 'rise'
@@ -119,7 +222,7 @@ Hi there! 👋
 """
         
         # 24時間統計を追加
-        stats = self.db.get_24hr_stats(alert_data['symbol'])
+        stats = market_stats or self.market_stats.get(alert_data['symbol'])
         if stats:
             body_text += f"""
 
@@ -194,35 +297,80 @@ Best regards,
             'to_email': alert_data['user_email']
         }
     
-    def send_service_email(self, alert_data: Dict) -> bool:
+    def create_digest_email(self, alerts: List[Dict]) -> Dict:
+        """同一ユーザーの複数アラート発火をまとめたダイジェストメールを作成"""
+        rise_count = sum(1 for alert in alerts if alert.get('alert_type', 'rise') == 'rise')
+        fall_count = len(alerts) - rise_count
+        
+        subject = f"🔔 CryptoAlert - {len(alerts)}件のアラートが発火 (📈{rise_count} / 📉{fall_count})"
+        
+        body_text = f"""
+🎯 CryptoAlert - {len(alerts)}件のアラートが発火しました！
+
+Hi there! 👋
+
+短時間に複数のアラートが発火したため、1通にまとめてお知らせします。
+"""
+        
+        for number, alert in enumerate(alerts, 1):
+            is_rise = alert.get('alert_type', 'rise') == 'rise'
+            direction_icon = "📈" if is_rise else "📉"
+            direction_text = "上昇" if is_rise else "下落"
+            
+            body_text += f"""
+{direction_icon} {number}. {alert['symbol']} ({alert['base_symbol']}/USDT) {direction_text}アラート
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+• 発火価格: ${alert['trigger_price']:,.6f}
+• 基準価格: ${alert['base_price']:,.6f}
+• 価格変動: {alert['price_change']:+.2f}% (設定閾値: {alert['threshold_percent']:+.2f}%)
+• 発火時刻: {alert['triggered_at']} (UTC)
+"""
+            stats = self.market_stats.get(alert['symbol'])
+            if stats:
+                body_text += f"• 24h変動率: {stats['priceChangePercent']:+.2f}% (高値 ${stats['highPrice']:,.6f} / 安値 ${stats['lowPrice']:,.6f})\n"
+            body_text += f"• このアラートを停止: {self.service_config['website_url']}/stop?token={alert.get('alert_token', '')}\n"
+        
+        body_text += f"""
+
+🔄 次のステップ
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+✅ これらのアラートは自動的に無効化されました
+🎯 新しいアラートを {self.service_config['website_url']} で作成
+
+───────────────────────────────────────────────────────────────
+
+Best regards,
+{self.service_config['service_name']} 🚀
+
+📧 送信先: {alerts[0]['user_email']}
+🌐 ウェブサイト: {self.service_config['website_url']}
+💬 サポート: {self.service_config['support_email']}
+
+───────────────────────────────────────────────────────────────
+
+🔗 アラート管理
+• 全て配信停止: {self.service_config['website_url']}/unsubscribe?token={alerts[0].get('unsubscribe_token', '')}
+
+⚠️ 免責事項
+これは投資助言ではありません。投資は自己責任で行ってください。
+暗号通貨投資は高いリスクを伴います。
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+{self.service_config['service_name']} | 自動暗号通貨アラート
+"""
+        
+        return {
+            'subject': subject,
+            'body': body_text,
+            'from_email': self.service_config['service_email'],
+            'from_name': self.service_config['service_name'],
+            'to_email': alerts[0]['user_email']
+        }
+    
+    def send_service_email(self, alert_data: Dict, market_stats: Optional[Dict] = None) -> bool:
         """サービス側固定アカウントからメール送信"""
         try:
-            # メール内容作成
-            email_content = self.create_alert_email(alert_data)
-            
-            # MIMEメッセージ作成
-            msg = email.mime.multipart.MIMEMultipart()
-            msg['From'] = f"{email_content['from_name']} <{email_content['from_email']}>"
-            msg['To'] = email_content['to_email']
-            msg['Subject'] = email_content['subject']
-            msg['Reply-To'] = self.service_config['support_email']
-            
-            # 本文添付
-            msg.attach(email.mime.text.MIMEText(email_content['body'], 'plain', 'utf-8'))
-            
-            # SMTP送信（サービス側アカウント使用）
-            with smtplib.SMTP(self.service_config['smtp_server'], self.service_config['smtp_port']) as server:
-                server.starttls()
-                server.login(
-                    self.service_config['service_email'],
-                    self.service_config['service_password']
-                )
-                server.send_message(msg)
-            
-            alert_type = alert_data.get('alert_type', 'rise')
-            direction = "上昇" if alert_type == 'rise' else "下落"
-            print(f"✅ {direction}メール送信成功: {alert_data['user_email']} ({alert_data['symbol']})")
-            self.stats['emails_sent'] += 1
+            self._send_email(alert_data, market_stats)
             return True
             
         except Exception as e:
@@ -233,6 +381,45 @@ Best regards,
                 traceback.print_exc()
             return False
     
+    def deliver_outbox_email(self, row: Dict):
+        """送信キューの1件を送信（失敗時は例外を送出し、キュー側で再送）"""
+        self._send_email({**row, 'current_price': row['trigger_price']})
+    
+    def deliver_outbox_digest(self, rows: List[Dict]):
+        """送信キューの同一ユーザー複数件をダイジェスト1通で送信（失敗時は例外を送出）"""
+        latency = self._send_content(self.create_digest_email(rows))
+        
+        symbols = ', '.join(sorted({row['symbol'] for row in rows}))
+        print(f"✅ ダイジェストメール送信成功: {rows[0]['user_email']} ({len(rows)}件: {symbols}) {latency:.0f}ms")
+    
+    def _send_email(self, alert_data: Dict, market_stats: Optional[Dict] = None):
+        """メールを作成して送信（失敗時は例外を送出）"""
+        # メール内容作成
+        email_content = self.create_alert_email(alert_data, market_stats)
+        
+        latency = self._send_content(email_content)
+        
+        alert_type = alert_data.get('alert_type', 'rise')
+        direction = "上昇" if alert_type == 'rise' else "下落"
+        print(f"✅ {direction}メール送信成功: {alert_data['user_email']} ({alert_data['symbol']}) {latency:.0f}ms")
+    
+    def _send_content(self, email_content: Dict) -> float:
+        """作成済みのメール内容を送信し、送信時間（ミリ秒）を返す"""
+        # MIMEメッセージ作成
+        msg = email.mime.multipart.MIMEMultipart()
+        msg['From'] = f"{email_content['from_name']} <{email_content['from_email']}>"
+        msg['To'] = email_content['to_email']
+        msg['Subject'] = email_content['subject']
+        msg['Reply-To'] = self.service_config['support_email']
+        
+        # 本文添付
+        msg.attach(email.mime.text.MIMEText(email_content['body'], 'plain', 'utf-8'))
+        
+        # SMTP送信（サービス側アカウントのプール済みセッションを使用）
+        latency = self.smtp_pool.send_message(msg)
+        self.stats['emails_sent'] += 1
+        return latency
+    
     def test_service_email(self) -> bool:
         """サービスメール設定をテスト（上昇・下落両方）"""
         print("🧪 サービスメール設定テスト中...")
@@ -300,8 +487,11 @@ Best regards,
             print(f"❌ テストメール送信失敗: {e}")
             return False
     
-    def process_alert(self, alert: Dict) -> bool:
-        """個別アラートを処理（上昇・下落対応）"""
+    def process_alert(self, alert: Dict, current_price: Optional[float] = None) -> bool:
+        """個別アラートを処理（上昇・下落対応）
+        
+        current_priceにはサイクル開始時の価格スナップショットの値を渡す
+        """
         try:
             alert_type = alert.get('alert_type', 'rise')
             direction = "上昇" if alert_type == 'rise' else "下落"
@@ -310,7 +500,7 @@ Best regards,
                 print(f"🔍 {direction}アラート処理中: {alert['symbol']} (ID: {alert['id']}) → {alert['email']}")
             
             # アラート条件チェック
-            result = self.db.check_alert_condition(alert)
+            result = self.db.check_alert_condition(alert, current_price)
             if not result:
                 if self.debug:
                     print(f"   ⚠️ 価格取得失敗: {alert['symbol']}")
@@ -322,36 +512,8 @@ Best regards,
                 
                 print(f"🚨 {result_direction}アラート発火! {result['symbol']}: {result['price_change']:+.2f}% → {result['user_email']}")
                 
-                # メール送信データ準備
-                email_data = {
-                    **result,
-                    'base_symbol': alert['base_symbol'],
-                    'alert_token': alert.get('alert_token', ''),
-                    'unsubscribe_token': alert.get('unsubscribe_token', '')
-                }
-                
-                # サービス側からメール送信
-                email_sent = self.send_service_email(email_data)
-                
-                # データベース更新
-                self.db.trigger_alert(
-                    alert['id'], 
-                    result['current_price'], 
-                    result['price_change'],
-                    result_type
-                )
-                
-                if email_sent:
-                    self.db.mark_email_sent(alert['id'])
-                
-                # 統計更新
-                self.stats['alerts_triggered'] += 1
-                if result_type == 'rise':
-                    self.stats['rise_alerts_triggered'] += 1
-                else:
-                    self.stats['fall_alerts_triggered'] += 1
-                
-                return True
+                # データベース更新（メールは送信キューのワーカーが送信）
+                return self._record_trigger(alert, result)
             else:
                 if self.debug:
                     result_type = result.get('alert_type', 'rise')
@@ -367,60 +529,310 @@ Best regards,
                 traceback.print_exc()
             return False
     
+    def _record_trigger(self, alert: Dict, result: Dict) -> bool:
+        """発火をデータベース（メール送信キュー）と統計に記録
+        
+        他の監視プロセスが先に発火させていた場合はFalseを返す
+        """
+        result_type = result.get('alert_type', 'rise')
+        
+        history_id = self.db.trigger_alert(
+            alert['id'], 
+            result['current_price'], 
+            result['price_change'],
+            result_type
+        )
+        if history_id is None:
+            return False
+        self.market_stats.prefetch([alert['symbol']])
+        self.outbox.wake()
+        
+        self._count_trigger_stats(result_type)
+        return True
+    
+    def process_candidates(self, candidates: List[Tuple[Dict, float]]) -> Set[int]:
+        """発火候補をまとめて判定し、発火分を1トランザクションで記録
+        
+        戻り値: 発火を確定したアラートID（他の監視プロセスが先に発火させたものは含まない）
+        """
+        triggers = []
+        for alert, current_price in candidates:
+            try:
+                result = self.db.check_alert_condition(alert, current_price)
+            except Exception as e:
+                print(f"❌ アラート処理エラー (ID: {alert.get('id', 'unknown')}): {e}")
+                self.stats['errors'] += 1
+                continue
+            
+            if result and result['triggered']:
+                triggers.append({
+                    'alert_id': alert['id'],
+                    'trigger_price': result['current_price'],
+                    'price_change': result['price_change'],
+                    'alert_type': result.get('alert_type', 'rise')
+                })
+        
+        if not triggers:
+            return set()
+        
+        # データベース更新（メールは送信キューのワーカーが送信）
+        rows = self.db.trigger_alerts_bulk(triggers)
+        if rows:
+            # メール作成前に発火銘柄の24時間統計を一括取得
+            self.market_stats.prefetch(row['symbol'] for row in rows)
+            self.outbox.wake()
+        
+        for row in rows:
+            direction = "上昇" if row['alert_type'] == 'rise' else "下落"
+            print(f"🚨 {direction}アラート発火! {row['symbol']}: {row['price_change']:+.2f}% → {row['user_email']}")
+            self._count_trigger_stats(row['alert_type'])
+        
+        if len(rows) < len(triggers):
+            print(f"⏭️ 発火済みまたは停止済みのため省略: {len(triggers) - len(rows)}件")
+        
+        return {row['alert_id'] for row in rows}
+    
+    def _count_trigger_stats(self, alert_type: str):
+        """サービス統計に発火を加算"""
+        ALERTS_TRIGGERED.inc(alert_type=alert_type)
+        self.stats['alerts_triggered'] += 1
+        if alert_type == 'rise':
+            self.stats['rise_alerts_triggered'] += 1
+        else:
+            self.stats['fall_alerts_triggered'] += 1
+    
+    @staticmethod
+    def _new_cycle_stats() -> Dict:
+        """サイクル統計の初期値"""
+        return {
+            'processed': 0, 
+            'triggered': 0, 
+            'rise_triggered': 0, 
+            'fall_triggered': 0, 
+            'errors': 0,
+            'skipped': 0
+        }
+    
+    @staticmethod
+    def _count_triggered(cycle_stats: Dict, alert: Dict):
+        """サイクル統計に発火を加算"""
+        cycle_stats['triggered'] += 1
+        if alert.get('alert_type', 'rise') == 'rise':
+            cycle_stats['rise_triggered'] += 1
+        else:
+            cycle_stats['fall_triggered'] += 1
+    
+    def _report_cycle(self, rise_count: int, fall_count: int):
+        """監視対象の件数を表示"""
+        print(f"🔄 監視中: {rise_count + fall_count}件のアラート (上昇: {rise_count}, 下落: {fall_count})")
+    
+    def _report_cycle_result(self, cycle_stats: Dict, cycle_time: float):
+        """サイクル結果を表示"""
+        if self.debug or cycle_stats['triggered'] > 0:
+            print(f"📊 サイクル完了: 処理={cycle_stats['processed']}, 発火={cycle_stats['triggered']} (上昇:{cycle_stats['rise_triggered']}, 下落:{cycle_stats['fall_triggered']}), エラー={cycle_stats['errors']}, 価格なし={cycle_stats['skipped']}, 時間={cycle_time:.1f}秒")
+    
+    def _find_candidates(self, prices: Dict[str, float], cycle_stats: Dict,
+                         symbols: List[str]) -> List[Tuple[Dict, float]]:
+        """評価エンジンで発火候補を抽出（symbolsは今回チェックする銘柄）"""
+        with ENGINE_EVAL_SECONDS.time(engine=self.engine):
+            if self.engine == 'vectorized':
+                return self._find_candidates_vectorized(prices, cycle_stats, symbols)
+            return self._find_candidates_index(prices, cycle_stats, symbols)
+    
+    def _monitored_counts(self) -> Tuple[int, int]:
+        """評価エンジンに登録されている上昇・下落別のアラート数"""
+        if self.engine == 'vectorized':
+            return self.alert_batch.type_counts()
+        return self.trigger_index.type_counts()
+    
+    def _select_due(self) -> List[str]:
+        """今回チェックする銘柄を選ぶ（スケジューラ未使用時はアラートのある全銘柄）"""
+        if self.engine == 'vectorized':
+            symbols = self.alert_batch.symbols()
+        else:
+            symbols = self.trigger_index.symbols()
+        if self.scheduler is None:
+            return symbols
+        
+        due = self.scheduler.due(symbols)
+        if self.debug:
+            print(f"⏱️ チェック対象: {len(due)}/{len(symbols)}銘柄")
+        return sorted(due)
+    
+    def _reschedule(self, symbols: List[str], prices: Dict[str, float]):
+        """チェックした銘柄の次回チェック時刻を発火価格までの距離から設定（発火済みは評価エンジンから削除済み）"""
+        if self.scheduler is None:
+            return
+        
+        if self.engine == 'vectorized':
+            distances = self.alert_batch.nearest_distances(prices)
+        else:
+            distances = {symbol: self._index_distance(symbol, prices[symbol])
+                         for symbol in symbols if symbol in prices}
+        
+        for symbol in symbols:
+            self.scheduler.schedule(symbol, prices.get(symbol), distances.get(symbol))
+    
+    def _index_distance(self, symbol: str, price: float) -> float:
+        """発火価格インデックスから最も近い発火価格までの距離（%）"""
+        rise, fall = self.trigger_index.nearest(symbol)
+        distances = [float('inf')]
+        if rise is not None:
+            distances.append((rise - price) / price * 100)
+        if fall is not None:
+            distances.append((price - fall) / price * 100)
+        return max(min(distances), 0.0)
+    
     def run_monitor_cycle(self) -> Dict:
         """監視サイクルを1回実行"""
         cycle_start = time.time()
         
-        # アクティブアラート取得
-        active_alerts = self.db.get_active_alerts()
+        # アクティブアラートの差分を評価エンジンに反映（キャッシュの差分更新）
+        self._apply_alert_changes(*self._refresh_alerts())
+        rise_count, fall_count = self._monitored_counts()
         
-        if not active_alerts:
+        if not rise_count + fall_count:
             if self.debug:
                 print("📝 アクティブなアラートはありません")
-            return {'processed': 0, 'triggered': 0, 'rise_triggered': 0, 'fall_triggered': 0, 'errors': 0}
+            return self._new_cycle_stats()
         
-        # アラートタイプ別の統計
-        rise_count = sum(1 for alert in active_alerts if alert.get('alert_type', 'rise') == 'rise')
-        fall_count = len(active_alerts) - rise_count
+        self._report_cycle(rise_count, fall_count)
         
-        print(f"🔄 監視中: {len(active_alerts)}件のアラート (上昇: {rise_count}, 下落: {fall_count})")
+        # チェック時刻が来た銘柄を選ぶ（優先度スケジューラ使用時）
+        symbols = self._select_due()
+        
+        # 価格スナップショット取得（銘柄ごとに1回だけ）
+        prices = self.db.get_current_prices(symbols) if symbols else {}
         
         # 統計
-        cycle_stats = {
-            'processed': 0, 
-            'triggered': 0, 
-            'rise_triggered': 0, 
-            'fall_triggered': 0, 
-            'errors': 0
-        }
+        cycle_stats = self._new_cycle_stats()
         
-        # 各アラートを処理
-        for alert in active_alerts:
-            try:
-                triggered = self.process_alert(alert)
-                cycle_stats['processed'] += 1
-                if triggered:
-                    cycle_stats['triggered'] += 1
-                    alert_type = alert.get('alert_type', 'rise')
-                    if alert_type == 'rise':
-                        cycle_stats['rise_triggered'] += 1
-                    else:
-                        cycle_stats['fall_triggered'] += 1
-                    
-                # API制限対応（0.5秒間隔）
-                time.sleep(0.5)
-                
-            except Exception as e:
-                cycle_stats['errors'] += 1
-                print(f"⚠️ アラート処理エラー: {e}")
+        # 発火候補を抽出
+        candidates = self._find_candidates(prices, cycle_stats, symbols)
+        
+        # 発火候補だけを処理（発火分は1トランザクションで一括記録）
+        triggered_ids = set()
+        try:
+            triggered_ids = self.process_candidates(candidates)
+        except Exception as e:
+            cycle_stats['errors'] += 1
+            print(f"⚠️ アラート処理エラー: {e}")
         
-        cycle_time = time.time() - cycle_start
+        for alert, _ in candidates:
+            if alert['id'] in triggered_ids:
+                self._remove_alert(alert['id'])
+                self._count_triggered(cycle_stats, alert)
         
-        if self.debug or cycle_stats['triggered'] > 0:
-            print(f"📊 サイクル完了: 処理={cycle_stats['processed']}, 発火={cycle_stats['triggered']} (上昇:{cycle_stats['rise_triggered']}, 下落:{cycle_stats['fall_triggered']}), エラー={cycle_stats['errors']}, 時間={cycle_time:.1f}秒")
+        self._reschedule(symbols, prices)
+        
+        # 未発火アラートの現在価格を銘柄単位で更新（バッファをまとめて1トランザクションで書き込み）
+        try:
+            self.db.buffer_symbol_prices(prices)
+            self.db.flush_price_updates()
+        except Exception as e:
+            cycle_stats['errors'] += 1
+            print(f"⚠️ 価格更新エラー: {e}")
+        
+        self._report_cycle_result(cycle_stats, time.time() - cycle_start)
         
         return cycle_stats
     
+    def _find_candidates_index(self, prices: Dict[str, float], cycle_stats: Dict,
+                               symbols: List[str]) -> List[Tuple[Dict, float]]:
+        """発火価格インデックスから価格を越えたアラートを抽出"""
+        candidates = []
+        
+        for symbol in symbols:
+            current_price = prices.get(symbol)
+            if current_price is None:
+                if self.debug:
+                    print(f"   ⚠️ 価格取得失敗: {symbol}")
+                cycle_stats['skipped'] += self.trigger_index.count(symbol)
+                continue
+            
+            cycle_stats['processed'] += self.trigger_index.count(symbol)
+            for alert_id in self.trigger_index.crossed(symbol, current_price):
+                candidates.append((self.indexed_alerts[alert_id], current_price))
+        
+        return candidates
+    
+    def _find_candidates_vectorized(self, prices: Dict[str, float], cycle_stats: Dict,
+                                    symbols: List[str]) -> List[Tuple[Dict, float]]:
+        """保持している列配列をNumPyで一括評価（スケジューラ使用時はチェックする銘柄の行だけ）"""
+        batch = self.alert_batch
+        mask = batch.symbol_mask(symbols) if self.scheduler is not None else None
+        current_prices, _, triggered = batch.evaluate(prices, mask)
+        
+        evaluated = len(batch) if mask is None else int(np.count_nonzero(mask))
+        priced = int(np.count_nonzero(~np.isnan(current_prices)))
+        cycle_stats['processed'] += priced
+        cycle_stats['skipped'] += evaluated - priced
+        
+        return [(batch.alerts[i], float(current_prices[i])) for i in np.flatnonzero(triggered)]
+    
+    def _refresh_alerts(self) -> Tuple[List[Dict], List[int], bool]:
+        """キャッシュの差分更新とシャードリースの更新（DBアクセスのみ、スレッドから呼び出し可）
+        
+        戻り値: (担当分の追加・更新アラート, 削除アラートID, 担当シャードが変わったか)
+        """
+        upserted, removed = self.alert_cache.refresh()
+        if self.shards is None:
+            return upserted, removed, False
+        
+        shards_changed = self.shards.renew()
+        
+        # 担当外の銘柄に変わったアラートはインデックスから外す
+        owned = [alert for alert in upserted if self.shards.owns(alert['symbol'])]
+        removed = removed + [alert['id'] for alert in upserted if not self.shards.owns(alert['symbol'])]
+        return owned, removed, shards_changed
+    
+    def _active_alerts(self) -> List[Dict]:
+        """担当分のアクティブアラート一覧"""
+        alerts = self.alert_cache.active_alerts()
+        if self.shards is None:
+            return alerts
+        return [alert for alert in alerts if self.shards.owns(alert['symbol'])]
+    
+    def _apply_alert_changes(self, upserted: List[Dict], removed: List[int], shards_changed: bool = False):
+        """キャッシュの差分（追加・更新・削除）を評価エンジンとスケジューラに反映"""
+        # 追加・更新されたアラートの銘柄は次のサイクルでチェック（削除分は最短チェック間隔から外す）
+        if self.scheduler is not None:
+            for alert_id in removed:
+                self.scheduler.remove_alert(alert_id)
+            for alert in upserted:
+                self.scheduler.add_alert(alert['id'], alert['symbol'], alert.get('check_interval'))
+                self.scheduler.wake(alert['symbol'])
+        
+        if self.engine == 'vectorized':
+            # 担当シャードが変わった場合は列配列を作り直す
+            if shards_changed:
+                self.alert_batch = AlertBatch(self._active_alerts())
+            else:
+                self.alert_batch.update(upserted, removed)
+            return
+        
+        # 担当シャードが変わった場合はインデックスを作り直す
+        if shards_changed:
+            self.trigger_index = TriggerIndex()
+            self.indexed_alerts = {}
+            upserted, removed = self._active_alerts(), []
+        
+        # 停止・発火済み・配信停止ユーザーのアラートを削除
+        for alert_id in removed:
+            self._remove_alert(alert_id)
+        
+        # 新規・更新アラートを追加（更新時は発火価格を再計算）
+        for alert in upserted:
+            self.trigger_index.remove(alert['id'])
+            self.trigger_index.add(alert)
+            self.indexed_alerts[alert['id']] = alert
+    
+    def _remove_alert(self, alert_id: int):
+        """アラートを評価エンジン（発火価格インデックス・列配列）から削除"""
+        self.trigger_index.remove(alert_id)
+        self.indexed_alerts.pop(alert_id, None)
+        self.alert_batch.remove(alert_id)
+    
     def display_service_status(self):
         """サービス状態を表示"""
         uptime = datetime.now() - self.stats['start_time']
@@ -433,18 +845,79 @@ Best regards,
         print(f"📧 送信アカウント: {self.service_config['service_email']}")
         print(f"⏰ 稼働時間: {uptime}")
         print(f"📈 総メール送信: {self.stats['emails_sent']}")
+        print(f"📮 未送信メール: {self.outbox.pending_count()}")
+        latency = self.smtp_pool.latency_summary()
+        if latency:
+            print(f"   • SMTP送信時間: p50={latency['p50']:.0f}ms p95={latency['p95']:.0f}ms "
+                  f"(接続: {self.smtp_pool.stats['connections']}, 再接続: {self.smtp_pool.stats['reconnects']})")
         print(f"🚨 総アラート発火: {self.stats['alerts_triggered']}")
         print(f"   • 上昇アラート: {self.stats['rise_alerts_triggered']}")
         print(f"   • 下落アラート: {self.stats['fall_alerts_triggered']}")
         print(f"❌ エラー数: {self.stats['errors']}")
+        clock_stats = self.clock.stats
+        print(f"🕐 サイクル開始の遅れ: {self.clock.jitter_summary()} "
+              f"(超過: {clock_stats['overruns']}回, 省略: {clock_stats['skipped_ticks']}周期, "
+              f"統合: {clock_stats['compacted_ticks']}周期)")
+        if self.scheduler is not None:
+            checked, deferred = self.scheduler.stats['checked'], self.scheduler.stats['deferred']
+            print(f"⏱️ 銘柄チェック: {checked}回実施 / {deferred}回省略 "
+                  f"({deferred / max(checked + deferred, 1) * 100:.0f}%削減)")
         print(f"👥 アクティブユーザー: {db_stats['active_users']}")
         print(f"⚡ アクティブアラート: {db_stats['active_alerts']}")
         print(f"   • 上昇監視: {db_stats.get('rise_alerts', 0)}")
         print(f"   • 下落監視: {db_stats.get('fall_alerts', 0)}")
         print("="*60)
     
-    def run(self):
-        """メイン監視ループ"""
+    def _begin_cycle(self):
+        """サイクル開始処理"""
+        self.cycle_count += 1
+        
+        # 予定時刻（固定レートの格子点）に対する遅れを記録
+        now = time.monotonic()
+        self.clock.begin(now)
+        self.cycle_started_at = now
+        if self.next_status_at is None:
+            self.next_status_at = now + STATUS_REPORT_INTERVAL
+        
+        if self.debug:
+            print(f"\n--- サイクル {self.cycle_count} ({datetime.now().strftime('%H:%M:%S')}) ---")
+    
+    def _end_cycle(self) -> float:
+        """サイクル終了処理（次のサイクル開始までの待機秒数を返す）"""
+        now = time.monotonic()
+        duration = now - self.cycle_started_at
+        CYCLE_SECONDS.observe(duration)
+        LAST_CYCLE_TIMESTAMP.set(time.time())
+        
+        delay = self.clock.end(now)
+        if duration > self.check_interval:
+            action = "直ちに次のサイクルを実行" if self.clock.overrun_policy == 'compact' else "次の周期まで待機"
+            print(f"⚠️ サイクル超過: {duration:.1f}秒 (チェック間隔: {self.check_interval}秒) → {action}")
+        
+        # 価格履歴のロールアップ（一定間隔ごと）
+        if self.price_rollup is not None:
+            self.price_rollup.maybe_run(now)
+        
+        # 1時間ごとに統計報告（チェック間隔によらず経過時間で判定）
+        if now >= self.next_status_at:
+            self.display_service_status()
+            self.next_status_at = now + STATUS_REPORT_INTERVAL
+        
+        return delay
+    
+    def run(self, concurrency: int = 10, use_stream: bool = False, metrics_port: int = 0):
+        """メイン監視ループ
+        
+        use_stream=Trueの場合はWebSocketのミニティッカーを購読してティックごとに判定
+        metrics_portを指定した場合はPrometheus形式のメトリクスを http://127.0.0.1:<port>/metrics で公開
+        """
+        if use_stream and self.engine != 'index':
+            print("⚠️ ストリーミングモードは発火価格インデックスを使用します")
+            self.engine = 'index'
+        if use_stream and self.scheduler is not None:
+            print("⚠️ ストリーミングモードはティックごとに判定するため優先度スケジューラを使用しません")
+            self.scheduler = None
+        
         print("🚀 CryptoAlert Service Monitor 開始 (v1.1.0)")
         print("=" * 60)
         print("📋 上昇・下落アラート対応システム")
@@ -452,6 +925,12 @@ Best regards,
         print(f"📧 サービス送信者: {self.service_config['service_email']}")
         print(f"🏢 サービス名: {self.service_config['service_name']}")
         print(f"🔧 デバッグモード: {'ON' if self.debug else 'OFF'}")
+        if use_stream:
+            print(f"⚡ 実行モード: ストリーミング ({BINANCE_STREAM_URL})")
+        else:
+            print("⚡ 実行モード: 同期（1サイクル1回の価格スナップショット取得）")
+        if self.shards:
+            print(f"🧩 シャード分割: {self.shards.shard_count}シャード (ワーカー: {self.shards.worker_id})")
         print("📝 Ctrl+C で停止")
         print("=" * 60)
         
@@ -467,25 +946,31 @@ Best regards,
         print(f"👥 登録ユーザー: {db_stats['active_users']}名")
         print()
         
-        cycle_count = 0
+        self.cycle_count = 0
+        
+        # 前回終了時の未送信メールも含めて送信キューを開始
+        self.outbox.start()
+        
+        metrics_server = None
+        if metrics_port:
+            metrics_server = MetricsServer(metrics_port)
+            metrics_server.start()
         
         try:
-            while self.running:
-                cycle_count += 1
-                
-                if self.debug:
-                    print(f"\n--- サイクル {cycle_count} ({datetime.now().strftime('%H:%M:%S')}) ---")
+            if use_stream:
+                asyncio.run(PriceStreamMonitor(self, concurrency=concurrency).run())
+            
+            while self.running and not use_stream:
+                self._begin_cycle()
                 
                 # 監視サイクル実行
                 cycle_stats = self.run_monitor_cycle()
                 
-                # 1時間ごとに統計報告
-                if cycle_count % (3600 // self.check_interval) == 0:
-                    self.display_service_status()
+                delay = self._end_cycle()
                 
-                # 待機
-                if self.running:
-                    time.sleep(self.check_interval)
+                # 次の予定時刻まで待機（処理時間を差し引く）
+                if self.running and delay > 0:
+                    time.sleep(delay)
                 
         except KeyboardInterrupt:
             print("\n🛑 キーボード割り込み受信")
@@ -495,10 +980,17 @@ Best regards,
                 import traceback
                 traceback.print_exc()
         finally:
+            if metrics_server:
+                metrics_server.stop()
+            if self.shards:
+                self.shards.release()
+            self.outbox.stop()
+            self.smtp_pool.close()
             self.display_service_status()
+            self.db.close()
             print(f"\n📊 監視終了統計:")
-            print(f"   • 総サイクル数: {cycle_count}")
-            print(f"   • 稼働時間: {cycle_count * self.check_interval / 60:.1f}分")
+            print(f"   • 総サイクル数: {self.cycle_count}")
+            print(f"   • 稼働時間: {(datetime.now() - self.stats['start_time']).total_seconds() / 60:.1f}分")
             print(f"   • 上昇アラート発火: {self.stats['rise_alerts_triggered']}回")
             print(f"   • 下落アラート発火: {self.stats['fall_alerts_triggered']}回")
             print("✅ CryptoAlert Service 終了")
@@ -513,6 +1005,28 @@ def parse_arguments():
                        help='デバッグモードを有効化')
     parser.add_argument('--test-email', action='store_true',
                        help='サービスメール送信テストを実行（上昇・下落両方）')
+    parser.add_argument('--stream', action='store_true',
+                       help='WebSocketストリーミングモードで実行（ティックごとに発火判定）')
+    parser.add_argument('--concurrency', type=int, default=10,
+                       help='ストリーミングモードのBinance APIへの最大同時接続数 デフォルト: 10')
+    parser.add_argument('--email-workers', type=int, default=4,
+                       help='メール送信ワーカー数 デフォルト: 4')
+    parser.add_argument('--digest-window', type=int, default=0,
+                       help='同一ユーザーの発火をまとめてダイジェストで送る待機時間（秒、0は1件ずつ送信）')
+    parser.add_argument('--priority-schedule', action='store_true',
+                       help='発火価格までの距離とボラティリティで銘柄ごとのチェック間隔を調整')
+    parser.add_argument('--max-check-interval', type=int, default=900,
+                       help='優先度スケジューラの最大チェック間隔（秒）デフォルト: 900秒')
+    parser.add_argument('--overrun-policy', choices=['compact', 'skip'], default='compact',
+                       help='サイクルがチェック間隔を超えた場合の扱い（compact: 直ちにまとめて1回実行, skip: 次の周期まで待機）')
+    parser.add_argument('--price-history-hours', type=int, default=PRICE_HISTORY_RETENTION_HOURS,
+                       help=f'価格履歴（生の価格）の保持時間、0は記録しない デフォルト: {PRICE_HISTORY_RETENTION_HOURS}時間')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                       help='メトリクスエンドポイントのポート（0は無効）例: 9108')
+    parser.add_argument('--shards', type=int, default=0,
+                       help='シャード分割実行の仮想シャード数（全プロセスで同じ値、0は単独実行）')
+    parser.add_argument('--engine', choices=['index', 'vectorized'], default='index',
+                       help='アラート評価エンジン（index: 発火価格インデックス, vectorized: NumPy一括評価）')
     
     return parser.parse_args()
 
@@ -522,7 +1036,15 @@ def main():
     # サービス監視プロセス初期化
     service = CryptoAlertService(
         check_interval=args.interval,
-        debug=args.debug
+        debug=args.debug,
+        engine=args.engine,
+        email_workers=args.email_workers,
+        shard_count=args.shards,
+        priority_schedule=args.priority_schedule,
+        max_check_interval=args.max_check_interval,
+        overrun_policy=args.overrun_policy,
+        digest_window=args.digest_window,
+        price_history_hours=args.price_history_hours
     )
     
     # メールテストモード
@@ -532,10 +1054,11 @@ def main():
             print("✅ サービスメール設定テスト成功")
         else:
             print("❌ サービスメール設定テスト失敗")
+        service.smtp_pool.close()
         return
     
     # メイン監視開始
-    service.run()
+    service.run(concurrency=args.concurrency, use_stream=args.stream, metrics_port=args.metrics_port)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
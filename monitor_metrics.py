@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Monitor Metrics - 監視プロセスのメトリクス（Prometheusテキスト形式）
+サイクル時間・Binance API・SQLite・SMTPのレイテンシをヒストグラムで記録し、
+キュー長やサイクル遅延とあわせてローカルHTTPエンドポイントで公開する
+
+使用方法:
+    python monitor.py --metrics-port 9108
+    curl http://127.0.0.1:9108/metrics
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CYCLE_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = '') -> str:
+    """ラベルを {name="value",...} 形式に変換"""
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    """数値をPrometheus形式に変換"""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric(ABC):
+    """メトリクス共通処理（ラベル値ごとの系列を保持）"""
+    
+    metric_type = ''
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, '') for name in self.labelnames)
+    
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"] + self._samples()
+    
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """系列ごとの出力行"""
+
+class Counter(_Metric):
+    """単調増加カウンター"""
+    
+    metric_type = 'counter'
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple, float] = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    """現在値（値を設定するか、出力時に関数で取得）"""
+    
+    metric_type = 'gauge'
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._functions: Dict[Tuple, Callable[[], float]] = {}
+    
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+    
+    def set_function(self, func: Callable[[], float], **labels):
+        """出力時に値を取得する関数を登録（キュー長など）"""
+        with self._lock:
+            self._functions[self._key(labels)] = func
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        
+        for key, func in functions.items():
+            try:
+                values[key] = func()
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+class _Timer(ContextDecorator):
+    """with文・デコレーターで処理時間をヒストグラムに記録"""
+    
+    def __init__(self, histogram: 'Histogram', labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+        self._starts = threading.local()
+    
+    def __enter__(self):
+        stack = getattr(self._starts, 'stack', None)
+        if stack is None:
+            stack = self._starts.stack = []
+        stack.append(time.perf_counter())
+        return self
+    
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._starts.stack.pop(), **self.labels)
+        return False
+
+class Histogram(_Metric):
+    """累積バケットのヒストグラム（秒）"""
+    
+    metric_type = 'histogram'
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[Tuple, List] = {}  # ラベル値 -> [バケット件数..., 合計, 件数]
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+    
+    def time(self, **labels) -> _Timer:
+        """処理時間を記録するコンテキストマネージャー／デコレーター"""
+        return _Timer(self, labels)
+    
+    def total(self) -> Tuple[float, int]:
+        """全ラベル合計の（観測値の合計, 件数）"""
+        with self._lock:
+            return (sum(series[-2] for series in self._series.values()),
+                    sum(series[-1] for series in self._series.values()))
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """メトリクスの登録と出力"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+    
+    def render(self) -> str:
+        """Prometheusテキスト形式で出力"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+# ==================== 監視プロセスのメトリクス ====================
+
+CYCLE_SECONDS = REGISTRY.register(Histogram(
+    'cryptoalert_cycle_duration_seconds', '監視サイクルの所要時間', buckets=CYCLE_BUCKETS))
+CYCLE_LAG_SECONDS = REGISTRY.register(Histogram(
+    'cryptoalert_cycle_lag_seconds', '予定時刻から実際のサイクル開始までの遅れ', buckets=CYCLE_BUCKETS))
+CYCLE_OVERRUNS = REGISTRY.register(Counter(
+    'cryptoalert_cycle_overruns_total', 'check_intervalを超えたサイクル数'))
+LAST_CYCLE_TIMESTAMP = REGISTRY.register(Gauge(
+    'cryptoalert_last_cycle_timestamp_seconds', '最後にサイクルが完了したUNIX時刻'))
+ALERTS_TRIGGERED = REGISTRY.register(Counter(
+    'cryptoalert_alerts_triggered_total', '発火したアラート数', ['alert_type']))
+BINANCE_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'cryptoalert_binance_request_seconds', 'Binance APIリクエストの所要時間', ['endpoint']))
+BINANCE_ERRORS = REGISTRY.register(Counter(
+    'cryptoalert_binance_errors_total', 'Binance APIリクエストの失敗数', ['endpoint']))
+SQLITE_SECONDS = REGISTRY.register(Histogram(
+    'cryptoalert_sqlite_seconds', 'SQLite操作の所要時間', ['operation']))
+ENGINE_EVAL_SECONDS = REGISTRY.register(Histogram(
+    'cryptoalert_engine_eval_seconds', '評価エンジンによる発火候補抽出の所要時間', ['engine']))
+SMTP_SEND_SECONDS = REGISTRY.register(Histogram(
+    'cryptoalert_smtp_send_seconds', 'SMTP送信1件の所要時間'))
+SMTP_ERRORS = REGISTRY.register(Counter(
+    'cryptoalert_smtp_errors_total', 'SMTP送信の失敗数'))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'cryptoalert_queue_depth', 'キュー長（未送信メール・価格書き込みバッファなど）', ['queue']))
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """/metrics を返すHTTPハンドラー"""
+    
+    registry: MetricsRegistry = REGISTRY
+    
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # アクセスログは出力しない
+        pass
+
+class MetricsServer:
+    """メトリクスエンドポイント（バックグラウンドスレッドで待ち受け）"""
+    
+    def __init__(self, port: int, host: str = '127.0.0.1', registry: Optional[MetricsRegistry] = None):
+        handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry or REGISTRY})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        host, port = self.httpd.server_address[:2]
+        print(f"📈 メトリクス: http://{host}:{port}/metrics")
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Price Rollup - 価格履歴のOHLCロールアップと保持期間の管理
+監視サイクルが記録したprice_history（生の価格スナップショット）を
+1分足・1時間足・日足（price_ohlc_1m / price_ohlc_1h / price_ohlc_1d）に集計し、
+保持期間を過ぎた生の価格を削除する
+
+チャート・リプレイ・分析はBinanceのklineを取り直さずにローカルの履歴を参照できる
+"""
+
+import sqlite3
+import time
+from typing import Dict, Optional
+
+from database_schema import AlertDatabase, PRICE_HISTORY_RETENTION_HOURS
+
+ROLLUP_INTERVAL = 60  # ロールアップを実行する間隔（秒）
+PRUNE_INTERVAL = 3600  # 保持期間を過ぎた履歴を削除する間隔（秒）
+
+class PriceHistoryRollup:
+    """サイクル終了時に呼ばれ、一定間隔でロールアップと削除を行う"""
+    
+    def __init__(self, db: AlertDatabase, retention_hours: int = PRICE_HISTORY_RETENTION_HOURS,
+                 rollup_interval: float = ROLLUP_INTERVAL, prune_interval: float = PRUNE_INTERVAL):
+        self.db = db
+        self.retention_hours = retention_hours
+        self.rollup_interval = rollup_interval
+        self.prune_interval = prune_interval
+        
+        self._last_rollup: Optional[float] = None
+        self._last_prune = time.monotonic()
+        self.stats = {'rollups': 0, 'buckets_updated': 0, 'rows_pruned': 0, 'errors': 0}
+    
+    def run(self) -> Dict[str, int]:
+        """ロールアップを直ちに実行"""
+        updated = self.db.rollup_price_history()
+        self.stats['rollups'] += 1
+        self.stats['buckets_updated'] += sum(updated.values())
+        return updated
+    
+    def maybe_run(self, now: Optional[float] = None):
+        """前回から間隔が空いていればロールアップ・削除を実行"""
+        now = time.monotonic() if now is None else now
+        try:
+            if self._last_rollup is None or now - self._last_rollup >= self.rollup_interval:
+                self._last_rollup = now
+                self.run()
+            
+            if now - self._last_prune >= self.prune_interval:
+                self._last_prune = now
+                self.stats['rows_pruned'] += self.db.prune_price_history(self.retention_hours)
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ 価格履歴ロールアップエラー: {e}")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Price Stream - WebSocketストリーミングによるイベント駆動監視
+アクティブアラートのある銘柄だけをミニティッカーのcombined streamで購読し、
+ティックを受信するたびに発火価格インデックスで判定する（ポーリング待ちなし）
+
+使用方法:
+    python monitor.py --stream
+    
+    # オフライン検証（模擬取引所）
+    python fake_exchange.py --port 8765
+    BINANCE_API_URL=http://localhost:8765/api/v3 \\
+    BINANCE_STREAM_URL=ws://localhost:8765/stream python monitor.py --stream
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List, Set
+
+import aiohttp
+
+BINANCE_STREAM_URL = os.getenv('BINANCE_STREAM_URL', 'wss://stream.binance.com:9443/stream')
+SUBSCRIBE_BATCH_SIZE = 200  # 1メッセージあたりの購読ストリーム数
+SUBSCRIBE_MESSAGE_INTERVAL = 0.25  # Binanceの受信メッセージ上限（5件/秒）対策
+
+class PriceStreamMonitor:
+    """ミニティッカーストリームを購読してティックごとにアラートを判定"""
+    
+    def __init__(self, service, stream_url: str = BINANCE_STREAM_URL, concurrency: int = 10):
+        self.service = service
+        self.stream_url = stream_url
+        self.concurrency = max(1, concurrency)  # Binance APIへの最大同時接続数
+        
+        self.subscribed: Set[str] = set()
+        self.latest_prices: Dict[str, float] = {}
+        self.ticks_received = 0
+        self._request_id = 0
+        
+        # 処理中のアラート（連続ティックでの二重処理防止、処理が終われば外す）
+        self.handled: Set[int] = set()
+        self.tasks: Set[asyncio.Task] = set()
+        
+        # 価格イベント時刻から発火判定までの遅延（ミリ秒）
+        self.trigger_latencies = deque(maxlen=1000)
+    
+    @staticmethod
+    def stream_name(symbol: str) -> str:
+        """シンボルからストリーム名を作成"""
+        return f"{symbol.lower()}@miniTicker"
+    
+    async def _send_subscription(self, ws: aiohttp.ClientWebSocketResponse, method: str, symbols: List[str]):
+        """SUBSCRIBE/UNSUBSCRIBEを分割送信"""
+        for i in range(0, len(symbols), SUBSCRIBE_BATCH_SIZE):
+            self._request_id += 1
+            await ws.send_json({
+                'method': method,
+                'params': [self.stream_name(symbol) for symbol in symbols[i:i + SUBSCRIBE_BATCH_SIZE]],
+                'id': self._request_id
+            })
+            await asyncio.sleep(SUBSCRIBE_MESSAGE_INTERVAL)
+    
+    async def sync_subscriptions(self, ws: aiohttp.ClientWebSocketResponse):
+        """アクティブアラートの差分を反映し、購読銘柄を同期"""
+        service = self.service
+        
+        # キャッシュの差分更新はスレッドで行い、インデックスへの反映はイベントループ上で行う
+        service._apply_alert_changes(*await asyncio.to_thread(service._refresh_alerts))
+        
+        wanted = set(service.trigger_index.symbols())
+        added = sorted(wanted - self.subscribed)
+        dropped = sorted(self.subscribed - wanted)
+        
+        if added:
+            await self._send_subscription(ws, 'SUBSCRIBE', added)
+        if dropped:
+            await self._send_subscription(ws, 'UNSUBSCRIBE', dropped)
+            for symbol in dropped:
+                self.latest_prices.pop(symbol, None)
+        
+        self.subscribed = wanted
+        
+        if added or dropped or service.debug:
+            print(f"🔌 購読更新: {len(wanted)}銘柄 (+{len(added)} / -{len(dropped)}), アラート{len(service.trigger_index)}件")
+    
+    def handle_tick(self, session: aiohttp.ClientSession, data: Dict):
+        """ミニティッカーを受信して発火判定"""
+        service = self.service
+        symbol = data['s']
+        price = float(data['c'])
+        
+        self.ticks_received += 1
+        self.latest_prices[symbol] = price
+        
+        for alert_id in service.trigger_index.crossed(symbol, price):
+            if alert_id in self.handled:
+                continue
+            self.handled.add(alert_id)
+            
+            # 価格イベント時刻からの遅延を記録
+            if data.get('E'):
+                self.trigger_latencies.append(time.time() * 1000 - data['E'])
+            
+            task = asyncio.create_task(self._trigger(session, alert_id, price))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+    
+    async def _trigger(self, session: aiohttp.ClientSession, alert_id: int, price: float):
+        """発火候補を処理（DB更新・メール送信キューへの登録）"""
+        service = self.service
+        alert = service.indexed_alerts.get(alert_id)
+        if alert is None:
+            self.handled.discard(alert_id)
+            return
+        
+        triggered = await self.process_alert(alert, price)
+        if triggered:
+            # インデックスから外したアラートは再び候補にならない
+            service._remove_alert(alert_id)
+        self.handled.discard(alert_id)
+    
+    async def process_alert(self, alert: Dict, current_price: float) -> bool:
+        """発火候補アラートを処理（DB更新はスレッドで実行し、メールは送信キューに積む）"""
+        service = self.service
+        try:
+            result = await asyncio.to_thread(service.db.check_alert_condition, alert, current_price)
+            if not result or not result['triggered']:
+                return False
+            
+            direction = "上昇" if result.get('alert_type', 'rise') == 'rise' else "下落"
+            print(f"🚨 {direction}アラート発火! {result['symbol']}: {result['price_change']:+.2f}% → {result['user_email']}")
+            
+            return await asyncio.to_thread(service._record_trigger, alert, result)
+        
+        except Exception as e:
+            print(f"❌ アラート処理エラー (ID: {alert.get('id', 'unknown')}): {e}")
+            service.stats['errors'] += 1
+            if service.debug:
+                import traceback
+                traceback.print_exc()
+            return False
+    
+    async def _resync_loop(self, ws: aiohttp.ClientWebSocketResponse):
+        """定期的に購読を同期し、最新価格をDBに反映"""
+        service = self.service
+        delay = service.check_interval
+        while service.running:
+            await asyncio.sleep(delay)
+            
+            service._begin_cycle()
+            try:
+                await self.sync_subscriptions(ws)
+                service.db.buffer_symbol_prices(self.latest_prices)
+                await asyncio.to_thread(service.db.flush_price_updates)
+            except Exception as e:
+                print(f"⚠️ ストリーム同期エラー: {e}")
+            self.report_status()
+            delay = service._end_cycle()
+    
+    def report_status(self):
+        """ストリーム受信状況を表示"""
+        if not self.service.debug:
+            return
+        
+        latency = ""
+        if self.trigger_latencies:
+            latencies = sorted(self.trigger_latencies)
+            latency = f", 発火遅延 p50={latencies[len(latencies) // 2]:.0f}ms max={latencies[-1]:.0f}ms"
+        print(f"📡 ストリーム: 受信{self.ticks_received}ティック, 購読{len(self.subscribed)}銘柄{latency}")
+    
+    async def run(self):
+        """ストリーミング監視ループ（切断時は指数バックオフで再接続）"""
+        service = self.service
+        timeout = aiohttp.ClientTimeout(total=10)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        backoff = 1
+        
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            while service.running:
+                try:
+                    async with session.ws_connect(self.stream_url, heartbeat=30) as ws:
+                        print(f"🔌 ストリーム接続: {self.stream_url}")
+                        backoff = 1
+                        self.subscribed = set()
+                        await self.sync_subscriptions(ws)
+                        
+                        resync_task = asyncio.create_task(self._resync_loop(ws))
+                        try:
+                            while service.running:
+                                try:
+                                    msg = await ws.receive(timeout=1)
+                                except asyncio.TimeoutError:
+                                    # 購読銘柄がない間も停止シグナルを確認できるようにする
+                                    continue
+                                
+                                if msg.type == aiohttp.WSMsgType.TEXT:
+                                    payload = json.loads(msg.data)
+                                    data = payload.get('data')
+                                    if data and data.get('e') == '24hrMiniTicker':
+                                        self.handle_tick(session, data)
+                                elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                                                  aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                    break
+                        finally:
+                            resync_task.cancel()
+                    
+                    if service.running:
+                        print("⚠️ ストリーム切断、再接続します")
+                        await asyncio.sleep(1)
+                
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"❌ ストリーム接続エラー: {e} ({backoff}秒後に再接続)")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 60)
+            
+            # 処理中の発火を完了させる
+            if self.tasks:
+                await asyncio.gather(*self.tasks, return_exceptions=True)
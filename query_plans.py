@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Query Plans - AlertDatabaseのクエリ実行計画チェック
+AlertDatabaseのSQLを使う全メソッドを一時データベース上で実行して発行されたSQLを記録し、
+EXPLAIN QUERY PLAN でテーブル全体のスキャンが含まれていないかを確認する
+（テーブルが数百万行に増えたときに遅くなるクエリを事前に検出する）
+
+失敗と判定する実行計画:
+    SCAN <テーブル>                       インデックスを使わないテーブル全体のスキャン
+    SCAN <テーブル> USING ... INDEX <名前>  部分インデックスではないインデックス全体のスキャン
+件数が増えないテーブル（設定・ワーカー・リース・一時テーブル）は対象外
+（tests/test_query_plans.py も同じワークロードとチェックを使う）
+
+使用方法:
+    python query_plans.py                      # 合成データで確認（失敗があれば終了コード1）
+    python query_plans.py --verbose            # 全クエリの実行計画を表示
+    python query_plans.py --db crypto_alerts.db   # 既存データベースのコピーで確認（ANALYZE済みの統計を反映）
+"""
+
+import argparse
+import io
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional, Tuple
+
+from database_schema import AlertDatabase
+from market_data import MarketDataProvider
+from sqlite_pool import SQLiteConnectionPool
+
+# 件数が増えないテーブル（全体スキャンを許可）
+SMALL_TABLES = {'system_config', 'monitor_workers', 'monitor_leases', 'pending_triggers', 'sqlite_sequence'}
+SKIP_STATEMENTS = ('PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK', 'CREATE', 'DROP', 'ALTER', 'ANALYZE', 'SAVEPOINT', 'RELEASE')
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'ADAUSDT']
+
+class _StaticMarketData(MarketDataProvider):
+    """固定価格を返すプロバイダー（ネットワークに接続しない）"""
+    
+    def get_json(self, path: str, params: Optional[Dict] = None, timeout: float = 10):
+        if path == '/exchangeInfo':
+            return {'symbols': [{'symbol': symbol, 'status': 'TRADING', 'baseAsset': symbol[:-4],
+                                 'quoteAsset': 'USDT', 'isSpotTradingAllowed': True} for symbol in SYMBOLS]}
+        if path == '/ticker/price' and params and 'symbol' in params:
+            return {'symbol': params['symbol'], 'price': '100.0'}
+        return [{'symbol': symbol, 'price': '100.0'} for symbol in SYMBOLS]
+
+class _TracingPool(SQLiteConnectionPool):
+    """発行されたSQLをメソッド名とともに記録する接続プール"""
+    
+    def __init__(self, db_file: str):
+        super().__init__(db_file)
+        self.label = ''
+        self.tracing = True
+        self.statements: List[Tuple[str, str]] = []
+    
+    def _open(self, read_only: bool) -> sqlite3.Connection:
+        conn = super()._open(read_only)
+        conn.set_trace_callback(self._trace)
+        return conn
+    
+    def _trace(self, sql: str):
+        if self.tracing:
+            self.statements.append((self.label, sql))
+
+def _normalize(sql: str) -> str:
+    """値の違いを除いたSQL（重複除去用）"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    return ' '.join(sql.split())
+
+def _aliases(sql: str) -> Dict[str, str]:
+    """エイリアス -> テーブル名（EXPLAIN QUERY PLAN はエイリアスで表示する）"""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+([\w.]+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.I):
+        table = table.split('.')[-1]
+        aliases[table] = table
+        if alias and alias.upper() not in ('WHERE', 'SET', 'JOIN', 'ON', 'ORDER', 'GROUP', 'LEFT', 'INNER',
+                                           'VALUES', 'SELECT', 'LIMIT', 'AS', 'USING', 'HAVING'):
+            aliases[alias] = table
+    return aliases
+
+def run_workload(db: AlertDatabase, alerts: int):
+    """SQLを使う全メソッドを実行"""
+    pool: _TracingPool = db.pool
+    
+    def call(label: str, func, *args, **kwargs):
+        pool.label = label
+        return func(*args, **kwargs)
+    
+    # データ作成
+    user_ids = call('create_users_bulk', db.create_users_bulk, [f"user{i}@example.com" for i in range(max(alerts // 10, 10))])
+    call('create_alerts_bulk', db.create_alerts_bulk, [
+        {'user_id': user_id, 'symbol': SYMBOLS[i % len(SYMBOLS)], 'threshold_percent': 5 if i % 2 else -5,
+         'alert_type': 'rise' if i % 2 else 'fall', 'base_price': 100.0}
+        for i, user_id in enumerate(list(user_ids.values()) * (alerts // max(len(user_ids), 1) or 1))
+    ][:alerts])
+    
+    # 認証
+    call('register_user', db.register_user, 'member@example.com', 'password123')
+    call('authenticate_user', db.authenticate_user, 'member@example.com', 'wrong-password', '127.0.0.1')
+    user = call('authenticate_user', db.authenticate_user, 'member@example.com', 'password123', '127.0.0.1')
+    call('write_login_attempts', db.login_audit.flush)
+    call('prune_login_attempts', db.prune_login_attempts)
+    call('get_user_by_id', db.get_user_by_id, int(user.id))
+    call('get_or_create_user', db.get_or_create_user, 'user1@example.com')
+    call('get_or_create_user', db.get_or_create_user, 'new-user@example.com')
+    alert = call('create_alert', db.create_alert, 'user1@example.com', 'BTC', 5.0, 'rise')
+    
+    # 監視プロセス
+    active = call('get_active_alerts', db.get_active_alerts)
+    seq = call('get_alert_change_seq', db.get_alert_change_seq)
+    call('get_alert_changes', db.get_alert_changes, 0)
+    call('get_active_alerts_for', db.get_active_alerts_for, {active[0]['id']}, {active[0]['user_id']})
+    call('prune_alert_changes', db.prune_alert_changes)
+    call('heartbeat_monitor_worker', db.heartbeat_monitor_worker, 'worker-1', 'localhost', os.getpid())
+    call('get_live_monitor_workers', db.get_live_monitor_workers, 30)
+    call('acquire_shard_leases', db.acquire_shard_leases, 'worker-1', [0, 1, 2], 60)
+    call('release_shard_leases', db.release_shard_leases, 'worker-1', [2])
+    call('release_shard_leases', db.release_shard_leases, 'worker-1')
+    call('update_alert_price', db.update_alert_price, active[0]['id'], 101.0)
+    call('update_symbol_prices', db.update_symbol_prices, {'BTCUSDT': 101.0})
+    db.buffer_alert_price(active[1]['id'], 102.0)
+    db.buffer_symbol_prices({symbol: 103.0 for symbol in SYMBOLS})
+    call('flush_price_updates', db.flush_price_updates)
+    call('rollup_price_history', db.rollup_price_history)
+    call('prune_price_history', db.prune_price_history)
+    call('get_price_ohlc', db.get_price_ohlc, 'BTCUSDT', '1m')
+    call('get_price_ohlc', db.get_price_ohlc, 'BTCUSDT', '1h', since='2000-01-01')
+    
+    # 発火・送信キュー
+    call('trigger_alert', db.trigger_alert, active[0]['id'], 110.0, 10.0, 'rise')
+    call('trigger_alerts_bulk', db.trigger_alerts_bulk, [
+        {'alert_id': row['id'], 'trigger_price': 110.0, 'price_change': 10.0, 'alert_type': row['alert_type']}
+        for row in active[1:6]
+    ])
+    claimed = call('claim_pending_emails', db.claim_pending_emails, 2, 0)
+    call('claim_pending_digests', db.claim_pending_digests, 10, 0, 0)
+    call('mark_history_emails_sent', db.mark_history_emails_sent, [row['history_id'] for row in claimed[:1]])
+    call('mark_history_emails_failed', db.mark_history_emails_failed, [row['history_id'] for row in claimed[1:]], 'error', 60)
+    call('mark_email_sent', db.mark_email_sent, active[3]['id'])
+    call('count_pending_emails', db.count_pending_emails)
+    
+    # Webアプリ
+    call('get_user_alerts', db.get_user_alerts, 'user1@example.com')
+    call('get_statistics', db.get_statistics)
+    call('deactivate_alert', db.deactivate_alert, alert['alert_token'])
+    call('unsubscribe_user', db.unsubscribe_user, db.get_user_by_email('user2@example.com')['unsubscribe_token'])
+
+def unique_statements(statements: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """実行計画を確認するSQL（値だけが違う重複・PRAGMAやDDLなどを除く）"""
+    unique = []
+    seen = set()
+    for label, sql in statements:
+        key = _normalize(sql)
+        if key in seen or sql.lstrip().upper().startswith(SKIP_STATEMENTS):
+            continue
+        seen.add(key)
+        unique.append((label, sql))
+    return unique
+
+def check_plans(conn: sqlite3.Connection, statements: List[Tuple[str, str]]) -> List[Dict]:
+    """SQLの実行計画を確認（problemsが空でない結果が全体スキャン）"""
+    partial_indexes = {name for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql LIKE '% WHERE %'")}
+    
+    results = []
+    for label, sql in statements:
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        aliases = _aliases(sql)
+        problems = []
+        for detail in plan:
+            match = re.match(r'SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?', detail)
+            if not match:
+                continue
+            table = aliases.get(match.group(1))
+            if table is None or table in SMALL_TABLES:
+                continue  # サブクエリ・一時テーブル
+            if match.group(2) is None or match.group(2) not in partial_indexes:
+                problems.append(detail)
+        results.append({'method': label, 'sql': _normalize(sql), 'plan': plan, 'problems': problems})
+    return results
+
+def collect_plans(db_file: str, alerts: int = 200) -> List[Dict]:
+    """データベースを開いて（未作成・旧バージョンならマイグレーションを適用）ワークロードを実行し、
+    発行された全SQLの実行計画を確認する（CLIとtests/test_query_plans.pyの共通の入口）
+    """
+    # メソッドの出力（作成・発火メッセージ）は表示しない
+    with redirect_stdout(io.StringIO()):
+        db = AlertDatabase(db_file, market_data=_StaticMarketData())
+        db.pool.close()
+        db.pool = pool = _TracingPool(db_file)
+        try:
+            run_workload(db, alerts)
+            pool.tracing = False
+            # 一時テーブル（pending_triggers）は書き込み用接続にだけ存在する
+            with pool.writer() as conn:
+                return check_plans(conn, unique_statements(pool.statements))
+        finally:
+            db.close()
+
+def display_results(results: List[Dict], verbose: bool):
+    """結果を表示"""
+    failures = [result for result in results if result['problems']]
+    print("\n" + "=" * 80)
+    print("🔍 AlertDatabase クエリ実行計画チェック")
+    print("=" * 80)
+    for result in results:
+        if not (verbose or result['problems']):
+            continue
+        mark = "❌" if result['problems'] else "✅"
+        print(f"{mark} {result['method']}: {result['sql'][:150]}")
+        for detail in result['plan']:
+            flag = "  ← 全体スキャン" if detail in result['problems'] else ""
+            print(f"      {detail}{flag}")
+    print("-" * 80)
+    methods = len({result['method'] for result in results})
+    print(f"📊 {methods}メソッド / {len(results)}クエリ: 全体スキャン {len(failures)}件")
+    print("=" * 80)
+
+def parse_arguments():
+    """コマンドライン引数解析"""
+    parser = argparse.ArgumentParser(description='CryptoAlert Query Plans')
+    
+    parser.add_argument('--db', type=str, default=None,
+                       help='確認に使うデータベース（コピー上で実行、未指定時は空のデータベース）')
+    parser.add_argument('--alerts', type=int, default=200,
+                       help='作成する合成アラート数 デフォルト: 200')
+    parser.add_argument('--verbose', action='store_true',
+                       help='全クエリの実行計画を表示')
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    
+    with tempfile.TemporaryDirectory(prefix='cryptoalert-plans-') as tmp:
+        db_file = os.path.join(tmp, 'plans.db')
+        if args.db:
+            with sqlite3.connect(args.db) as src, sqlite3.connect(db_file) as dst:
+                src.backup(dst)
+        
+        results = collect_plans(db_file, args.alerts)
+    
+    display_results(results, args.verbose)
+    if any(result['problems'] for result in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Schema Migrations - PRAGMA user_version によるスキーマのバージョン管理
+起動時はバージョンを1回読むだけで、未適用のマイグレーションがある場合だけ
+1トランザクション（BEGIN IMMEDIATE）で順に適用する（複数プロセスが同時に起動しても1回だけ）
+
+マイグレーションを追加する場合は末尾に @migration(次の番号, "説明") の関数を追加する
+（適用済みのマイグレーションは変更しない）
+
+使用方法:
+    python schema_migrations.py                 # 現在のバージョンと未適用のマイグレーションを表示
+    python schema_migrations.py --apply         # 未適用のマイグレーションを適用
+    python schema_migrations.py --db other.db --apply
+"""
+
+import argparse
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+Migration = Tuple[int, str, Callable[[sqlite3.Connection], None]]
+MIGRATIONS: List[Migration] = []
+
+def migration(version: int, description: str):
+    """マイグレーション関数を登録するデコレーター（番号は1から連番）"""
+    def register(func: Callable[[sqlite3.Connection], None]):
+        if version != len(MIGRATIONS) + 1:
+            raise ValueError(f"マイグレーション番号が連番ではありません: {version}")
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """データベースに記録されたスキーマバージョン"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def pending_migrations(conn: sqlite3.Connection) -> List[Migration]:
+    """未適用のマイグレーション"""
+    version = get_schema_version(conn)
+    return [entry for entry in MIGRATIONS if entry[0] > version]
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    """未適用のマイグレーションを1トランザクションで適用し、適用したバージョンを返す
+    
+    他のプロセスが適用中の場合は書き込みロックを待ち、適用後のバージョンを読み直す
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        applied = []
+        for version, description, func in pending_migrations(conn):
+            func(conn)
+            applied.append(version)
+            print(f"✅ スキーマ移行 v{version}: {description}")
+        if applied:
+            conn.execute(f"PRAGMA user_version = {applied[-1]}")
+        conn.commit()
+        return applied
+    except BaseException:
+        conn.rollback()
+        raise
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]):
+    """既存テーブルにないカラムだけを追加（旧バージョンのデータベース用）"""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, definition in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            print(f"✅ {table}.{name}カラムを追加しました")
+
+# ==================== マイグレーション ====================
+
+@migration(1, "ベーススキーマ（認証・上昇下落アラート・送信キュー・変更ログ・シャードリース・価格履歴）")
+def _baseline(conn: sqlite3.Connection):
+    # ユーザーテーブル（認証機能追加）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            email_hash VARCHAR(64) NOT NULL,
+            password_hash VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP,
+            is_active BOOLEAN DEFAULT 1,
+            is_registered BOOLEAN DEFAULT 0,
+            daily_alert_count INTEGER DEFAULT 0,
+            plan VARCHAR(20) DEFAULT 'free',
+            unsubscribe_token VARCHAR(64) UNIQUE
+        )
+    """)
+    _add_missing_columns(conn, 'users', {
+        'password_hash': 'VARCHAR(255)',
+        'is_registered': 'BOOLEAN DEFAULT 0',
+        'last_login': 'TIMESTAMP',
+    })
+    
+    # アラートテーブル（下落率対応）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            symbol VARCHAR(20) NOT NULL,
+            base_symbol VARCHAR(10) NOT NULL,
+            threshold_percent DECIMAL(5,2) NOT NULL,
+            alert_type VARCHAR(10) NOT NULL DEFAULT 'rise',
+            base_price DECIMAL(15,8) NOT NULL,
+            current_price DECIMAL(15,8),
+            status VARCHAR(20) DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            triggered_at TIMESTAMP,
+            last_checked TIMESTAMP,
+            check_interval INTEGER DEFAULT 60,
+            alert_token VARCHAR(64) UNIQUE,
+            metadata TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    """)
+    _add_missing_columns(conn, 'alerts', {'alert_type': "VARCHAR(10) DEFAULT 'rise'"})
+    
+    # アラート履歴テーブル（送信キュー用カラムを含む）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS alert_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            alert_id INTEGER NOT NULL,
+            user_email VARCHAR(255) NOT NULL,
+            symbol VARCHAR(20) NOT NULL,
+            threshold_percent DECIMAL(5,2) NOT NULL,
+            alert_type VARCHAR(10) NOT NULL DEFAULT 'rise',
+            base_price DECIMAL(15,8) NOT NULL,
+            trigger_price DECIMAL(15,8) NOT NULL,
+            price_change DECIMAL(5,2) NOT NULL,
+            triggered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            email_sent BOOLEAN DEFAULT 0,
+            email_sent_at TIMESTAMP,
+            email_attempts INTEGER DEFAULT 0,
+            next_attempt_at TIMESTAMP,
+            last_error TEXT,
+            FOREIGN KEY (alert_id) REFERENCES alerts (id) ON DELETE CASCADE
+        )
+    """)
+    _add_missing_columns(conn, 'alert_history', {
+        'alert_type': "VARCHAR(10) DEFAULT 'rise'",
+        'email_attempts': 'INTEGER DEFAULT 0',
+        'next_attempt_at': 'TIMESTAMP',
+        'last_error': 'TEXT',
+    })
+    
+    # システム設定テーブル
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS system_config (
+            key VARCHAR(100) PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # 価格履歴テーブル（監視サイクルごとの価格スナップショット）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol VARCHAR(20) NOT NULL,
+            price DECIMAL(15,8) NOT NULL,
+            volume DECIMAL(20,2),
+            market_cap DECIMAL(20,2),
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # 価格履歴のOHLCロールアップ（1分足・1時間足・日足）
+    for interval in ('1m', '1h', '1d'):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS price_ohlc_{interval} (
+                symbol VARCHAR(20) NOT NULL,
+                bucket_start TIMESTAMP NOT NULL,
+                open DECIMAL(15,8) NOT NULL,
+                high DECIMAL(15,8) NOT NULL,
+                low DECIMAL(15,8) NOT NULL,
+                close DECIMAL(15,8) NOT NULL,
+                samples INTEGER NOT NULL,
+                PRIMARY KEY (symbol, bucket_start)
+            )
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_price_ohlc_{interval}_bucket ON price_ohlc_{interval}(bucket_start)")
+    
+    # ログイン試行履歴テーブル
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS login_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email VARCHAR(255) NOT NULL,
+            ip_address VARCHAR(45),
+            success BOOLEAN DEFAULT 0,
+            attempted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # アラート変更ログ（監視プロセスのアクティブアラートキャッシュ差分更新用）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS alert_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            alert_id INTEGER,
+            user_id INTEGER,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _create_change_log_triggers(conn)
+    
+    # 監視ワーカー（シャード分割実行時のハートビート）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS monitor_workers (
+            worker_id VARCHAR(100) PRIMARY KEY,
+            hostname VARCHAR(255),
+            pid INTEGER,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            heartbeat_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # シャードのリース（1シャードを同時に担当する監視ワーカーは1つだけ）
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS monitor_leases (
+            shard INTEGER PRIMARY KEY,
+            worker_id VARCHAR(100) NOT NULL,
+            expires_at TIMESTAMP NOT NULL
+        )
+    """)
+    
+    # インデックス作成
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_status ON alerts(status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_user_id ON alerts(user_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_symbol ON alerts(symbol)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts(alert_type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_price_history_symbol ON price_history(symbol, recorded_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_price_history_recorded ON price_history(recorded_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_login_attempts_email ON login_attempts(email, attempted_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alert_history_outbox ON alert_history(email_sent, next_attempt_at)")
+    
+    # 初期システム設定
+    _insert_default_config(conn)
+
+def _create_change_log_triggers(conn: sqlite3.Connection):
+    """アラート・ユーザーの変更をalert_changesに記録するトリガーを作成
+    
+    現在価格・最終チェック時刻の更新は監視に影響しないため記録しない
+    """
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_insert_log AFTER INSERT ON alerts
+        BEGIN
+            INSERT INTO alert_changes (alert_id) VALUES (NEW.id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_update_log
+        AFTER UPDATE OF status, symbol, base_price, threshold_percent, alert_type, check_interval, user_id ON alerts
+        BEGIN
+            INSERT INTO alert_changes (alert_id) VALUES (NEW.id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_delete_log AFTER DELETE ON alerts
+        BEGIN
+            INSERT INTO alert_changes (alert_id) VALUES (OLD.id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_update_log
+        AFTER UPDATE OF is_active, email, unsubscribe_token ON users
+        BEGIN
+            INSERT INTO alert_changes (user_id) VALUES (NEW.id);
+        END
+    """)
+
+def _insert_default_config(conn: sqlite3.Connection):
+    """デフォルト設定を挿入"""
+    default_configs = [
+        ('free_daily_limit', '5'),
+        ('paid_daily_limit', '100'),
+        ('max_alerts_per_user', '20'),
+        ('min_threshold_percent', '0.1'),
+        ('max_threshold_percent', '50.0'),
+        ('check_interval_seconds', '60'),
+        ('email_cooldown_minutes', '5'),
+        ('min_fall_threshold', '-50.0'),
+        ('max_rise_threshold', '50.0'),
+        ('max_login_attempts', '5'),
+        ('login_lockout_minutes', '30')
+    ]
+    
+    conn.executemany("""
+        INSERT OR IGNORE INTO system_config (key, value)
+        VALUES (?, ?)
+    """, default_configs)
+
+@migration(2, "ホットパス用のインデックス（部分インデックス・カバリングインデックス）")
+def _hot_path_indexes(conn: sqlite3.Connection):
+    # アクティブアラートの一覧（status = 'active' ORDER BY created_at をソートなしで返す）と銘柄単位の価格更新
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_status_created ON alerts(status, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_active_symbol ON alerts(symbol) WHERE status = 'active'")
+    # ステータス・タイプ別の件数（インデックスだけで集計）
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_status_type ON alerts(status, alert_type)")
+    # ユーザーごとのアラート一覧・作成数制限
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_user_created ON alerts(user_id, created_at)")
+    # アクティブユーザー数・登録ユーザー数
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_active_registered ON users(is_registered) WHERE is_active = 1")
+    
+    # 送信キュー（未送信の行だけを持つ）と送信完了のマーク
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alert_history_pending ON alert_history(id) WHERE email_sent = 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alert_history_pending_alert ON alert_history(alert_id) WHERE email_sent = 0")
+    # 日付範囲の集計（triggered_at の範囲検索）
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alert_history_triggered ON alert_history(triggered_at)")
+    
+    # ログイン失敗回数（メールアドレス・時刻の範囲検索）
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_login_attempts_failed ON login_attempts(email, attempted_at) WHERE success = 0")
+    # 変更ログの保持期間による削除
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alert_changes_changed ON alert_changes(changed_at)")
+    
+    # 置き換えたインデックス・重複するインデックス（書き込みコストだけがかかる）
+    for name in ('idx_alerts_status', 'idx_alerts_type', 'idx_alerts_symbol', 'idx_alerts_user_id',
+                 'idx_users_email', 'idx_alert_history_outbox', 'idx_login_attempts_email'):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+@migration(3, "統計カウンター（トリガーで更新する件数・日別の発火数）")
+def _stat_counters(conn: sqlite3.Connection):
+    """get_statistics・ユーザーの作成数制限をCOUNTなしで返すためのカウンター
+    
+    bucket: '' は全体の件数、日別の発火数は日付（YYYY-MM-DD）、ユーザー別はユーザーID
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stat_counters (
+            name VARCHAR(50) NOT NULL,
+            bucket VARCHAR(20) NOT NULL DEFAULT '',
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, bucket)
+        ) WITHOUT ROWID
+    """)
+    
+    _backfill_stat_counters(conn)
+    _create_stat_counter_triggers(conn)
+
+# カウンター名・バケットに使う式（旧スキーマで追加したalert_typeなどNULLの行があるため既定値で補う）
+# ステータスがNULLの行は '_alerts' に集計し、status = 'active' の検索と同じくアクティブには含めない
+_STATUS = "COALESCE({row}status, '')"
+_ALERT_TYPE = "COALESCE({row}alert_type, 'rise')"
+_TRIGGERED_DATE = "COALESCE(DATE({row}triggered_at), '')"  # 日付不明の発火は '' に集計（今日の件数に含めない）
+
+def _backfill_stat_counters(conn: sqlite3.Connection):
+    """既存データからstat_countersを集計し直す"""
+    status, alert_type, triggered_date = (expr.format(row='') for expr in (_STATUS, _ALERT_TYPE, _TRIGGERED_DATE))
+    conn.execute("DELETE FROM stat_counters")
+    conn.execute(f"""
+        INSERT INTO stat_counters (name, bucket, value)
+        SELECT 'active_users', '', COUNT(*) FROM users WHERE is_active = 1
+        UNION ALL
+        SELECT 'registered_users', '', COUNT(*) FROM users WHERE is_active = 1 AND is_registered = 1
+        UNION ALL
+        SELECT {status} || '_alerts', '', COUNT(*) FROM alerts GROUP BY 1
+        UNION ALL
+        SELECT 'active_' || {alert_type} || '_alerts', '', COUNT(*) FROM alerts WHERE {status} = 'active' GROUP BY 1
+        UNION ALL
+        SELECT 'user_active_alerts', CAST(user_id AS TEXT), COUNT(*) FROM alerts WHERE {status} = 'active' GROUP BY user_id
+        UNION ALL
+        SELECT 'triggered_alerts_daily', {triggered_date}, COUNT(*) FROM alert_history GROUP BY 2
+    """)
+
+def _counter_upsert(name: str, bucket: str, delta: str, condition: str = '1') -> str:
+    """トリガー本体で使うカウンター加算文（conditionを満たす場合だけ加算）"""
+    return f"""
+            INSERT INTO stat_counters (name, bucket, value)
+            SELECT {name}, {bucket}, {delta} WHERE {condition}
+            ON CONFLICT(name, bucket) DO UPDATE SET value = value + excluded.value;"""
+
+def _alert_counter_changes(row: str, sign: str) -> str:
+    """アラート1行分のカウンター増減（rowはNEW/OLD、signは'+'/'-'）"""
+    status = _STATUS.format(row=f"{row}.")
+    alert_type = _ALERT_TYPE.format(row=f"{row}.")
+    return (_counter_upsert(f"{status} || '_alerts'", "''", f"{sign}1")
+            + _counter_upsert(f"'active_' || {alert_type} || '_alerts'", "''", f"{sign}1", f"{status} = 'active'")
+            + _counter_upsert("'user_active_alerts'", f"CAST({row}.user_id AS TEXT)", f"{sign}1", f"{status} = 'active'"))
+
+def _user_counter_changes(row: str, sign: str) -> str:
+    """ユーザー1行分のカウンター増減"""
+    return (_counter_upsert("'active_users'", "''", f"{sign}1", f"{row}.is_active = 1")
+            + _counter_upsert("'registered_users'", "''", f"{sign}1", f"{row}.is_active = 1 AND {row}.is_registered = 1"))
+
+def _create_stat_counter_triggers(conn: sqlite3.Connection):
+    """件数に影響する変更だけでstat_countersを更新するトリガーを作成
+    
+    現在価格・最終チェック時刻の更新（監視サイクルごとの大量更新）では発火しない
+    """
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_insert_counters AFTER INSERT ON alerts
+        BEGIN{_alert_counter_changes('NEW', '+')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_update_counters
+        AFTER UPDATE OF status, alert_type, user_id ON alerts
+        WHEN OLD.status IS NOT NEW.status OR OLD.alert_type IS NOT NEW.alert_type OR OLD.user_id IS NOT NEW.user_id
+        BEGIN{_alert_counter_changes('OLD', '-')}{_alert_counter_changes('NEW', '+')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_delete_counters AFTER DELETE ON alerts
+        BEGIN{_alert_counter_changes('OLD', '-')}
+        END
+    """)
+    
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_users_insert_counters AFTER INSERT ON users
+        BEGIN{_user_counter_changes('NEW', '+')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_users_update_counters
+        AFTER UPDATE OF is_active, is_registered ON users
+        WHEN OLD.is_active IS NOT NEW.is_active OR OLD.is_registered IS NOT NEW.is_registered
+        BEGIN{_user_counter_changes('OLD', '-')}{_user_counter_changes('NEW', '+')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_users_delete_counters AFTER DELETE ON users
+        BEGIN{_user_counter_changes('OLD', '-')}
+        END
+    """)
+    
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_alert_history_insert_counters AFTER INSERT ON alert_history
+        BEGIN{_counter_upsert("'triggered_alerts_daily'", _TRIGGERED_DATE.format(row='NEW.'), '1')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_alert_history_delete_counters AFTER DELETE ON alert_history
+        BEGIN{_counter_upsert("'triggered_alerts_daily'", _TRIGGERED_DATE.format(row='OLD.'), '-1')}
+        END
+    """)
+
+@migration(4, "ログイン試行の時刻インデックス（起動時の読み込み・保持期間による削除）")
+def _login_attempts_time_index(conn: sqlite3.Connection):
+    # ロック判定はメモリ上で行うため、メールアドレス別の部分インデックスは使われない
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_login_attempts_attempted ON login_attempts(attempted_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_login_attempts_failed")
+
+@migration(5, "統計カウンターのトリガーをNULLのステータス・タイプ・発火日時に対応")
+def _stat_counters_null_defaults(conn: sqlite3.Connection):
+    # v3で作成したトリガーはNULLのstatus・alert_typeでカウンター名がNULLになり書き込みに失敗する
+    triggers = conn.execute(r"""
+        SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg\_%\_counters' ESCAPE '\'
+    """).fetchall()
+    for (name,) in triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    _backfill_stat_counters(conn)
+    _create_stat_counter_triggers(conn)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def parse_arguments():
+    """コマンドライン引数解析"""
+    parser = argparse.ArgumentParser(description='CryptoAlert Schema Migrations')
+    
+    parser.add_argument('--db', type=str, default='crypto_alerts.db',
+                       help='データベースファイル デフォルト: crypto_alerts.db')
+    parser.add_argument('--apply', action='store_true',
+                       help='未適用のマイグレーションを適用')
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    
+    conn = sqlite3.connect(args.db)
+    try:
+        print(f"🗄️ スキーマバージョン: v{get_schema_version(conn)} (最新: v{SCHEMA_VERSION})")
+        pending = pending_migrations(conn)
+        if not pending:
+            print("✅ 未適用のマイグレーションはありません")
+            return
+        
+        for version, description, _ in pending:
+            print(f"   • v{version}: {description}")
+        if args.apply:
+            migrate(conn)
+        else:
+            print("💡 --apply で適用します")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
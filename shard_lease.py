@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Shard Lease - 複数監視プロセスでの銘柄空間の分割
+銘柄をcrc32で固定数の仮想シャードに割り当て、各シャードの担当ワーカーを
+生存ワーカー間のランデブーハッシュ（HRW）で決める（ワーカー増減時の移動は最小限）
+
+担当の確定はSQLiteのリース行で行い、リース期限内は他のワーカーが取得できない
+（停止したワーカーのシャードは期限切れ後に他のワーカーへ移る）
+"""
+
+import os
+import socket
+import uuid
+import zlib
+from typing import List, Set
+
+from database_schema import AlertDatabase
+
+DEFAULT_SHARD_COUNT = 64
+MIN_LEASE_SECONDS = 30
+
+class ShardCoordinator:
+    """監視ワーカーのシャード担当管理"""
+    
+    def __init__(self, db: AlertDatabase, shard_count: int = DEFAULT_SHARD_COUNT,
+                 lease_seconds: int = MIN_LEASE_SECONDS, worker_id: str = ''):
+        self.db = db
+        self.shard_count = max(1, shard_count)
+        self.lease_seconds = max(MIN_LEASE_SECONDS, lease_seconds)
+        self.hostname = socket.gethostname()
+        self.worker_id = worker_id or f"{self.hostname}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        
+        self.owned: Set[int] = set()
+        self.live_workers: List[str] = []
+    
+    @staticmethod
+    def shard_of(symbol: str, shard_count: int) -> int:
+        """銘柄のシャード番号（全ワーカーで同じ結果になる安定ハッシュ）"""
+        return zlib.crc32(symbol.encode()) % shard_count
+    
+    @staticmethod
+    def _score(worker_id: str, shard: int) -> int:
+        """ランデブーハッシュのスコア"""
+        return zlib.crc32(f"{worker_id}:{shard}".encode())
+    
+    def desired_shards(self, workers: List[str]) -> Set[int]:
+        """生存ワーカー一覧から自分が担当すべきシャードを計算"""
+        return {
+            shard for shard in range(self.shard_count)
+            if max(workers, key=lambda worker_id: self._score(worker_id, shard)) == self.worker_id
+        }
+    
+    def owns(self, symbol: str) -> bool:
+        """銘柄が自分の担当シャードに属するか"""
+        return self.shard_of(symbol, self.shard_count) in self.owned
+    
+    def renew(self) -> bool:
+        """ハートビート・リース更新・リバランスを行い、担当シャードが変わった場合はTrueを返す"""
+        self.db.heartbeat_monitor_worker(self.worker_id, self.hostname, os.getpid())
+        
+        workers = self.db.get_live_monitor_workers(self.lease_seconds)
+        if self.worker_id not in workers:
+            workers.append(self.worker_id)
+        self.live_workers = workers
+        
+        desired = self.desired_shards(workers)
+        
+        # 担当外になったシャードは他のワーカーがすぐ取得できるよう解放
+        surplus = sorted(self.owned - desired)
+        if surplus:
+            self.db.release_shard_leases(self.worker_id, surplus)
+        
+        owned = self.db.acquire_shard_leases(self.worker_id, sorted(desired), self.lease_seconds)
+        changed = owned != self.owned
+        if changed:
+            waiting = len(desired - owned)
+            print(f"🧩 シャード担当: {len(owned)}/{self.shard_count} (ワーカー{len(workers)}台"
+                  f"{f', 引き継ぎ待ち{waiting}' if waiting else ''})")
+        self.owned = owned
+        return changed
+    
+    def release(self):
+        """停止時にすべてのリースを解放"""
+        self.db.release_shard_leases(self.worker_id)
+        self.owned = set()
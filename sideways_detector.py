@@ -24,7 +24,7 @@ from matplotlib.gridspec import GridSpec
 import warnings
 warnings.filterwarnings('ignore')
 
-BINANCE_API_URL = "https://api.binance.com/api/v3"
+from market_data import get_market_data_provider
 
 # matplotlib設定
 plt.style.use('dark_background')
@@ -92,12 +92,8 @@ def get_binance_symbols(include_stablecoins=False):
         'PAXGUSDT', 'XUSDUSDT', 'EURIUSDT'
     }
     
-    url = f"{BINANCE_API_URL}/exchangeInfo"
-    
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = get_market_data_provider().exchange_info()
         
         usdt_symbols = []
         excluded_count = 0
@@ -128,12 +124,8 @@ def get_24hr_ticker():
     """24時間ティッカー情報を取得"""
     print("📊 24時間統計データを取得中...")
     
-    url = f"{BINANCE_API_URL}/ticker/24hr"
-    
     try:
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        data = get_market_data_provider().ticker_24hr()
         
         ticker_dict = {}
         for ticker in data:
@@ -158,13 +150,8 @@ def get_24hr_ticker():
 
 def get_kline_data(symbol, interval='1d', limit=30):
     """指定シンボルのローソク足データを取得"""
-    url = f"{BINANCE_API_URL}/klines"
-    params = {'symbol': symbol, 'interval': interval, 'limit': limit}
-    
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = get_market_data_provider().klines(symbol, interval, limit)
         
         klines = []
         for kline in data:
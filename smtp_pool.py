@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert SMTP Pool - 認証済みSMTPセッションの再利用
+STARTTLS・ログイン済みのセッションをプールし、1セッションで複数メッセージを送信する
+（大量発火時にメッセージごとのTLSハンドシェイク・ログインを行わない）
+"""
+
+import smtplib
+import threading
+import time
+from collections import deque
+from queue import Empty, LifoQueue
+from typing import Dict, Optional
+
+from monitor_metrics import SMTP_SEND_SECONDS, SMTP_ERRORS
+
+class _PooledSession:
+    """プール内のSMTPセッション"""
+    
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages = 0
+
+class SMTPConnectionPool:
+    """スレッドセーフなSMTPコネクションプール"""
+    
+    def __init__(self, host: str, port: int, username: str = '', password: str = '',
+                 use_starttls: bool = True, size: int = 4, timeout: float = 30,
+                 max_messages_per_session: int = 100, max_idle_seconds: float = 60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_starttls = use_starttls
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.max_messages_per_session = max_messages_per_session
+        self.max_idle_seconds = max_idle_seconds
+        
+        self._idle: LifoQueue = LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        
+        # 統計（メッセージごとの送信時間はミリ秒）
+        self.latencies = deque(maxlen=1000)
+        self.stats = {'connections': 0, 'reconnects': 0, 'messages': 0, 'failures': 0}
+    
+    def _connect(self) -> _PooledSession:
+        """新しいセッションを開く（STARTTLS・ログイン済み）"""
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_starttls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._close_smtp(smtp)
+            raise
+        
+        with self._lock:
+            self.stats['connections'] += 1
+        return _PooledSession(smtp)
+    
+    @staticmethod
+    def _close_smtp(smtp: smtplib.SMTP):
+        """セッションを閉じる（切断済みでもエラーにしない）"""
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+    
+    def _is_usable(self, session: _PooledSession) -> bool:
+        """再利用可能か確認（送信数上限・長時間アイドル時はNOOPで確認）"""
+        if session.messages >= self.max_messages_per_session:
+            return False
+        if time.monotonic() - session.last_used < self.max_idle_seconds:
+            return True
+        try:
+            return session.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+    
+    def _acquire(self) -> _PooledSession:
+        """アイドルセッションを取得（なければ新規接続）"""
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except Empty:
+                return self._connect()
+            if self._is_usable(session):
+                return session
+            self._close_smtp(session.smtp)
+    
+    def _release(self, session: _PooledSession):
+        """セッションをプールに戻す"""
+        session.last_used = time.monotonic()
+        self._idle.put(session)
+    
+    def send_message(self, msg) -> float:
+        """メッセージを送信し、送信時間（ミリ秒）を返す
+        
+        サーバー切断時は新しいセッションで1回だけ再送する
+        """
+        with self._slots:
+            start = time.perf_counter()
+            for attempt in range(2):
+                # 再送時はプール内の他のセッションも切断済みの可能性があるため新規接続
+                session = self._acquire() if attempt == 0 else self._connect()
+                try:
+                    session.smtp.send_message(msg)
+                except (smtplib.SMTPServerDisconnected, OSError):
+                    # 切断されたセッションは破棄して再接続
+                    self._close_smtp(session.smtp)
+                    with self._lock:
+                        self.stats['reconnects'] += 1
+                    if attempt == 0:
+                        continue
+                    with self._lock:
+                        self.stats['failures'] += 1
+                    SMTP_ERRORS.inc()
+                    raise
+                except smtplib.SMTPException:
+                    # 宛先拒否などはセッションを維持したままエラーにする
+                    try:
+                        session.smtp.rset()
+                        self._release(session)
+                    except (smtplib.SMTPException, OSError):
+                        self._close_smtp(session.smtp)
+                    with self._lock:
+                        self.stats['failures'] += 1
+                    SMTP_ERRORS.inc()
+                    raise
+                
+                session.messages += 1
+                self._release(session)
+                break
+            
+            latency = (time.perf_counter() - start) * 1000
+            SMTP_SEND_SECONDS.observe(latency / 1000)
+            with self._lock:
+                self.stats['messages'] += 1
+                self.latencies.append(latency)
+            return latency
+    
+    def latency_summary(self) -> Optional[Dict]:
+        """直近の送信時間（p50/p95/max、ミリ秒）"""
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return None
+        return {
+            'p50': latencies[len(latencies) // 2],
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            'max': latencies[-1]
+        }
+    
+    def close(self):
+        """アイドルセッションをすべて閉じる"""
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except Empty:
+                return
+            self._close_smtp(session.smtp)
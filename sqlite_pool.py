@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert SQLite Pool - 長寿命のSQLite接続の再利用
+接続ごとのオープン・PRAGMA設定を1回だけ行い、書き込み用と読み込み用の接続を分ける
+
+    書き込み: プロセスで1接続を共有（ロックで直列化、SQLiteの書き込みは常に1つ）
+    読み込み: スレッドごとに1接続（query_only、WALのため書き込み中もブロックされない）
+
+WALモードではWebアプリの読み込みと監視プロセスのコミットが互いに待たない
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+BUSY_TIMEOUT_MS = 5000  # 他プロセスの書き込みロックを待つ時間（ミリ秒）
+CACHE_SIZE_KB = 16384  # 接続ごとのページキャッシュ（KB）
+
+class SQLiteConnectionPool:
+    """スレッドセーフなSQLite接続プール（書き込み1接続 + スレッドごとの読み込み接続）"""
+    
+    def __init__(self, db_file: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS, cache_size_kb: int = CACHE_SIZE_KB):
+        self.db_file = db_file
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()  # 同じスレッド内の入れ子呼び出しを許可
+        self._reset()
+        self._enable_wal()
+    
+    def _reset(self):
+        """接続を持たない状態に戻す（fork後は親プロセスの接続を使わない）"""
+        self._pid = os.getpid()
+        self._writer = None
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+    
+    def _enable_wal(self):
+        """データベースをWALモードにする（ファイルに記録され、以降の全接続・他プロセスに適用される）
+        
+        読み込み用接続はquery_onlyのため切り替えられない。プール作成時とfork後に1回だけ行う
+        """
+        conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout_ms / 1000)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        finally:
+            conn.close()
+    
+    def _open(self, read_only: bool) -> sqlite3.Connection:
+        """PRAGMA設定済みの接続を開く"""
+        conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+    
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+                    self._enable_wal()
+    
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """書き込み用接続（終了時にコミット、例外時はロールバック）"""
+        self._check_pid()
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open(read_only=False)
+            conn = self._writer
+            conn.row_factory = None
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+    
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """読み込み用接続（呼び出したスレッド専用）"""
+        self._check_pid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._open(read_only=True)
+            with self._lock:
+                self._readers.append(conn)
+        conn.row_factory = None
+        try:
+            yield conn
+        finally:
+            # 読み込みトランザクションを残さない（WALのチェックポイントを妨げない）
+            if conn.in_transaction:
+                conn.rollback()
+    
+    def close(self):
+        """すべての接続を閉じる"""
+        with self._write_lock, self._lock:
+            for conn in self._readers:
+                conn.close()
+            if self._writer is not None:
+                self._writer.close()
+            self._reset()
@@ -0,0 +1,49 @@
+"""
+AlertDatabaseのクエリ実行計画のテスト
+マイグレーションで作成した新しいデータベース上でquery_plans.pyと同じワークロードを実行し、
+発行された全SQLの EXPLAIN QUERY PLAN にインデックスを使わない全体スキャンがないことを確認する
+"""
+
+import sqlite3
+
+import pytest
+
+from query_plans import check_plans, collect_plans
+
+# 監視サイクル・送信キュー・Webアプリのホットパス（ワークロードから外れていないことも確認する）
+HOT_PATH_METHODS = {
+    'get_active_alerts', 'get_alert_changes', 'get_active_alerts_for', 'flush_price_updates',
+    'trigger_alert', 'claim_pending_emails', 'claim_pending_digests', 'count_pending_emails',
+    'authenticate_user', 'get_user_alerts', 'get_statistics',
+}
+
+@pytest.fixture(scope='module')
+def plans(tmp_path_factory):
+    return collect_plans(str(tmp_path_factory.mktemp('plans') / 'plans.db'))
+
+def test_workload_covers_hot_paths(plans):
+    methods = {result['method'] for result in plans}
+    assert HOT_PATH_METHODS <= methods, f"ワークロードにないメソッド: {sorted(HOT_PATH_METHODS - methods)}"
+
+def test_no_full_table_scans(plans):
+    failures = [f"{result['method']}: {result['sql']}\n    " + "\n    ".join(result['problems'])
+                for result in plans if result['problems']]
+    assert not failures, "インデックスを使わない全体スキャン:\n" + "\n".join(failures)
+
+def test_check_plans_flags_unindexed_scan(tmp_path):
+    """チェック自体が全体スキャンを検出できること"""
+    with sqlite3.connect(tmp_path / 'scan.db') as conn:
+        conn.execute("CREATE TABLE alerts (id INTEGER PRIMARY KEY, symbol TEXT, status TEXT)")
+        conn.execute("CREATE INDEX idx_alerts_all_status ON alerts(status)")
+        conn.execute("CREATE INDEX idx_alerts_active_symbol ON alerts(symbol) WHERE status = 'active'")
+        results = check_plans(conn, [
+            ('by_symbol', "SELECT id FROM alerts WHERE symbol = 'BTCUSDT'"),
+            ('full_index', "SELECT status FROM alerts"),
+            ('by_id', "SELECT symbol FROM alerts WHERE id = 1"),
+            ('active_symbol', "SELECT id FROM alerts WHERE status = 'active' AND symbol = 'BTCUSDT'"),
+        ])
+    conn.close()
+    
+    problems = {result['method']: result['problems'] for result in results}
+    assert problems['by_symbol'] and problems['full_index']
+    assert not problems['by_id'] and not problems['active_symbol']
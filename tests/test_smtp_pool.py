@@ -0,0 +1,91 @@
+"""
+SMTPConnectionPoolのテスト
+ローカルの模擬SMTPサーバー（fake_smtp.FakeSMTPServer）にまとめて送信し、
+セッションの再利用・サーバー切断後の再接続・送信時間の記録を確認する
+"""
+
+import asyncio
+import threading
+from email.mime.text import MIMEText
+
+import pytest
+
+from fake_smtp import FakeSMTPServer
+from monitor_metrics import SMTP_SEND_SECONDS
+from smtp_pool import SMTPConnectionPool
+
+@pytest.fixture
+def smtp_server():
+    """模擬SMTPサーバーをバックグラウンドのイベントループで起動し、(サーバー, 起動関数) を返す"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    servers = []
+    
+    def start(**options):
+        fake = FakeSMTPServer(**options)
+        server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(fake.handle_client, '127.0.0.1', 0), loop).result()
+        servers.append(server)
+        return fake, server.sockets[0].getsockname()[1]
+    
+    yield start
+    
+    for server in servers:
+        server.close()
+        asyncio.run_coroutine_threadsafe(server.wait_closed(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def make_message(number: int) -> MIMEText:
+    msg = MIMEText(f"alert {number}", 'plain', 'utf-8')
+    msg['From'] = 'alerts@cryptoalert.com'
+    msg['To'] = f"user{number}@example.com"
+    msg['Subject'] = f"BTC Alert {number}"
+    return msg
+
+def test_burst_reuses_one_session(smtp_server):
+    fake, port = smtp_server()
+    pool = SMTPConnectionPool('127.0.0.1', port, 'alerts@cryptoalert.com', 'secret', use_starttls=False, size=1)
+    
+    for number in range(50):
+        pool.send_message(make_message(number))
+    pool.close()
+    
+    assert fake.stats['messages'] == 50
+    assert fake.stats['connections'] == 1
+    assert fake.stats['logins'] == 1
+    assert pool.stats['connections'] == 1
+    assert pool.stats['reconnects'] == 0
+
+def test_reconnects_after_server_disconnect(smtp_server):
+    fake, port = smtp_server(drop_after=10)
+    pool = SMTPConnectionPool('127.0.0.1', port, 'alerts@cryptoalert.com', 'secret', use_starttls=False, size=1)
+    
+    for number in range(25):
+        pool.send_message(make_message(number))
+    pool.close()
+    
+    # 10件ごとに切断され、次の送信が新しいセッションで再送される（失敗はなし）
+    assert fake.stats['messages'] == 25
+    assert fake.stats['drops'] == 2
+    assert fake.stats['connections'] == 3
+    assert fake.stats['logins'] == 3
+    assert pool.stats['reconnects'] == 2
+    assert pool.stats['failures'] == 0
+    assert pool.stats['messages'] == 25
+
+def test_records_per_message_latency(smtp_server):
+    fake, port = smtp_server(delay=0.02)
+    pool = SMTPConnectionPool('127.0.0.1', port, use_starttls=False, size=1)
+    _, observed_before = SMTP_SEND_SECONDS.total()
+    
+    latencies = [pool.send_message(make_message(number)) for number in range(5)]
+    pool.close()
+    
+    assert list(pool.latencies) == latencies
+    assert all(latency >= 20 for latency in latencies)  # 応答遅延（20ms）を含む
+    summary = pool.latency_summary()
+    assert summary['p50'] >= 20 and summary['max'] == max(latencies)
+    assert SMTP_SEND_SECONDS.total()[1] == observed_before + 5
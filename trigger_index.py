@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Trigger Index - 銘柄ごとの発火価格インデックス
+アラートの絶対発火価格を上昇・下落別のソート済み構造で保持し、
+価格更新時に二分探索で発火したアラートだけを取り出す（O(log n + k)）
+
+発火判定はAlertDatabase.evaluate_alert・AlertBatch.evaluateと同じ変動率（%）で行う
+（絶対発火価格は浮動小数点の丸めで閾値ちょうどの価格とずれるため、探索範囲を広げて変動率で確定する）
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+BOUNDARY_EPSILON = 1e-9  # 発火価格の探索範囲を広げる相対幅（丸め誤差の吸収）
+
+class TriggerIndex:
+    """銘柄ごとの発火価格インデックス（上昇・下落別）"""
+    
+    def __init__(self):
+        # symbol -> SortedList[(trigger_price, alert_id)]
+        self._rise = defaultdict(SortedList)
+        self._fall = defaultdict(SortedList)
+        # alert_id -> (symbol, alert_type, trigger_price, base_price, threshold_percent)
+        self._entries: Dict[int, Tuple[str, str, float, float, float]] = {}
+    
+    @staticmethod
+    def trigger_price(alert: Dict) -> float:
+        """アラートの絶対発火価格を計算"""
+        base_price = float(alert['base_price'])
+        threshold_percent = float(alert['threshold_percent'])
+        return base_price * (1 + threshold_percent / 100)
+    
+    @staticmethod
+    def is_triggered(alert_type: str, base_price: float, threshold_percent: float, price: float) -> bool:
+        """evaluate_alertと同じ変動率の比較で発火を判定"""
+        price_change = ((price - base_price) / base_price) * 100
+        if alert_type == 'rise':
+            return price_change >= threshold_percent
+        return price_change <= threshold_percent
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, alert_id: int) -> bool:
+        return alert_id in self._entries
+    
+    def _book(self, alert_type: str):
+        return self._rise if alert_type == 'rise' else self._fall
+    
+    def add(self, alert: Dict):
+        """アラートをインデックスに追加（登録済みなら置き換え）"""
+        alert_id = alert['id']
+        if alert_id in self._entries:
+            self.remove(alert_id)
+        
+        symbol = alert['symbol']
+        alert_type = alert.get('alert_type') or 'rise'
+        trigger_price = self.trigger_price(alert)
+        
+        self._book(alert_type)[symbol].add((trigger_price, alert_id))
+        self._entries[alert_id] = (symbol, alert_type, trigger_price,
+                                   float(alert['base_price']), float(alert['threshold_percent']))
+    
+    def remove(self, alert_id: int) -> bool:
+        """アラートをインデックスから削除"""
+        entry = self._entries.pop(alert_id, None)
+        if entry is None:
+            return False
+        
+        symbol, alert_type, trigger_price = entry[:3]
+        book = self._book(alert_type)
+        book[symbol].discard((trigger_price, alert_id))
+        if not book[symbol]:
+            del book[symbol]
+        return True
+    
+    def crossed(self, symbol: str, price: float) -> List[int]:
+        """現在価格で発火価格を越えたアラートIDを返す（削除はしない）"""
+        candidates = []
+        margin = abs(price) * BOUNDARY_EPSILON
+        
+        # 上昇アラート: 発火価格 <= 現在価格
+        rise = self._rise.get(symbol)
+        if rise:
+            end = rise.bisect_right((price + margin, float('inf')))
+            candidates.extend(alert_id for _, alert_id in rise.islice(0, end))
+        
+        # 下落アラート: 発火価格 >= 現在価格
+        fall = self._fall.get(symbol)
+        if fall:
+            start = fall.bisect_left((price - margin, float('-inf')))
+            candidates.extend(alert_id for _, alert_id in fall.islice(start))
+        
+        # 境界付近の候補は変動率で確定（evaluate_alertと同じ結果にする）
+        crossed_ids = []
+        for alert_id in candidates:
+            _, alert_type, trigger_price, base_price, threshold_percent = self._entries[alert_id]
+            if abs(trigger_price - price) > margin or self.is_triggered(alert_type, base_price, threshold_percent, price):
+                crossed_ids.append(alert_id)
+        return crossed_ids
+    
+    def nearest(self, symbol: str) -> Tuple[Optional[float], Optional[float]]:
+        """現在価格に最も近い発火価格を返す（上昇側の最小値, 下落側の最大値）"""
+        rise = self._rise.get(symbol)
+        fall = self._fall.get(symbol)
+        return (rise[0][0] if rise else None, fall[-1][0] if fall else None)
+    
+    def symbols(self) -> List[str]:
+        """インデックスに登録されている銘柄一覧"""
+        return sorted(set(self._rise) | set(self._fall))
+    
+    def type_counts(self) -> Tuple[int, int]:
+        """上昇・下落別のアラート数"""
+        rise_count = sum(len(book) for book in self._rise.values())
+        return rise_count, len(self._entries) - rise_count
+    
+    def count(self, symbol: str) -> int:
+        """銘柄に登録されているアラート数"""
+        return len(self._rise.get(symbol, ())) + len(self._fall.get(symbol, ()))
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+CryptoAlert Vectorized Engine - NumPyによる一括アラート評価
+アクティブアラートを列配列（銘柄コード・基準価格・閾値・種別）に変換し、
+現在価格ベクトルに対して変動率と発火マスクを1回のベクトル演算で計算
+
+監視プロセスはバッチを1つ保持し続け、アラートキャッシュの差分（追加・更新・削除）だけを
+列配列に反映する（サイクルごとのPythonでの再構築はしない）
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MIN_CAPACITY = 1024  # 列配列の初期確保行数（足りなくなったら倍に拡張）
+
+class AlertBatch:
+    """アクティブアラートの列指向バッチ
+    
+    行は常に詰めて保持する（削除した行には末尾の行を移す）
+    """
+    
+    def __init__(self, alerts: Iterable[Dict] = ()):
+        self.alerts: List[Dict] = []  # 行 -> アラート
+        self.positions: Dict[int, int] = {}  # alert_id -> 行
+        
+        # 銘柄名 -> 銘柄コード（追加のみ、一度割り当てたコードは変わらない）
+        self.symbol_names: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+        
+        # 列配列（確保済みの行数はアラート数以上、先頭len(self)行が有効）
+        self._symbol_codes = np.empty(0, dtype=np.int32)
+        self._base_prices = np.empty(0, dtype=np.float64)
+        self._thresholds = np.empty(0, dtype=np.float64)
+        self._is_rise = np.empty(0, dtype=bool)
+        
+        self.update(list(alerts))
+    
+    def __len__(self) -> int:
+        return len(self.alerts)
+    
+    def __contains__(self, alert_id: int) -> bool:
+        return alert_id in self.positions
+    
+    @property
+    def symbol_codes(self) -> np.ndarray:
+        return self._symbol_codes[:len(self.alerts)]
+    
+    @property
+    def base_prices(self) -> np.ndarray:
+        return self._base_prices[:len(self.alerts)]
+    
+    @property
+    def thresholds(self) -> np.ndarray:
+        return self._thresholds[:len(self.alerts)]
+    
+    @property
+    def is_rise(self) -> np.ndarray:
+        return self._is_rise[:len(self.alerts)]
+    
+    def _columns(self) -> Tuple[np.ndarray, ...]:
+        return self._symbol_codes, self._base_prices, self._thresholds, self._is_rise
+    
+    def _symbol_code(self, symbol: str) -> int:
+        code = self._symbol_index.get(symbol)
+        if code is None:
+            code = self._symbol_index[symbol] = len(self.symbol_names)
+            self.symbol_names.append(symbol)
+        return code
+    
+    def update(self, upserted: List[Dict], removed: Iterable[int] = ()):
+        """差分を反映（削除、登録済みアラートは行を上書き、新規アラートは末尾に一括追加）"""
+        for alert_id in removed:
+            self.remove(alert_id)
+        
+        added: Dict[int, Dict] = {}
+        for alert in upserted:
+            row = self.positions.get(alert['id'])
+            if row is None:
+                added[alert['id']] = alert
+            else:
+                self._write_row(row, alert)
+        
+        if added:
+            self._append(list(added.values()))
+    
+    def remove(self, alert_id: int) -> bool:
+        """アラートを削除（末尾の行を空いた行に移す）"""
+        row = self.positions.pop(alert_id, None)
+        if row is None:
+            return False
+        
+        last = len(self.alerts) - 1
+        last_alert = self.alerts.pop()
+        if row != last:
+            self.alerts[row] = last_alert
+            self.positions[last_alert['id']] = row
+            for column in self._columns():
+                column[row] = column[last]
+        return True
+    
+    def _write_row(self, row: int, alert: Dict):
+        """登録済みの行をアラートの内容で上書き"""
+        self.alerts[row] = alert
+        self._symbol_codes[row] = self._symbol_code(alert['symbol'])
+        self._base_prices[row] = float(alert['base_price'])
+        self._thresholds[row] = float(alert['threshold_percent'])
+        self._is_rise[row] = (alert.get('alert_type') or 'rise') == 'rise'
+    
+    def _append(self, alerts: List[Dict]):
+        """新規アラートを末尾に追加"""
+        start = len(self.alerts)
+        end = start + len(alerts)
+        count = len(alerts)
+        
+        capacity = len(self._base_prices)
+        if end > capacity:
+            capacity = max(end, capacity * 2, MIN_CAPACITY)
+            self._symbol_codes, self._base_prices, self._thresholds, self._is_rise = (
+                np.concatenate([column[:start], np.empty(capacity - start, dtype=column.dtype)])
+                for column in self._columns()
+            )
+        
+        self._symbol_codes[start:end] = np.fromiter((self._symbol_code(alert['symbol']) for alert in alerts),
+                                                    dtype=np.int32, count=count)
+        self._base_prices[start:end] = np.fromiter((float(alert['base_price']) for alert in alerts),
+                                                   dtype=np.float64, count=count)
+        self._thresholds[start:end] = np.fromiter((float(alert['threshold_percent']) for alert in alerts),
+                                                  dtype=np.float64, count=count)
+        self._is_rise[start:end] = np.fromiter(((alert.get('alert_type') or 'rise') == 'rise' for alert in alerts),
+                                               dtype=bool, count=count)
+        
+        self.positions.update((alert['id'], row) for row, alert in enumerate(alerts, start))
+        self.alerts.extend(alerts)
+    
+    def symbols(self) -> List[str]:
+        """アラートのある銘柄一覧"""
+        counts = np.bincount(self.symbol_codes, minlength=len(self.symbol_names))
+        return sorted(self.symbol_names[code] for code in np.flatnonzero(counts))
+    
+    def type_counts(self) -> Tuple[int, int]:
+        """上昇・下落別のアラート数"""
+        rise_count = int(np.count_nonzero(self.is_rise))
+        return rise_count, len(self.alerts) - rise_count
+    
+    def symbol_mask(self, symbols: Iterable[str]) -> np.ndarray:
+        """指定した銘柄のアラート行のマスク"""
+        selected = np.zeros(len(self.symbol_names), dtype=bool)
+        for symbol in symbols:
+            code = self._symbol_index.get(symbol)
+            if code is not None:
+                selected[code] = True
+        return selected[self.symbol_codes]
+    
+    def price_vector(self, prices: Dict[str, float]) -> np.ndarray:
+        """銘柄コード順の現在価格ベクトル（価格なしはNaN）"""
+        return np.array([prices.get(symbol, np.nan) for symbol in self.symbol_names],
+                        dtype=np.float64)
+    
+    def evaluate(self, prices: Dict[str, float],
+                 mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """全アラートを一括評価（maskを指定した場合はその行だけ、他の行は価格なし扱い）
+        
+        戻り値: (各アラートの現在価格, 価格変動率%, 発火マスク)
+        """
+        if not self.alerts:
+            empty = np.empty(0, dtype=np.float64)
+            return empty, empty, np.empty(0, dtype=bool)
+        
+        current_prices = self.price_vector(prices)[self.symbol_codes]
+        if mask is not None:
+            current_prices[~mask] = np.nan
+        price_changes = (current_prices - self.base_prices) / self.base_prices * 100
+        
+        # 上昇: 変動率 >= 閾値 / 下落: 変動率 <= 閾値（価格なしのNaNは常にFalse）
+        triggered = np.where(self.is_rise,
+                             price_changes >= self.thresholds,
+                             price_changes <= self.thresholds)
+        
+        return current_prices, price_changes, triggered
+    
+    def nearest_distances(self, prices: Dict[str, float]) -> Dict[str, float]:
+        """銘柄ごとに現在価格から最も近い発火価格までの距離（%）
+        
+        価格のない銘柄は含まない
+        """
+        if not self.alerts:
+            return {}
+        
+        price_vector = self.price_vector(prices)
+        current_prices = price_vector[self.symbol_codes]
+        trigger_prices = self.base_prices * (1 + self.thresholds / 100)
+        distances = np.where(self.is_rise, trigger_prices - current_prices,
+                             current_prices - trigger_prices) / current_prices * 100
+        
+        nearest = np.full(len(self.symbol_names), np.inf)
+        np.fmin.at(nearest, self.symbol_codes, distances)
+        
+        return {
+            symbol: float(max(nearest[code], 0.0))
+            for code, symbol in enumerate(self.symbol_names)
+            if not np.isnan(price_vector[code])
+        }